@@ -0,0 +1,106 @@
+# Throughput of message analysis with and without the process-wide
+# AnalysisCache, on traffic where some share of messages repeat.
+#
+#   python benchmarks/bench_analysis_cache.py [--messages 50000] [--threads 4]
+#
+# Repeated messages are drawn Zipf-like from the quick actions and common
+# greetings, with random casing, so they share a normalized form; the rest
+# are unique synthetic messages that can only miss. For each repeat share
+# the report gives messages/sec uncached and cached, the hit rate, and the
+# speed-up. A small cache run shows eviction under pressure, and a threaded
+# run checks that concurrent sessions get the same results as an uncached
+# analyzer.
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine.model import build_model
+from talksafe_engine.responses import QUICK_ACTIONS
+
+COMMON = [message for actions in QUICK_ACTIONS.values() for _label, message in actions] + [
+    "hi", "hello", "how far", "good morning", "thank you", "I'm okay today", "I dey", "wetin dey happen",
+]
+TOPICS = ["school", "exams", "money", "my family", "my friends", "sleep", "church", "my hostel", "the future"]
+
+
+def build_traffic(count, repeat_share, seed=5):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(COMMON))]
+    traffic = []
+    for index in range(count):
+        if rng.random() < repeat_share:
+            text = rng.choices(COMMON, weights)[0]
+            traffic.append(text.upper() if rng.random() < 0.1 else text)
+        else:
+            traffic.append(f"I keep thinking about {rng.choice(TOPICS)} since day {index}")
+    return traffic
+
+
+def throughput(analyze, traffic):
+    started = time.perf_counter()
+    for text in traffic:
+        analyze(text)
+    return len(traffic) / (time.perf_counter() - started)
+
+
+def signature(analysis):
+    return (analysis.language, analysis.mood, analysis.category, analysis.is_crisis, analysis.crisis_score,
+            dict(analysis.category_scores))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the process-wide analysis cache.")
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=4, help="threads sharing the cache in the safety check")
+    args = parser.parse_args(argv)
+
+    uncached = build_model(cache_entries=0)
+    for text in ("hello", "how far"):
+        uncached.analyzer.analyze(text)
+
+    print(f"{args.messages} messages per run")
+    print(f"{'repeat share':>12} {'uncached/s':>11} {'cached/s':>10} {'hit rate':>9} {'speed-up':>9}")
+    for share in (0.0, 0.3, 0.6, 0.9):
+        traffic = build_traffic(args.messages, share)
+        cached = build_model()
+        cached.analyzer.warm(COMMON[:8])
+        base = throughput(uncached.analyzer.analyze, traffic)
+        fast = throughput(cached.analyzer.analyze, traffic)
+        hit_rate = cached.analysis_cache.metrics()["hit_rate"]
+        print(f"{share:>12.0%} {base:>11.0f} {fast:>10.0f} {hit_rate:>9.1%} {fast / base:>8.2f}x")
+
+    small = build_model(cache_entries=1000)
+    throughput(small.analyzer.analyze, build_traffic(args.messages, 0.6))
+    metrics = small.analysis_cache.metrics()
+    print(f"\n1000-entry cache, 60% repeats: hit rate {metrics['hit_rate']:.1%}, {metrics['evictions']} evictions, "
+          f"{metrics['bytes'] / 1024:.0f} KiB held")
+
+    shared = build_model()
+    traffic = build_traffic(args.messages // args.threads, 0.6, seed=9)
+    expected = [signature(uncached.analyzer.analyze(text)) for text in traffic]
+    mismatches = []
+
+    def session(offset):
+        rotated = traffic[offset:] + traffic[:offset]
+        for text, want in zip(rotated, expected[offset:] + expected[:offset]):
+            if signature(shared.analyzer.analyze(text)) != want:
+                mismatches.append(text)
+
+    threads = [threading.Thread(target=session, args=(index * 97,)) for index in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics = shared.analysis_cache.metrics()
+    print(f"{args.threads} threads sharing one cache: {len(mismatches)} mismatches against uncached analysis, "
+          f"hit rate {metrics['hit_rate']:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# Precision/recall and latency of crisis detection on a labeled corpus.
+#
+#   python benchmarks/bench_crisis.py [corpus.jsonl]
+#
+# Each corpus line is one conversation: {"turns": [...], "labels": [...]},
+# with a label per turn saying whether a crisis response is warranted there.
+# A line may also give "categories", the reply category expected per turn;
+# those conversations are replayed through a CulturalResponder and every
+# reply's category must match, so a crisis reply without the crisis flag
+# (or the reverse) fails the run.
+# Three detectors are compared: the original substring check, the word-level
+# check on a single message, and the stateful CrisisScorer, which sees the
+# conversation turn by turn. The word and stateful timings include the whole
+# analysis stage (language, mood and category too), not just crisis terms.
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine.crisis import CrisisScorer
+from talksafe_engine.model import load_model
+from talksafe_engine.responder import CulturalResponder
+from talksafe_engine.sessions import CONTEXT_LIMIT
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crisis_corpus.jsonl")
+
+
+def substring_detector(text):
+    text_lower = text.lower()
+    crisis_score = 0
+    for keyword in cultural_responses.CRISIS_KEYWORDS:
+        if keyword in text_lower:
+            crisis_score += 2
+    for indicator in cultural_responses.SEVERITY_INDICATORS:
+        if indicator in text_lower:
+            crisis_score += 3
+    return crisis_score >= 2
+
+
+# Keeps the category of each reply a responder records
+class CategoryRecorder:
+    def __init__(self):
+        self.categories = []
+
+    def record(self, session_id, language, category, mood, is_crisis, text):
+        self.categories.append(category)
+
+
+def reply_categories(model, turns):
+    recorder = CategoryRecorder()
+    responder = CulturalResponder(model, seed=0, recorder=recorder)
+    for turn in turns:
+        responder.generate_response(turn)
+    return recorder.categories
+
+
+def evaluate(conversations, predict_conversation):
+    true_positive = false_positive = false_negative = 0
+    turns = 0
+    started = time.perf_counter()
+    for conversation in conversations:
+        predictions = predict_conversation(conversation["turns"])
+        for predicted, expected in zip(predictions, conversation["labels"]):
+            turns += 1
+            true_positive += predicted and expected
+            false_positive += predicted and not expected
+            false_negative += expected and not predicted
+    elapsed = time.perf_counter() - started
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "turns": turns,
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(f1, 3),
+        "false_positives": false_positive,
+        "false_negatives": false_negative,
+        "us_per_message": round(elapsed / turns * 1e6, 2),
+    }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else CORPUS
+    with open(path, encoding="utf-8") as corpus:
+        conversations = [json.loads(line) for line in corpus if line.strip()]
+    model = load_model()
+    analyzer = model.analyzer
+
+    def stateful(turns):
+        scorer = CrisisScorer(CONTEXT_LIMIT)
+        return [scorer.update(analyzer.analyze(turn)).is_crisis for turn in turns]
+
+    detectors = {
+        "substring": lambda turns: [substring_detector(turn) for turn in turns],
+        "word": lambda turns: [analyzer.analyze(turn).is_crisis for turn in turns],
+        "stateful": stateful,
+    }
+    # Latency is taken over many repeats of the corpus; quality from one pass
+    report = {}
+    for name, detector in detectors.items():
+        result = evaluate(conversations, detector)
+        repeats = [evaluate(conversations, detector)["us_per_message"] for _ in range(200)]
+        result["us_per_message"] = min(repeats)
+        report[name] = result
+
+    mismatches = []
+    checked = 0
+    for conversation in conversations:
+        if "categories" in conversation:
+            got = reply_categories(model, conversation["turns"])
+            checked += len(got)
+            for turn, category, expected in zip(conversation["turns"], got, conversation["categories"]):
+                if category != expected:
+                    mismatches.append({"turn": turn, "category": category, "expected": expected})
+    report["reply_categories"] = {"turns": checked, "mismatches": mismatches}
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Chat-path cost and delivery behaviour of the crisis escalation queue,
+# against a local stand-in for the counsellor webhook.
+#
+#   python benchmarks/bench_escalation.py [--sessions 2000] [--turns 5]
+#       [--latency 0.02] [--failure-rate 0.2]
+#
+# The stand-in is an HTTP server on a free local port. It sleeps `latency`
+# seconds per request and answers 503 to a `failure-rate` share of them,
+# which exercises retry with backoff. Every session sends `turns` crisis
+# messages back to back, so all but the first per session fall inside the
+# de-duplication window. Reported per sink:
+# - escalate() cost per call, the only thing the chat path pays
+# - alerts delivered, de-duplicated and retried
+# - enqueue-to-receipt latency percentiles
+# "inline" is the naive alternative: one synchronous POST per crisis
+# message on the chat path.
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine.escalation import Alert, EscalationQueue, FileSink, HttpSink
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency, failure_rate, seed=1):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.received = []  # (receipt time, alert dict)
+        self.requests = 0
+        self.failures = 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            failing = server.rng.random() < server.failure_rate
+            if failing:
+                server.failures += 1
+            else:
+                now = time.time()
+                server.received.extend((now, alert) for alert in json.loads(body)["alerts"])
+        self.send_response(503 if failing else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def crisis_turns(sessions, turns):
+    return [(f"session-{session}", "I want to end it all tonight") for _ in range(turns) for session in range(sessions)]
+
+
+def run_queue(sink, turns, **options):
+    escalation = EscalationQueue(sink, backoff=0.05, max_backoff=0.5, **options)
+    started = time.perf_counter_ns()
+    for session_id, text in turns:
+        escalation.escalate(session_id, "english", 6.0, 4, False, text)
+    enqueue_ns = (time.perf_counter_ns() - started) / len(turns)
+    escalation.close(timeout=60.0)
+    return enqueue_ns, escalation.metrics()
+
+
+def report(name, enqueue_ns, metrics, latencies):
+    latencies = sorted(latencies)
+    print(f"{name:>8}: escalate() {enqueue_ns:8.0f} ns/call | delivered {metrics['delivered']:5d} "
+          f"deduplicated {metrics['deduplicated']:5d} dropped {metrics['dropped']:4d} failed {metrics['failed']:3d} "
+          f"retries {metrics['retries']:3d} batches {metrics['batches']:4d} max depth {metrics['max_depth']:4d}")
+    if latencies:
+        print(f"{'':>10}delivery latency ms: p50 {percentile(latencies, 0.5) * 1e3:.1f}, "
+              f"p90 {percentile(latencies, 0.9) * 1e3:.1f}, p99 {percentile(latencies, 0.99) * 1e3:.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the crisis escalation queue against a local stand-in.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=5, help="crisis messages per session")
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in seconds per request")
+    parser.add_argument("--failure-rate", type=float, default=0.2, help="share of requests the stand-in fails")
+    parser.add_argument("--inline-alerts", type=int, default=50, help="alerts for the synchronous baseline")
+    args = parser.parse_args(argv)
+
+    turns = crisis_turns(args.sessions, args.turns)
+    print(f"{len(turns)} crisis turns from {args.sessions} sessions; stand-in latency {args.latency * 1e3:.0f} ms, "
+          f"failure rate {args.failure_rate:.0%}")
+
+    server = StandIn(args.latency, args.failure_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/alerts"
+    enqueue_ns, metrics = run_queue(HttpSink(url), turns, max_pending=args.sessions)
+    latencies = [received - alert["created"] for received, alert in server.received]
+    report("http", enqueue_ns, metrics, latencies)
+    print(f"{'':>10}stand-in: {server.requests} requests, {server.failures} answered 503")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "alerts.jsonl")
+        enqueue_ns, metrics = run_queue(FileSink(path), turns, max_pending=args.sessions)
+        with open(path, encoding="utf-8") as handle:
+            written = sum(1 for _ in handle)
+        report("file", enqueue_ns, metrics, [])
+        print(f"{'':>10}{written} alerts in the file")
+
+    server.failure_rate = 0.0
+    sink = HttpSink(url)
+    started = time.perf_counter_ns()
+    for session_id, text in turns[:args.inline_alerts]:
+        sink.deliver([Alert(session_id, "english", 6.0, 4, False, text)])
+    inline_ns = (time.perf_counter_ns() - started) / args.inline_alerts
+    print(f"{'inline':>8}: {inline_ns:12.0f} ns per crisis message on the chat path (one POST each, no failures)")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Accuracy and throughput of the character n-gram language identifier
+# against the indicator-substring heuristic it replaces.
+#
+#   python benchmarks/bench_langid.py [--messages 100000]
+#
+# Accuracy is measured on benchmarks/langid_eval.jsonl, held-out messages
+# written separately from the training corpus, including English that the
+# substrings misroute ("fitness", "Monday", "definitely") and short everyday
+# English ("I go to school", "I love my cat", "no"). Throughput is
+# messages/sec over a larger corpus of those messages repeated with random
+# casing and punctuation, for the heuristic, identify() one message at a
+# time, and identify_batch() in chunks.
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine.analysis import LANGUAGE_CONFIDENCE
+from talksafe_engine.langid import LanguageIdentifier
+
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langid_eval.jsonl")
+
+
+def heuristic_language(text):
+    # The original detect_language from talksafe.py
+    text_lower = text.lower()
+    for lang, indicators in cultural_responses.LANGUAGE_INDICATORS.items():
+        if any(indicator in text_lower for indicator in indicators):
+            return lang
+    return cultural_responses.DEFAULT_LANGUAGE
+
+
+def load_eval():
+    with open(EVAL_PATH, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    return [row["text"] for row in rows], [row["language"] for row in rows]
+
+
+def accuracy_report(name, predicted, expected):
+    languages = sorted(set(expected))
+    report = {"accuracy": round(sum(p == e for p, e in zip(predicted, expected)) / len(expected), 4)}
+    for language in languages:
+        pairs = [(p, e) for p, e in zip(predicted, expected) if e == language]
+        report[f"{language}_recall"] = round(sum(p == e for p, e in pairs) / len(pairs), 4)
+    misses = [f"{e}->{p}" for p, e in zip(predicted, expected) if p != e]
+    print(f"{name:>10}: {json.dumps(report)}  misrouted: {len(misses)}")
+    return report
+
+
+def build_corpus(texts, size, seed=11):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        text = rng.choice(texts)
+        if rng.random() < 0.3:
+            text = text.capitalize()
+        if rng.random() < 0.3:
+            text += rng.choice(("!", "?", "...", " 😔", " o"))
+        corpus.append(text)
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the n-gram language identifier with the substring heuristic.")
+    parser.add_argument("--messages", type=int, default=100000, help="messages in the throughput corpus")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    identifier = LanguageIdentifier.from_corpus()
+    print(f"training: {(time.perf_counter() - start) * 1e3:.1f} ms, languages: {list(identifier.languages)}")
+
+    texts, expected = load_eval()
+    print(f"\naccuracy on {len(texts)} held-out messages:")
+    accuracy_report("heuristic", [heuristic_language(text) for text in texts], expected)
+    languages, confidences = identifier.identify_batch(texts)
+    predicted = [language if confidence >= LANGUAGE_CONFIDENCE else cultural_responses.DEFAULT_LANGUAGE
+                 for language, confidence in zip(languages, confidences.tolist())]
+    accuracy_report("n-gram", predicted, expected)
+
+    corpus = build_corpus(texts, args.messages)
+    print(f"\nthroughput on {len(corpus)} messages:")
+    runs = {
+        "heuristic": lambda: [heuristic_language(text) for text in corpus],
+        "identify": lambda: [identifier.identify(text) for text in corpus],
+        "batch": lambda: [identifier.identify_batch(corpus[offset:offset + args.batch_size])
+                          for offset in range(0, len(corpus), args.batch_size)],
+    }
+    for name, run in runs.items():
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {len(corpus) / elapsed:12,.0f} messages/sec")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
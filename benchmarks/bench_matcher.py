@@ -0,0 +1,93 @@
+# Per-message latency of category scoring as the pattern vocabulary grows.
+#
+#   python benchmarks/bench_matcher.py
+#
+# Compares the original substring loop (pattern in text + text.count) with the
+# compiled PatternMatcher and checks both produce identical scores.
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine.matcher import PatternMatcher
+
+SIZES = [60, 250, 1000, 2500, 10000]
+CATEGORIES = 8
+MESSAGES = 300
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        # Roughly one in five patterns is a short phrase, like "heavy heart"
+        if rng.random() < 0.2:
+            word += " " + "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 6)))
+        words.add(word)
+    return sorted(words)
+
+
+def make_table(vocabulary, rng):
+    table = {f"category_{i}": [] for i in range(CATEGORIES)}
+    for word in vocabulary:
+        table[f"category_{rng.randrange(CATEGORIES)}"].append(word)
+    return table
+
+
+def make_messages(vocabulary, rng):
+    filler = ["i", "am", "feeling", "really", "about", "my", "the", "and", "today", "so"]
+    messages = []
+    for _ in range(MESSAGES):
+        words = [rng.choice(filler) for _ in range(rng.randint(8, 40))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(vocabulary))
+        messages.append(" ".join(words))
+    return messages
+
+
+def substring_scores(table, text):
+    scores = {}
+    for category, patterns in table.items():
+        score = 0
+        for pattern in patterns:
+            if pattern in text:
+                score += len(pattern) * text.count(pattern)
+        scores[category] = score
+    return scores
+
+
+def per_message_us(func, messages, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            func(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'patterns':>9} {'compile ms':>11} {'substring us':>13} {'matcher us':>11} {'speedup':>8}")
+    for size in SIZES:
+        vocabulary = make_vocabulary(size, rng)
+        table = make_table(vocabulary, rng)
+        messages = make_messages(vocabulary, rng)
+
+        start = time.perf_counter()
+        matcher = PatternMatcher(table)
+        compile_ms = (time.perf_counter() - start) * 1e3
+
+        for message in messages:
+            assert matcher.scores(message) == substring_scores(table, message)
+
+        baseline = per_message_us(lambda text: substring_scores(table, text), messages)
+        compiled = per_message_us(matcher.scores, messages)
+        print(f"{size:>9} {compile_ms:>11.1f} {baseline:>13.1f} {compiled:>11.1f} {baseline / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
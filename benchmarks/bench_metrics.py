@@ -0,0 +1,99 @@
+# Overhead of the pipeline instrumentation on generate_response.
+#
+#   python benchmarks/bench_metrics.py [--messages 5000] [--rounds 15]
+#
+# Replays the same seeded conversation with metrics disabled and enabled,
+# alternating rounds so machine noise hits both equally, and reports the
+# best round of each plus the relative overhead (target: under 2%). On a
+# noisy machine that end-to-end difference can drown in jitter, so the
+# instrumentation calls one message makes are also timed on their own.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine.metrics import METRICS, Metrics
+from talksafe_engine.model import load_model
+from talksafe_engine.responder import CulturalResponder
+
+MESSAGES = [
+    "hello", "I'm feeling anxious and overwhelmed", "I'm stressed about school and my studies",
+    "how far, exam dey worry me", "my girlfriend left me and I feel lonely", "I don't have money for fees",
+    "I feel so sad and empty", "I dey fine o", "I want to kill myself tonight", "thank you, I feel better",
+]
+
+
+def replay(model, corpus):
+    responder = CulturalResponder(model, seed=1)
+    start = time.perf_counter()
+    for text in corpus:
+        responder.generate_response(text)
+    return time.perf_counter() - start
+
+
+def instrumentation_cost(stages=6, messages=200000, repeats=5):
+    # ns per message that enabling metrics adds to generate_response: a
+    # stopwatch, on sampled messages one lap per stage and the total, and the
+    # message counter. The same loop with metrics disabled, which still asks
+    # for a stopwatch, is timed and subtracted; each loop keeps its best of
+    # `repeats` runs.
+    metrics = Metrics(enabled=True, sample_every=METRICS.sample_every)
+    disabled = Metrics(enabled=False)
+    histograms = [metrics.histogram(f"stage{index}") for index in range(stages)]
+    total = metrics.histogram("total")
+    baseline = timed = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(messages):
+            watch = disabled.stopwatch()
+            for histogram in histograms:
+                if watch:
+                    pass
+        baseline = min(baseline, time.perf_counter_ns() - start)
+        start = time.perf_counter_ns()
+        for _ in range(messages):
+            watch = metrics.stopwatch()
+            for histogram in histograms:
+                if watch:
+                    watch.lap(histogram)
+            if watch:
+                watch.total(total)
+            metrics.count_message("english", "greetings", "okay", False)
+        timed = min(timed, time.perf_counter_ns() - start)
+    return (timed - baseline) / messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure instrumentation overhead on generate_response.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(5)
+    corpus = [rng.choice(MESSAGES) for _ in range(args.messages)]
+    model = load_model()
+    replay(model, corpus[:500])  # compile matchers and warm caches
+
+    best = {False: float("inf"), True: float("inf")}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            METRICS.enabled = enabled
+            best[enabled] = min(best[enabled], replay(model, corpus))
+    METRICS.enabled = False
+
+    for enabled in (False, True):
+        print(f"metrics {'on ' if enabled else 'off'}: {best[enabled] / len(corpus) * 1e6:7.2f} us/message")
+    print(f"overhead: {(best[True] / best[False] - 1) * 100:+.2f}% end to end")
+    cost = instrumentation_cost()
+    print(f"instrumentation alone: {cost:.0f} ns/message = {cost / (best[False] / len(corpus) * 1e9) * 100:.2f}% "
+          f"(sampling 1 in {METRICS.sample_every})")
+    total = METRICS.snapshot()["stages"]["generate_response"]
+    print(f"recorded: {total['count']} messages, mean {total['mean_us']} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# Cost of mood tracking per turn and of cohort-level mood summaries.
+#
+#   python benchmarks/bench_mood.py [records]
+#
+# The per-turn figure is MoodTracker.append, which updates every rolling
+# aggregate. The cohort figure runs summarize_cohort (NumPy) over synthetic
+# records from many sessions and compares it with a plain Python loop.
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine.mood import BAD, MOOD_LABELS, MoodTracker, summarize_cohort
+
+
+def python_summary(codes, timestamps, session_ids):
+    counts = [0, 0, 0]
+    hourly = [[0, 0, 0] for _ in range(24)]
+    longest = streak = 0
+    previous_session = None
+    for code, timestamp, session in zip(codes, timestamps, session_ids):
+        counts[code] += 1
+        hourly[int(timestamp // 3600 % 24)][code] += 1
+        if session != previous_session:
+            streak = 0
+            previous_session = session
+        streak = streak + 1 if code == BAD else 0
+        longest = max(longest, streak)
+    return counts, hourly, longest
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    rng = random.Random(3)
+
+    tracker = MoodTracker()
+    moods = [rng.choice(MOOD_LABELS) for _ in range(200_000)]
+    start = time.perf_counter()
+    now = time.time()
+    for index, mood in enumerate(moods):
+        tracker.append(mood, now + index)
+    per_turn = (time.perf_counter() - start) / len(moods) * 1e9
+    print(f"MoodTracker.append: {per_turn:.0f} ns/turn (all aggregates included)")
+
+    codes = array("b", (rng.choice((0, 1, 1, 2)) for _ in range(records)))
+    timestamps = array("d", (now + index * 7.0 for index in range(records)))
+    session_ids = array("l", (index // 40 for index in range(records)))
+
+    start = time.perf_counter()
+    summary = summarize_cohort(codes, timestamps, session_ids)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    counts, _hourly, longest = python_summary(codes, timestamps, session_ids)
+    looped = time.perf_counter() - start
+
+    assert [summary["counts"][label] for label in MOOD_LABELS] == counts
+    assert summary["longest_bad_streak"] == longest
+    print(f"cohort summary over {records:,} records: numpy {vectorized * 1e3:.0f} ms, "
+          f"python loop {looped * 1e3:.0f} ms ({looped / vectorized:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Startup time and memory per loaded language for the lazy response packs.
+#
+#   python benchmarks/bench_packs.py [--languages 12] [--patterns 400]
+#
+# Copies the bundled packs into a temporary directory and adds synthetic
+# language packs (same shape, generated vocabulary) so the effect of shipping
+# many languages is visible. Reports:
+#   - startup: building the model lazily (default pack only) vs reading and
+#     compiling every pack up front, as the single dict literal used to
+#   - per language: first-message latency and tracemalloc growth when that
+#     language is first used
+#   - hot reload: time for an edited pack to be picked up by the next message
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine.model import build_model
+from talksafe_engine.packs import PACKS_DIR
+
+
+def synthetic_pack(language, patterns_per_category, seed):
+    rng = random.Random(seed)
+    categories = {}
+    for category in ("greetings", "academic_stress", "anxiety", "depression", "relationships", "financial_stress"):
+        words = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(patterns_per_category)}
+        responses = [" ".join(rng.choices(sorted(words), k=30)) for _ in range(3)]
+        categories[category] = {"patterns": sorted(words), "responses": responses}
+    return {"language": language, "categories": categories}
+
+
+def make_pack_dir(languages, patterns_per_category):
+    directory = tempfile.mkdtemp(prefix="talksafe-packs-")
+    for name in os.listdir(PACKS_DIR):
+        shutil.copy(os.path.join(PACKS_DIR, name), directory)
+    names = [f"lang{index:02d}" for index in range(languages)]
+    for seed, language in enumerate(names):
+        with open(os.path.join(directory, language + ".json"), "w", encoding="utf-8") as handle:
+            json.dump(synthetic_pack(language, patterns_per_category, seed), handle)
+    return directory, names
+
+
+def sample_message(model, language):
+    # Pidgin needs its indicator words; synthetic languages are scored directly
+    pack = model.packs.get(language)
+    patterns = pack.categories["greetings"]["patterns"]
+    return " ".join(patterns[:3]) or "hello"
+
+
+def timed(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup time and memory per loaded response pack.")
+    parser.add_argument("--languages", type=int, default=12, help="synthetic language packs to add")
+    parser.add_argument("--patterns", type=int, default=400, help="patterns per category in each synthetic pack")
+    args = parser.parse_args(argv)
+
+    directory, synthetic = make_pack_dir(args.languages, args.patterns)
+    try:
+        # re caches compiled patterns; purge so every run compiles afresh
+        def lazy():
+            re.purge()
+            model = build_model(directory)
+            model.analyzer.analyze("hello")
+            return model
+
+        def eager():
+            re.purge()
+            model = build_model(directory)
+            for language in model.packs.available():
+                model.analyzer.analyze("hello", language)
+            return model
+
+        lazy_time, model = timed(lazy)
+        eager_time, _ = timed(eager)
+        print(f"packs on disk: {len(model.packs.available())} "
+              f"({args.languages} synthetic x {args.patterns * 6} patterns)")
+        print(f"startup, lazy (default pack only): {lazy_time * 1e3:8.2f} ms")
+        print(f"startup, eager (every pack):       {eager_time * 1e3:8.2f} ms")
+
+        languages = ["pidgin"] + synthetic[:5]
+        print("\nfirst use of each language:")
+        print(f"{'language':>10} {'first msg ms':>13} {'next msg us':>12} {'KiB held':>10}")
+        # Timings and memory come from separate runs: tracemalloc slows
+        # allocation-heavy work such as regex compilation several times over
+        timings = {}
+        model = build_model(directory)
+        model.analyzer.analyze("hello")
+        for language in languages:
+            forced = None if language == "pidgin" else language
+            re.purge()
+            start = time.perf_counter()
+            text = sample_message(model, language)
+            model.analyzer.analyze(text, forced)
+            first = time.perf_counter() - start
+            steady, _ = timed(lambda: model.analyzer.analyze(text, forced), repeat=1000)
+            timings[language] = first, steady
+
+        tracemalloc.start()
+        model = build_model(directory)
+        model.analyzer.analyze("hello")
+        for language in languages:
+            before = tracemalloc.get_traced_memory()[0]
+            model.analyzer.analyze(sample_message(model, language), None if language == "pidgin" else language)
+            held = tracemalloc.get_traced_memory()[0] - before
+            first, steady = timings[language]
+            print(f"{language:>10} {first * 1e3:13.2f} {steady * 1e6:12.1f} {held / 1024:10.1f}")
+        tracemalloc.stop()
+
+        path = model.packs.path(cultural_responses.DEFAULT_LANGUAGE)
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        data["categories"]["greetings"]["responses"].append("Reloaded greeting.")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+        model = build_model(directory, check_interval=0)
+        model.analyzer.analyze("hello")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1))
+        start = time.perf_counter()
+        model.analyzer.analyze("hello")
+        reload_time = time.perf_counter() - start
+        reloaded = "Reloaded greeting." in model.resolve(cultural_responses.DEFAULT_LANGUAGE, "greetings")[1]
+        print(f"\nhot reload of the default pack: {reload_time * 1e3:.2f} ms (picked up: {reloaded})")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Throughput of the write-behind session recorder against writing each
+# record synchronously on the chat path.
+#
+#   python benchmarks/bench_persistence.py [--records 200000]
+#
+# Each configuration queues the same seeded records as fast as one thread
+# can, then closes the recorder, which flushes everything queued. Reported:
+# the caller's cost per record() (what the chat path pays), end-to-end
+# records/sec until the last record is committed, and records dropped
+# because the queue bound was hit. "per-record commit" is the naive
+# alternative, one INSERT and a synced commit per message, timed on fewer
+# records because it is orders of magnitude slower.
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine.persistence import INSERT, SessionRecorder, hash_session_id, open_database, session_salt
+
+LANGUAGES = ["english", "pidgin"]
+CATEGORIES = ["greetings", "academic_stress", "anxiety", "depression", "relationships", "financial_stress", "crisis"]
+MOODS = ["good", "okay", "bad"]
+
+
+def build_records(count, sessions=2000, seed=3):
+    rng = random.Random(seed)
+    return [
+        (f"session-{rng.randrange(sessions)}", rng.choice(LANGUAGES), rng.choice(CATEGORIES), rng.choice(MOODS),
+         rng.random() < 0.05, "x" * rng.randint(2, 200))
+        for _ in range(count)
+    ]
+
+
+def write_behind(path, records, **options):
+    recorder = SessionRecorder(path, **options)
+    record = recorder.record
+    started = time.perf_counter()
+    for args in records:
+        record(*args)
+    queued = time.perf_counter() - started
+    recorder.close()
+    elapsed = time.perf_counter() - started
+    stored = sqlite3.connect(path).execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    return queued, elapsed, recorder.dropped, stored
+
+
+def per_record_commit(path, records):
+    connection = open_database(path, fsync_interval=0)
+    salt = session_salt(connection)
+    started = time.perf_counter()
+    for session_id, language, category, mood, is_crisis, text in records:
+        connection.execute("BEGIN")
+        connection.execute(INSERT, (hash_session_id(session_id, salt), time.time(), language, category, mood,
+                                    int(is_crisis), len(text), None))
+        connection.execute("COMMIT")
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return elapsed, elapsed, 0, len(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Records/sec of the write-behind SQLite session recorder.")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--sync-records", type=int, default=2000, help="records for the per-record commit baseline")
+    args = parser.parse_args(argv)
+
+    records = build_records(args.records)
+    configurations = [
+        ("batch 500, fsync 5s", {"batch_size": 500, "fsync_interval": 5.0, "max_pending": args.records}),
+        ("batch 100, fsync 5s", {"batch_size": 100, "fsync_interval": 5.0, "max_pending": args.records}),
+        ("batch 2000, fsync 5s", {"batch_size": 2000, "fsync_interval": 5.0, "max_pending": args.records}),
+        ("batch 500, fsync each", {"batch_size": 500, "fsync_interval": 0, "max_pending": args.records}),
+        ("batch 500, default bound", {"batch_size": 500, "fsync_interval": 5.0}),
+    ]
+    print(f"{'configuration':>26} {'records':>8} {'record() ns':>12} {'records/sec':>12} {'dropped':>8} {'stored':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [(name, lambda path, options=options: write_behind(path, records, **options))
+                for name, options in configurations]
+        runs.append(("per-record commit", lambda path: per_record_commit(path, records[:args.sync_records])))
+        for index, (name, run) in enumerate(runs):
+            queued, elapsed, dropped, stored = run(os.path.join(directory, f"run{index}.db"))
+            count = stored + dropped
+            print(f"{name:>26} {count:8d} {queued / count * 1e9:12.0f} {stored / elapsed:12,.0f} "
+                  f"{dropped:8d} {stored:8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# Script execution time per chat interaction in the Streamlit app.
+#
+#   git show HEAD~1:talksafe.py > /tmp/talksafe_before.py
+#   python benchmarks/bench_render.py /tmp/talksafe_before.py talksafe.py 2>/dev/null
+#
+# (AppTest runs Streamlit in bare mode, which logs warnings on every run.)
+#
+# Drives each script with Streamlit's AppTest: one initial run, then a
+# quick-help button click per interaction. "full run" is the wall time of
+# each AppTest run, which always executes the whole script (including any
+# st.rerun() the script requests). Scripts that record their own
+# "chat pane" timings in st.session_state.render_timings also report that
+# figure, which is what a live server executes per interaction once the
+# pane runs as a fragment.
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(script, interactions):
+    app = AppTest.from_file(script, default_timeout=60)
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{script}: {app.exception}")
+    full = []
+    for index in range(interactions):
+        button = app.button(key=f"quick_{index % 4}")
+        start = time.perf_counter()
+        button.click().run()
+        full.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(f"{script}: {app.exception}")
+    timings = app.session_state["render_timings"] if "render_timings" in app.session_state else []
+    pane = [seconds for name, seconds in timings if name == "chat pane"][-interactions:]
+    return full, pane
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-interaction execution time of the Streamlit app.")
+    parser.add_argument("scripts", nargs="*", default=[os.path.join(ROOT, "talksafe.py")])
+    parser.add_argument("--interactions", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    print(f"{'script':>32} {'full run p50 ms':>16} {'p90 ms':>8} {'chat pane p50 ms':>17} {'p90 ms':>8}")
+    for script in args.scripts:
+        full, pane = measure(os.path.abspath(script), args.interactions)
+        pane_p50 = f"{statistics.median(pane) * 1e3:17.2f}" if pane else f"{'-':>17}"
+        pane_p90 = f"{percentile(pane, 0.9) * 1e3:8.2f}" if pane else f"{'-':>8}"
+        print(f"{os.path.basename(script):>32} {statistics.median(full) * 1e3:16.2f} "
+              f"{percentile(full, 0.9) * 1e3:8.2f} {pane_p50} {pane_p90}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# Accuracy and added latency of the semantic fallback for messages that no
+# category pattern matches.
+#
+#   python benchmarks/bench_semantic.py [--messages 20000]
+#
+# Accuracy is end-to-end category accuracy on benchmarks/semantic_eval.jsonl,
+# held-out messages written apart from the packs' examples. Entries labelled
+# "greetings" include small talk and noise, which should keep the default
+# category. Accuracy is reported with the fallback off, with it on at the
+# shipped threshold, and across a sweep of thresholds. Latency is the time
+# SemanticIndex.nearest() adds to each message that reaches it. It is
+# measured over a corpus of the eval messages with random casing and
+# punctuation.
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine.langid import LanguageIdentifier
+from talksafe_engine.model import ResponderModel
+from talksafe_engine.packs import PackStore
+from talksafe_engine.semantic import SEMANTIC_THRESHOLD, SemanticFallback
+
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "semantic_eval.jsonl")
+
+
+def load_eval():
+    with open(EVAL_PATH, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def build_analyzer(identifier, fallback):
+    return ResponderModel(
+        PackStore(),
+        cultural_responses.CRISIS_KEYWORDS,
+        cultural_responses.SEVERITY_INDICATORS,
+        cultural_responses.LANGUAGE_INDICATORS,
+        cultural_responses.POSITIVE_WORDS,
+        cultural_responses.NEGATIVE_WORDS,
+        language_identifier=identifier,
+        semantic_fallback=fallback,
+    ).analyzer
+
+
+def accuracy(analyzer, rows):
+    hits = sum(analyzer.analyze(row["text"], row["language"]).category == row["category"] for row in rows)
+    return hits / len(rows)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the semantic category fallback.")
+    parser.add_argument("--messages", type=int, default=20000, help="messages in the latency corpus")
+    args = parser.parse_args(argv)
+
+    rows = load_eval()
+    identifier = LanguageIdentifier.from_corpus()
+    fallback = SemanticFallback()
+    analyzer = build_analyzer(identifier, fallback)
+    start = time.perf_counter()
+    indexes = {language: fallback.index(PackStore().get(language)) for language in ("english", "pidgin")}
+    build_ms = (time.perf_counter() - start) * 1e3
+    for language, index in indexes.items():
+        print(f"{language} index: {index.documents} documents, {len(index.vocabulary)} features, "
+              f"{index.columns.nbytes / 1024:.0f} KiB")
+    print(f"index build: {build_ms:.1f} ms for both packs")
+
+    print(f"\ncategory accuracy on {len(rows)} held-out messages:")
+    print(f"{'fallback off':>22}: {accuracy(build_analyzer(identifier, None), rows):.3f}")
+    print(f"{f'on, threshold {SEMANTIC_THRESHOLD}':>22}: {accuracy(analyzer, rows):.3f}")
+    for threshold in (0.1, 0.15, 0.25, 0.3, 0.4):
+        sweep = build_analyzer(identifier, SemanticFallback(threshold))
+        print(f"{f'threshold {threshold}':>22}: {accuracy(sweep, rows):.3f}")
+    misses = [(row["text"], analyzer.analyze(row["text"], row["language"]).category, row["category"]) for row in rows]
+    for text, got, expected in misses:
+        if got != expected:
+            print(f"  miss: {text!r} -> {got} (expected {expected})")
+
+    rng = random.Random(13)
+    corpus = []
+    for _ in range(args.messages):
+        row = rng.choice(rows)
+        text = row["text"].capitalize() if rng.random() < 0.3 else row["text"]
+        corpus.append((row["language"], (text + rng.choice(("", "!", "...", " o", " 😔"))).lower()))
+    latencies = []
+    clock = time.perf_counter_ns
+    for language, text in corpus:
+        index = indexes[language]
+        started = clock()
+        index.nearest(text)
+        latencies.append(clock() - started)
+    latencies.sort()
+    print(f"\nnearest() on {len(corpus)} messages: mean {sum(latencies) / len(latencies) / 1e3:.1f} us, "
+          f"p50 {percentile(latencies, 0.5) / 1e3:.1f} us, p99 {percentile(latencies, 0.99) / 1e3:.1f} us, "
+          f"max {latencies[-1] / 1e3:.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# Memory held by N simulated sessions, before and after sharing the model.
+#
+#   python benchmarks/bench_sessions.py [N ...]
+#
+# "before" rebuilds what every Streamlit session used to hold: its own copy of
+# the response tables (st.cache_data hands each caller a fresh unpickled copy)
+# plus a CrisisDetector with its own keyword lists. "after" is a
+# CulturalResponder pointing at one shared ResponderModel.
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine.model import build_model
+from talksafe_engine.responder import CulturalResponder
+
+TURNS = ["hello", "I have an exam tomorrow", "how far, school wahala dey", "I feel anxious and overwhelmed"]
+
+
+class LegacyCrisisDetector:
+    def __init__(self):
+        self.crisis_keywords = list(cultural_responses.CRISIS_KEYWORDS)
+        self.severity_indicators = list(cultural_responses.SEVERITY_INDICATORS)
+
+
+class LegacySession:
+    def __init__(self, pickled_tables):
+        self.responses = pickle.loads(pickled_tables)
+        self.crisis_detector = LegacyCrisisDetector()
+        self.conversation_context = []
+        self.user_mood_history = []
+
+
+def measure(factory, sessions):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    held = [factory() for _ in range(sessions)]
+    for session in held:
+        for turn in TURNS:
+            # Same conversation state on both sides so only the static part differs
+            session.conversation_context.append({"input": turn, "response": turn, "mood": "okay"})
+            session.user_mood_history.append("okay")
+    current = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del held
+    return current
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]
+    pickled_tables = pickle.dumps(cultural_responses.load_cultural_responses())
+
+    tracemalloc.start()
+    model = build_model()
+    model_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"shared model: {model_bytes / 1024:.1f} KiB, built once per process")
+
+    print(f"{'sessions':>9} {'before KiB':>11} {'after KiB':>10} {'B/session before':>17} {'B/session after':>16}")
+    for sessions in counts:
+        before = measure(lambda: LegacySession(pickled_tables), sessions)
+        after = measure(lambda: CulturalResponder(model), sessions)
+        print(f"{sessions:>9} {before / 1024:>11.1f} {after / 1024:>10.1f} "
+              f"{before / sessions:>17.0f} {after / sessions:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# Load test for the async chat API, playing the role of an SMS/WhatsApp
+# gateway that relays many concurrent conversations.
+#
+#   python benchmarks/load_test.py --sessions 1000 --messages 10
+#   python benchmarks/load_test.py --transport ws --url 127.0.0.1:8080
+#   python benchmarks/load_test.py --workers 1 2 4
+#
+# Without --url a server is started in a subprocess on a free port, so the
+# client and server do not share an event loop. Every simulated session keeps
+# one connection open and sends its messages back to back; the report gives
+# p50/p90/p99 latency and requests/sec as JSON.
+#
+# --workers runs the load once per worker count against that many server
+# processes sharing one --session-db file, with no sticky sessions: over
+# HTTP every message goes to a randomly chosen worker (a WebSocket stays on
+# the worker it connected to). Afterwards each session's snapshot is read
+# back, and a session whose mood history holds fewer turns than it sent is
+# counted under "lost_updates". --url also takes several comma-separated
+# workers that share a session database.
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from talksafe_engine.backends import SQLiteBackend, decode_snapshot
+
+MESSAGES = [
+    "hi",
+    "how far",
+    "I'm feeling anxious and overwhelmed",
+    "I'm stressed about school and my studies",
+    "exam wahala dey worry me",
+    "I'm stressed about money and financial issues",
+    "my boyfriend and I broke up and I feel lonely",
+    "I feel hopeless and tired of everything",
+    "I dey feel anxiety and I no know wetin to do",
+    "good morning, I'm okay today",
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def http_session(workers, session_id, messages, latencies, errors, rng):
+    # One keep-alive connection per worker, opened when first picked
+    connections = {}
+    try:
+        for message in messages:
+            host, port = worker = rng.choice(workers)
+            if worker not in connections:
+                connections[worker] = await asyncio.open_connection(host, port)
+            reader, writer = connections[worker]
+            body = json.dumps({"session_id": session_id, "message": message}).encode("utf-8")
+            request = (
+                f"POST /chat HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1") + body
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n", 1)[0].decode("latin-1"))
+    finally:
+        for _reader, writer in connections.values():
+            writer.close()
+
+
+async def ws_session(workers, session_id, messages, latencies, errors, rng):
+    host, port = rng.choice(workers)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        writer.write((
+            f"GET /ws?session_id={session_id} HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode("latin-1"))
+        head = await reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 101"):
+            errors.append(head.split(b"\r\n", 1)[0].decode("latin-1"))
+            return
+        for message in messages:
+            payload = message.encode("utf-8")
+            mask = os.urandom(4)
+            masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+            started = time.perf_counter()
+            writer.write(struct.pack("!BB", 0x81, 0x80 | len(payload)) + mask + masked)
+            _first, second = await reader.readexactly(2)
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+            reply = json.loads(await reader.readexactly(length))
+            latencies.append(time.perf_counter() - started)
+            if "error" in reply:
+                errors.append(reply["error"])
+        writer.write(struct.pack("!BB", 0x88, 0x80) + os.urandom(4))
+    finally:
+        writer.close()
+
+
+async def run_load(workers, transport, sessions, messages_per_session, seed):
+    rng = random.Random(seed)
+    latencies = []
+    errors = []
+    client = ws_session if transport == "ws" else http_session
+    conversations = [
+        (f"loadtest-{index}", [rng.choice(MESSAGES) for _ in range(messages_per_session)])
+        for index in range(sessions)
+    ]
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(client(workers, session_id, messages, latencies, errors, random.Random(f"{seed}:{session_id}"))
+          for session_id, messages in conversations),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+    errors.extend(repr(result) for result in results if isinstance(result, Exception))
+
+    latencies.sort()
+    return {
+        "transport": transport,
+        "workers": len(workers),
+        "sessions": sessions,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1e3, 3),
+            "p90": round(percentile(latencies, 0.90) * 1e3, 3),
+            "p99": round(percentile(latencies, 0.99) * 1e3, 3),
+            "max": round(latencies[-1] * 1e3, 3) if latencies else 0.0,
+        },
+    }
+
+
+def start_server(seed, session_db=None):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # Sessions send back to back, far above any per-session rate limit
+    command = [sys.executable, "-m", "talksafe_engine.server", "--port", str(port), "--seed", str(seed),
+               "--rate-limit", "0"]
+    if session_db:
+        command += ["--session-db", session_db]
+    process = subprocess.Popen(command, cwd=ROOT, stderr=subprocess.PIPE)
+    # The server prints its address once it is accepting connections
+    process.stderr.readline()
+    return process, port
+
+
+def lost_updates(session_db, sessions, messages_per_session):
+    # Sessions whose saved mood history is missing turns they were sent
+    backend = SQLiteBackend(session_db)
+    try:
+        ids = [f"loadtest-{index}" for index in range(sessions)]
+        rows = backend.load_many(ids)
+    finally:
+        backend.close()
+    lost = 0
+    for session_id in ids:
+        row = rows.get(session_id)
+        recorded = sum(decode_snapshot(row[1])["mood"][3]) if row is not None else 0
+        lost += recorded < messages_per_session
+    return lost
+
+
+def run_workers(count, args):
+    processes = []
+    with tempfile.TemporaryDirectory() as directory:
+        session_db = os.path.join(directory, "sessions.db")
+        try:
+            for _ in range(count):
+                processes.append(start_server(args.seed, session_db))
+            workers = [("127.0.0.1", port) for _process, port in processes]
+            report = asyncio.run(run_load(workers, args.transport, args.sessions, args.messages, args.seed))
+        finally:
+            for process, _port in processes:
+                process.terminate()
+                process.wait()
+        report["lost_updates"] = lost_updates(session_db, args.sessions, args.messages)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the TalkSafe chat API.")
+    parser.add_argument("--url", help="host:port of a running server, or several comma-separated (default: start one)")
+    parser.add_argument("--transport", choices=["http", "ws"], default="http")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=10, help="messages per session")
+    parser.add_argument("--seed", type=int, default=1, help="seeds both the traffic and the server's replies")
+    parser.add_argument("--workers", type=int, nargs="+", metavar="N",
+                        help="worker counts to compare, each run against a fresh shared session database")
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        reports = [run_workers(count, args) for count in args.workers]
+        base = reports[0]["requests_per_sec"] / args.workers[0]
+        for report in reports:
+            report["scaling"] = round(report["requests_per_sec"] / (base * report["workers"]), 3) if base else 0.0
+        print(json.dumps(reports, indent=2))
+        return 0
+
+    process = None
+    if args.url:
+        workers = []
+        for address in args.url.split(","):
+            host, _, port = address.rpartition(":")
+            workers.append((host, int(port)))
+    else:
+        process, port = start_server(args.seed)
+        workers = [("127.0.0.1", port)]
+    try:
+        report = asyncio.run(run_load(workers, args.transport, args.sessions, args.messages, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+# Reproducible benchmark suite for the TalkSafe engine. Run from the
+# repository root:
+#
+#   python -m benchmarks.suite --output baseline.json
+#   python -m benchmarks.suite --compare baseline.json
+#   python -m benchmarks.suite --cases analyze generate_response --seed 3
+#   python -m benchmarks.suite --dump-corpus /tmp/corpus.jsonl
+#
+# A seeded generator writes synthetic English and Pidgin conversations from
+# the response packs' patterns, with code-switching, crisis disclosures and
+# noise. The messages are interleaved across conversations and replayed
+# through each stage (language identification, analysis uncached and behind
+# a cold AnalysisCache, CrisisDetector,
+# crisis scoring, reply selection), the full generate_response path and the
+# API's session flow. For each stage the report gives throughput, latency
+# percentiles and tracemalloc peak memory as JSON. It records a digest of
+# the corpus, so --compare only accepts baselines taken on identical input.
+from benchmarks.suite.cases import CASES
+from benchmarks.suite.corpus import generate_conversations
+from benchmarks.suite.runner import compare, run_case, run_suite
+
+__all__ = ["CASES", "compare", "generate_conversations", "run_case", "run_suite"]
@@ -0,0 +1,50 @@
+import argparse
+import json
+import sys
+
+from benchmarks.suite.cases import CASES
+from benchmarks.suite.corpus import generate_conversations, write_corpus
+from benchmarks.suite.runner import TOLERANCE, compare, print_table, run_suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite",
+                                     description="Reproducible TalkSafe benchmarks on a seeded synthetic corpus.")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="cases to run (default: all)")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=12, help="messages per conversation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes per case; the fastest is reported")
+    parser.add_argument("--packs-dir", help="response packs to load instead of the bundled ones")
+    parser.add_argument("--output", metavar="PATH", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="exit 1 if this run regresses against a saved report")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative regression")
+    parser.add_argument("--dump-corpus", metavar="PATH", help="write the generated corpus as JSONL and exit")
+    args = parser.parse_args(argv)
+
+    if args.dump_corpus:
+        write_corpus(generate_conversations(args.conversations, args.turns, args.seed), args.dump_corpus)
+        return 0
+
+    report = run_suite(args.cases, args.conversations, args.turns, args.seed, args.repeat, args.packs_dir)
+    print_table(report)
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(encoded + "\n")
+    else:
+        print(encoded)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            problems = compare(json.load(handle), report, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            return 1
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
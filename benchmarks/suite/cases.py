@@ -0,0 +1,104 @@
+from talksafe_engine.cache import AnalysisCache
+from talksafe_engine.crisis import CrisisScorer
+from talksafe_engine.model import ResponderModel
+from talksafe_engine.responder import CrisisDetector, CulturalResponder
+from talksafe_engine.selector import ResponseSelector, session_seed
+from talksafe_engine.server import ChatService
+from talksafe_engine.sessions import CONTEXT_LIMIT
+
+# Each case takes (model, turns, seed), where turns is the interleaved
+# corpus of (session index, message) pairs, and returns (step, calls): the
+# runner times step(*args) once per args tuple in calls. Anything a stage
+# needs from earlier stages (analyses, categories) is computed here, outside
+# the timed calls, and per-session state is built fresh on every call to the
+# case, so repeated runs start from the same state.
+
+
+def language(model, turns, seed):
+    identify = model.analyzer.identify_language
+    return identify, [(message["text"].lower(),) for _session, message in turns]
+
+
+def analyze(model, turns, seed):
+    return model.analyzer.analyze, [(message["text"],) for _session, message in turns]
+
+
+def analyze_cached(model, turns, seed):
+    # analyze() behind a fresh AnalysisCache on every call, so each run
+    # starts cold and hits only where the corpus itself repeats messages
+    cached = ResponderModel(model.packs, model.crisis_keywords, model.severity_indicators, model.language_indicators,
+                            model.positive_words, model.negative_words, model.language_identifier,
+                            model.semantic_fallback, AnalysisCache())
+    # Compile both languages' matchers outside the timed calls
+    for text in ("hello", "how far"):
+        cached.analyzer.analyze(text)
+    cached.analysis_cache.clear()
+    return cached.analyzer.analyze, [(message["text"],) for _session, message in turns]
+
+
+def crisis_detector(model, turns, seed):
+    return CrisisDetector(model).detect_crisis, [(message["text"],) for _session, message in turns]
+
+
+def crisis_scorer(model, turns, seed):
+    scorers = {}
+
+    def step(session, analysis):
+        scorer = scorers.get(session)
+        if scorer is None:
+            scorer = scorers[session] = CrisisScorer(CONTEXT_LIMIT)
+        return scorer.update(analysis)
+
+    analyzer = model.analyzer
+    return step, [(session, analyzer.analyze(message["text"])) for session, message in turns]
+
+
+def selection(model, turns, seed):
+    selectors = {}
+    resolve = model.resolve
+
+    def step(session, language, category):
+        selector = selectors.get(session)
+        if selector is None:
+            selector = selectors[session] = ResponseSelector(session_seed(seed, str(session)))
+        return selector.choose(resolve(language, category))
+
+    calls = []
+    for session, message in turns:
+        analysis = model.analyzer.analyze(message["text"])
+        calls.append((session, analysis.language, "crisis" if analysis.is_crisis else analysis.category))
+    return step, calls
+
+
+def generate_response(model, turns, seed):
+    # The full per-message path of one CulturalResponder per conversation
+    responders = {}
+
+    def step(session, text):
+        responder = responders.get(session)
+        if responder is None:
+            responder = responders[session] = CulturalResponder(model, session_seed(seed, str(session)))
+        return responder.generate_response(text)
+
+    return step, [(session, message["text"]) for session, message in turns]
+
+
+def session_flow(model, turns, seed):
+    # What the API does per request: validate, look up or create the
+    # session in the bounded store, admit the message, then respond. The
+    # bucket is sized never to run dry, so every turn pays for admission
+    # but none is refused.
+    service = ChatService(model, seed=seed, rate=1e9, burst=1e9)
+    return service.reply, [(f"session-{session}", message["text"]) for session, message in turns]
+
+
+CASES = {
+    "language": language,
+    "analyze": analyze,
+    "analyze_cached": analyze_cached,
+    "crisis_detector": crisis_detector,
+    "crisis_scorer": crisis_scorer,
+    "selection": selection,
+    "generate_response": generate_response,
+    "session_flow": session_flow,
+}
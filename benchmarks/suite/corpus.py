@@ -0,0 +1,152 @@
+import hashlib
+import json
+import random
+
+from talksafe_engine import responses as cultural_responses
+
+# Share of messages, per turn, that are crisis disclosures or noise; the rest
+# talk about one of the language's topic categories
+CRISIS_SHARE = 0.05
+NOISE_SHARE = 0.1
+# Share of conversations held in Pidgin, and chance per turn that a speaker
+# switches to the other language for one message
+PIDGIN_SHARE = 0.4
+CODE_SWITCH = 0.1
+# Chance per turn of staying on the previous topic
+TOPIC_STICKINESS = 0.6
+
+TEMPLATES = {
+    "english": [
+        "{pattern}",
+        "I'm dealing with {pattern} right now",
+        "honestly the {pattern} thing is getting to me",
+        "can we talk about {pattern}?",
+        "{opener} I keep thinking about {pattern}",
+        "I don't know what to do about {pattern} and it's {mood}",
+        "my friend said it's just {pattern} but I feel {mood}",
+    ],
+    "pidgin": [
+        "{pattern}",
+        "{pattern} dey worry me",
+        "{opener} na {pattern} matter o",
+        "abeg, this {pattern} no dey let me rest",
+        "I no fit cope with {pattern} again",
+        "wetin I go do about {pattern}? I dey feel {mood}",
+        "how far, {pattern} don tire me sha",
+    ],
+}
+CRISIS_TEMPLATES = {
+    "english": [
+        "I want to {crisis}",
+        "sometimes I think I should {crisis} {severity}",
+        "I have a {severity} and I want to {crisis}",
+        "everything is too much, I just want to {crisis}",
+    ],
+    "pidgin": [
+        "I wan {crisis}",
+        "e be like say make I {crisis} {severity}",
+        "this life no worth am, I fit {crisis}",
+        "I don tire, I wan {crisis} {severity} o",
+    ],
+}
+OPENERS = {
+    "english": ["hi", "hey", "so", "ugh", "okay", "good evening,"],
+    "pidgin": ["how far", "abeg", "ehen", "omo", "chai", "wetin dey"],
+}
+NOISE = ["lol", "?", "...", "ok", "hmm", "😔", "😂😂", "k", "asdfgh", "👍", "brb", "www", "12345", "!!!"]
+
+
+# Seeded synthetic conversations in English and Pidgin, built from the
+# patterns in the response packs plus the crisis and mood keyword lists.
+# Each conversation is a list of {"language", "kind", "category", "text"}
+# messages, where kind is "topic", "crisis" or "noise" and category is the
+# topic the message was written around (None for noise). The same arguments
+# always give the same corpus.
+def generate_conversations(conversations=200, turns=12, seed=0, pidgin_share=PIDGIN_SHARE,
+                           crisis_share=CRISIS_SHARE, noise_share=NOISE_SHARE, code_switch=CODE_SWITCH):
+    rng = random.Random(seed)
+    packs = cultural_responses.load_cultural_responses()
+    topics = {
+        language: {category: data["patterns"] for category, data in categories.items() if category != "crisis"}
+        for language, categories in packs.items()
+    }
+    moods = cultural_responses.POSITIVE_WORDS + cultural_responses.NEGATIVE_WORDS
+
+    corpus = []
+    for _ in range(conversations):
+        home = "pidgin" if rng.random() < pidgin_share else "english"
+        topic = None
+        conversation = []
+        for _ in range(turns):
+            language = home
+            if rng.random() < code_switch:
+                language = "english" if home == "pidgin" else "pidgin"
+            roll = rng.random()
+            if roll < crisis_share:
+                kind, category = "crisis", "crisis"
+                text = rng.choice(CRISIS_TEMPLATES[language]).format(
+                    crisis=rng.choice(cultural_responses.CRISIS_KEYWORDS),
+                    severity=rng.choice(cultural_responses.SEVERITY_INDICATORS))
+            elif roll < crisis_share + noise_share:
+                kind, category = "noise", None
+                text = " ".join(rng.choice(NOISE) for _ in range(rng.randint(1, 3)))
+            else:
+                kind = "topic"
+                if topic not in topics[language] or rng.random() >= TOPIC_STICKINESS:
+                    topic = rng.choice(sorted(topics[language]))
+                category = topic
+                text = rng.choice(TEMPLATES[language]).format(
+                    pattern=rng.choice(topics[language][topic]),
+                    opener=rng.choice(OPENERS[language]),
+                    mood=rng.choice(moods))
+            text = _perturb(rng, text)
+            conversation.append({"language": language, "kind": kind, "category": category, "text": text})
+        corpus.append(conversation)
+    return corpus
+
+
+def _perturb(rng, text):
+    # Casing and punctuation people actually type
+    roll = rng.random()
+    if roll < 0.2:
+        text = text.capitalize()
+    elif roll < 0.25:
+        text = text.upper()
+    if rng.random() < 0.3:
+        text += rng.choice(("!", "?", "...", " o", " 😔", " abeg"))
+    return text
+
+
+def interleave(corpus):
+    # (session index, message) pairs in round-robin order, the way turns
+    # from concurrent conversations reach a server
+    turns = []
+    for turn in range(max((len(conversation) for conversation in corpus), default=0)):
+        for session, conversation in enumerate(corpus):
+            if turn < len(conversation):
+                turns.append((session, conversation[turn]))
+    return turns
+
+
+def corpus_digest(corpus):
+    # Fingerprint recorded with each run so results are only compared on identical inputs
+    encoded = json.dumps(corpus, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def summarize(corpus):
+    counts = {"conversations": len(corpus), "messages": 0, "language": {}, "kind": {}}
+    for conversation in corpus:
+        for message in conversation:
+            counts["messages"] += 1
+            for dimension in ("language", "kind"):
+                values = counts[dimension]
+                values[message[dimension]] = values.get(message[dimension], 0) + 1
+    return counts
+
+
+def write_corpus(corpus, path):
+    with open(path, "w", encoding="utf-8") as handle:
+        for session, conversation in enumerate(corpus):
+            for turn, message in enumerate(conversation):
+                handle.write(json.dumps({"session": session, "turn": turn, **message}, ensure_ascii=False) + "\n")
@@ -0,0 +1,148 @@
+import gc
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.suite.cases import CASES
+from benchmarks.suite.corpus import corpus_digest, generate_conversations, interleave, summarize
+from talksafe_engine.model import build_model
+
+try:
+    import numpy as np
+except ImportError:  # the model falls back to indicator substrings
+    np = None
+
+# Results are a versioned JSON document; compare() refuses other versions
+FORMAT_VERSION = 1
+WARMUP_CALLS = 500
+# A case regresses when throughput drops or peak memory grows by more than this
+TOLERANCE = 0.15
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _time_calls(step, calls):
+    # Per-call latencies in ns; the loop itself is the only other cost inside
+    clock = time.perf_counter_ns
+    latencies = [0] * len(calls)
+    for index, args in enumerate(calls):
+        started = clock()
+        step(*args)
+        latencies[index] = clock() - started
+    return latencies
+
+
+def run_case(case, model, turns, seed, repeat=3):
+    # Timing and memory come from separate passes, since tracemalloc slows
+    # every allocation. Each pass builds the case afresh. The timed pass with
+    # the lowest total is reported.
+    step, calls = case(model, turns, seed)
+    _time_calls(step, calls[:WARMUP_CALLS])
+
+    best = None
+    for _ in range(repeat):
+        step, calls = case(model, turns, seed)
+        gc.collect()
+        started = time.perf_counter_ns()
+        latencies = _time_calls(step, calls)
+        elapsed = time.perf_counter_ns() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, latencies)
+    elapsed, latencies = best
+    latencies.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    step, calls = case(model, turns, seed)
+    after_setup = tracemalloc.get_traced_memory()[0]
+    _time_calls(step, calls)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del step, calls
+
+    return {
+        "calls": len(latencies),
+        "seconds": round(elapsed / 1e9, 6),
+        "throughput_per_sec": round(len(latencies) / (elapsed / 1e9), 1) if elapsed else 0.0,
+        "latency_us": {
+            "mean": round(sum(latencies) / len(latencies) / 1e3, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.5) / 1e3, 3),
+            "p90": round(percentile(latencies, 0.9) / 1e3, 3),
+            "p99": round(percentile(latencies, 0.99) / 1e3, 3),
+            "max": round(latencies[-1] / 1e3, 3) if latencies else 0.0,
+        },
+        "memory_bytes": {
+            # peak is from before the case's setup, so per-session state counts
+            "peak": peak - baseline,
+            "setup": after_setup - baseline,
+            "retained": current - baseline,
+        },
+    }
+
+
+def run_suite(names=None, conversations=200, turns=12, seed=0, repeat=3, packs_dir=None):
+    corpus = generate_conversations(conversations, turns, seed)
+    interleaved = interleave(corpus)
+    started = time.perf_counter()
+    # Without the analysis cache, so every case times the work itself and
+    # repeats do not just replay the first run; analyze_cached measures it
+    model = build_model(packs_dir, cache_entries=0)
+    model_seconds = time.perf_counter() - started
+
+    results = {}
+    for name in names or CASES:
+        results[name] = run_case(CASES[name], model, interleaved, seed, repeat)
+    return {
+        "format": FORMAT_VERSION,
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__ if np is not None else None,
+            "language_identifier": model.language_identifier is not None,
+        },
+        "corpus": {"seed": seed, "digest": corpus_digest(corpus), **summarize(corpus)},
+        "model_build_seconds": round(model_seconds, 4),
+        "cases": results,
+    }
+
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    # Regressions of current against baseline, as human-readable lines.
+    # Latency percentiles are reported but not gated: on shared machines the
+    # tail moves too much between runs to fail a build on.
+    if baseline.get("format") != current.get("format"):
+        return [f"result format {baseline.get('format')} != {current.get('format')}, not comparable"]
+    problems = []
+    if baseline["corpus"]["digest"] != current["corpus"]["digest"]:
+        problems.append(f"corpus differs ({baseline['corpus']['digest']} vs {current['corpus']['digest']}); "
+                        "rerun with the baseline's --seed, --conversations and --turns")
+        return problems
+    for name, now in current["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            continue
+        ratio = now["throughput_per_sec"] / before["throughput_per_sec"] if before["throughput_per_sec"] else 1.0
+        if ratio < 1 - tolerance:
+            problems.append(f"{name}: throughput {before['throughput_per_sec']:,.0f} -> "
+                            f"{now['throughput_per_sec']:,.0f}/s ({(ratio - 1) * 100:+.1f}%)")
+        peak_before, peak_now = before["memory_bytes"]["peak"], now["memory_bytes"]["peak"]
+        if peak_before and peak_now > peak_before * (1 + tolerance):
+            problems.append(f"{name}: peak memory {peak_before:,} -> {peak_now:,} bytes "
+                            f"({(peak_now / peak_before - 1) * 100:+.1f}%)")
+    return problems
+
+
+def print_table(report, stream=sys.stderr):
+    print(f"{'case':>18} {'calls/s':>12} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'peak KiB':>10}", file=stream)
+    for name, result in report["cases"].items():
+        latency = result["latency_us"]
+        print(f"{name:>18} {result['throughput_per_sec']:12,.0f} {latency['p50']:9.2f} {latency['p90']:9.2f} "
+              f"{latency['p99']:9.2f} {result['memory_bytes']['peak'] / 1024:10.1f}", file=stream)
@@ -1,9 +1,35 @@
 import streamlit as st
-import json
-import random
-import re
-from datetime import datetime, timedelta
-import hashlib
+import html
+import time
+import atexit
+import os
+import secrets
+
+from talksafe_engine.backends import SharedSessions, SQLiteBackend, SessionConflict, decode_snapshot
+from talksafe_engine.escalation import EscalationQueue, FileSink, HttpSink
+from talksafe_engine.intake import LIMITED, Submission, SubmissionGuard, TokenBucket
+from talksafe_engine.metrics import METRICS
+from talksafe_engine.model import build_model
+from talksafe_engine.persistence import SessionRecorder
+from talksafe_engine.responder import CulturalResponder
+from talksafe_engine.responses import QUICK_ACTIONS
+from talksafe_engine.sessions import MAX_MESSAGES, ring
+
+script_started = time.perf_counter()
+
+# Pipeline metrics are process-wide, so the debug panel only offers to switch
+# them when the operator sets TALKSAFE_METRICS_ADMIN; otherwise they stay as
+# TALKSAFE_METRICS set them at startup and any visitor can only read them
+METRICS_ADMIN = os.environ.get("TALKSAFE_METRICS_ADMIN", "").lower() in ("1", "true", "yes", "on")
+
+# With shared sessions, a page load resumes the conversation named by ?sid=
+# only when the operator sets TALKSAFE_URL_RESUME. The id in the URL is the
+# conversation's only credential: anyone who gets the link (browser history,
+# a shared or synced device, a screenshot, proxy or access logs, and the
+# escalation webhook, whose alerts carry the id) can read the conversation
+# back and continue it. Without the flag no id is put in the
+# URL, any ?sid= is ignored, and a reload starts a new conversation.
+URL_RESUME = os.environ.get("TALKSAFE_URL_RESUME", "").lower() in ("1", "true", "yes", "on")
 
 # Page configuration
 st.set_page_config(
@@ -128,212 +154,180 @@ def load_css():
     </style>
     """
 
-# Multilingual response templates with Nigerian cultural context
-@st.cache_data
-def load_cultural_responses():
-    return {
-        "english": {
-            "greetings": {
-                "patterns": ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "how are you"],
-                "responses": [
-                    "Hello! Welcome to TalkSafe. I'm here to listen and support you. How are you feeling today? 🛡️",
-                    "Hi there! This is your safe space to share what's on your mind. What's happening with you today?",
-                    "Hey! I'm glad you're here. Whether you're feeling great or going through a tough time, I'm here to chat. What's up?"
-                ]
-            },
-            "academic_stress": {
-                "patterns": ["exam", "test", "study", "school", "university", "assignment", "project", "result", "grade", "academic"],
-                "responses": [
-                    "Academic pressure can be really overwhelming, especially in our Nigerian universities. Remember, your grades don't define your worth as a person. Have you tried breaking your study time into smaller chunks? Maybe 30 minutes study, 10 minutes break?",
-                    "I understand exam stress can feel like too much. Many Nigerian students face this same challenge. Consider reaching out to your departmental counselor or academic advisor - they're there to help you succeed, not judge you.",
-                    "School wahala can really stress someone out! But you know what? You've made it this far, which shows you're stronger than you think. What specific subject or assignment is giving you the most trouble right now?"
-                ]
-            },
-            "anxiety": {
-                "patterns": ["anxious", "anxiety", "worry", "nervous", "panic", "overwhelmed", "scared", "fear"],
-                "responses": [
-                    "Anxiety can feel really overwhelming, but you're not alone in this. Many Nigerian students experience this. Let's try a quick breathing exercise: breathe in for 4 counts, hold for 4, breathe out for 6. Can you try this with me?",
-                    "I hear you. Anxiety can make everything feel too much. In our culture, we sometimes feel pressure to 'be strong' all the time, but it's okay to acknowledge when you're struggling. What's been triggering your anxiety lately?",
-                    "Feeling anxious is completely normal, especially with all the pressures of university life in Nigeria. Your feelings are valid. Have you tried talking to a trusted friend or family member about what you're experiencing?"
-                ]
-            },
-            "depression": {
-                "patterns": ["depressed", "sad", "hopeless", "empty", "worthless", "tired", "down", "heavy heart"],
-                "responses": [
-                    "I'm really glad you felt comfortable sharing this with me. Depression can make everything feel heavy and difficult. You're not alone, and seeking help shows incredible strength. How have you been taking care of yourself lately?",
-                    "Thank you for trusting me with these feelings. Depression affects many Nigerian students, but there's often shame around discussing it. You're brave for reaching out. What's been the hardest part of your day recently?",
-                    "I hear the pain in your words. Depression can make us feel isolated, but you're not alone. Many students at Nigerian universities experience this. Have you considered speaking with a counselor or therapist?"
-                ]
-            },
-            "relationships": {
-                "patterns": ["relationship", "boyfriend", "girlfriend", "family", "friends", "lonely", "heartbreak", "love"],
-                "responses": [
-                    "Relationship issues can be really tough, especially when balancing them with academic life. In Nigerian culture, we value relationships deeply, which can make conflicts even more painful. What's been weighing on your heart?",
-                    "I understand relationship challenges can feel overwhelming. Whether it's family expectations, romantic relationships, or friendships, these connections are important. Want to talk about what's been troubling you?",
-                    "Relationships can be complicated, especially with the cultural expectations we face as Nigerian students. You don't have to navigate this alone. What's been the biggest challenge in your relationships lately?"
-                ]
-            },
-            "financial_stress": {
-                "patterns": ["money", "financial", "fees", "broke", "pocket money", "school fees", "family pressure"],
-                "responses": [
-                    "Financial stress is real, especially for Nigerian university students. Many of us face these challenges. Have you looked into scholarships, work-study programs, or spoken with your school's financial aid office?",
-                    "Money wahala can really affect our mental health and studies. You're not alone in this struggle. Many Nigerian students face similar challenges. Are there any campus resources or part-time opportunities you could explore?",
-                    "Financial pressure can be overwhelming, particularly when family expectations are involved. Remember, your worth isn't determined by your financial situation. What support systems do you have available right now?"
-                ]
-            },
-            "crisis": {
-                "patterns": ["suicide", "kill myself", "die", "end it all", "hurt myself", "not worth living", "give up"],
-                "responses": [
-                    "🚨 I'm very concerned about you right now. Your life has value and meaning. Please reach out for immediate help: Call the National Emergency Number 112, or contact your university counseling center right away. You don't have to face this alone.",
-                    "🚨 I care about your safety and I'm worried about you. Please connect with someone immediately - a trusted friend, family member, or professional. You can call 112 for emergency services or reach out to your campus counseling center.",
-                    "🚨 Your life matters so much. These feelings can change with proper support. Please reach out to emergency services (112) or your university's counseling center right now. You deserve help and support."
-                ]
-            }
-        },
-        "pidgin": {
-            "greetings": {
-                "patterns": ["wetin dey happen", "how far", "how you dey", "wetin sup", "bawo"],
-                "responses": [
-                    "How far! Welcome to TalkSafe. I dey here to listen to you. How your body dey today? 🛡️",
-                    "Wetin dey sup! This na your safe space to talk wetin dey worry you. How you dey feel today?",
-                    "How you dey! I happy say you dey here. Whether you dey feel good or you get wahala, I dey here to gist with you."
-                ]
-            },
-            "academic_stress": {
-                "patterns": ["exam", "test", "study", "school wahala", "result", "grade"],
-                "responses": [
-                    "Exam stress fit really disturb person o! But no forget say your grade no be wetin define who you be. You don try break your study into small small parts? Like 30 minutes study, 10 minutes rest?",
-                    "I understand say school matter fit dey stress you. Plenty Nigerian students dey face the same thing. You fit try reach your department counselor - dem dey there to help you, no be to judge you.",
-                    "School wahala fit really stress somebody! But you know wetin? You don reach this far, na show say you strong pass how you think. Wetin subject or assignment dey give you more trouble now?"
-                ]
-            },
-            "anxiety": {
-                "patterns": ["anxiety", "dey worry", "fear", "panic", "overwhelmed"],
-                "responses": [
-                    "Anxiety fit really make person feel like say everything too much, but you no dey alone for this matter. Make we try one small breathing exercise: breathe in count 4, hold am count 4, breathe out count 6. You fit try am with me?",
-                    "I hear you. Anxiety fit make everything feel like wahala. For our culture, sometimes we dey feel pressure to 'be strong' all the time, but e dey okay to talk say you dey struggle. Wetin dey trigger your anxiety lately?",
-                    "To dey feel anxious na normal thing, especially with all the pressure for university life for Nigeria. Your feelings dey valid. You don try talk to person wey you trust about wetin you dey experience?"
-                ]
-            }
-        }
-    }
+# Static response tables, keyword lists and compiled analyzer, shared by every
+# session, with the quick-action messages already in its analysis cache
+@st.cache_resource
+def load_responder_model():
+    model = build_model()
+    model.analyzer.warm(message for actions in QUICK_ACTIONS.values() for _label, message in actions)
+    return model
 
-# Crisis detection system
-class CrisisDetector:
-    def __init__(self):
-        self.crisis_keywords = [
-            "suicide", "kill myself", "die", "end it all", "hurt myself", 
-            "not worth living", "give up", "better off dead", "can't go on"
-        ]
-        self.severity_indicators = [
-            "plan", "method", "tonight", "today", "pills", "rope", "bridge"
-        ]
-    
-    def detect_crisis(self, text):
-        text_lower = text.lower()
-        crisis_score = 0
-        
-        for keyword in self.crisis_keywords:
-            if keyword in text_lower:
-                crisis_score += 2
-        
-        for indicator in self.severity_indicators:
-            if indicator in text_lower:
-                crisis_score += 3
-        
-        return crisis_score >= 2
-
-# Intelligent response system with cultural sensitivity
-class CulturalResponder:
-    def __init__(self):
-        self.responses = load_cultural_responses()
-        self.crisis_detector = CrisisDetector()
-        self.conversation_context = []
-        self.user_mood_history = []
-        
-    def detect_language(self, user_input):
-        pidgin_indicators = ["wetin", "dey", "how far", "wahala", "no be", "fit", "make we"]
-        if any(indicator in user_input.lower() for indicator in pidgin_indicators):
-            return "pidgin"
-        return "english"
-    
-    def analyze_mood(self, user_input):
-        positive_words = ["good", "great", "happy", "fine", "better", "okay"]
-        negative_words = ["bad", "terrible", "awful", "depressed", "anxious", "overwhelmed", "stressed"]
-        
-        user_lower = user_input.lower()
-        positive_count = sum(1 for word in positive_words if word in user_lower)
-        negative_count = sum(1 for word in negative_words if word in user_lower)
-        
-        if positive_count > negative_count:
-            return "good"
-        elif negative_count > positive_count:
-            return "bad"
-        return "okay"
-    
-    def get_response_category(self, user_input, language):
-        user_input = user_input.lower()
-        lang_responses = self.responses[language]
-        
-        category_scores = {}
-        for category, data in lang_responses.items():
-            score = 0
-            for pattern in data["patterns"]:
-                if pattern in user_input:
-                    score += len(pattern) * user_input.count(pattern)
-            category_scores[category] = score
-        
-        if max(category_scores.values()) > 0:
-            return max(category_scores, key=category_scores.get)
-        return "greetings"
-    
-    def generate_response(self, user_input):
-        # Detect crisis first
-        is_crisis = self.crisis_detector.detect_crisis(user_input)
-        
-        # Detect language
-        language = self.detect_language(user_input)
-        
-        # Analyze mood
-        mood = self.analyze_mood(user_input)
-        self.user_mood_history.append(mood)
-        
-        # Get appropriate category
-        if is_crisis:
-            category = "crisis"
-        else:
-            category = self.get_response_category(user_input, language)
-        
-        # Generate response
-        lang_responses = self.responses[language]
-        if category in lang_responses:
-            response_data = lang_responses[category]
-            response = random.choice(response_data["responses"])
-        else:
-            # Fallback to English if category not found in pidgin
-            response = random.choice(self.responses["english"]["greetings"]["responses"])
-        
-        # Update conversation context
-        self.conversation_context.append({"input": user_input, "response": response, "mood": mood})
-        if len(self.conversation_context) > 8:
-            self.conversation_context = self.conversation_context[-8:]
-        
-        return response, is_crisis, mood, language
+# Write-behind store of anonymized exchanges, only when TALKSAFE_DB names a
+# SQLite database; one per process, flushed when the server exits
+@st.cache_resource
+def load_session_recorder():
+    path = os.environ.get("TALKSAFE_DB")
+    if not path:
+        return None
+    recorder = SessionRecorder(path)
+    atexit.register(recorder.close)
+    return recorder
+
+# Crisis alerts for counsellors, sent off the chat path, when
+# TALKSAFE_ESCALATION_URL (a webhook) or TALKSAFE_ESCALATION_FILE is set
+@st.cache_resource
+def load_escalation_queue():
+    url = os.environ.get("TALKSAFE_ESCALATION_URL")
+    path = os.environ.get("TALKSAFE_ESCALATION_FILE")
+    if not url and not path:
+        return None
+    escalation = EscalationQueue(HttpSink(url) if url else FileSink(path))
+    atexit.register(escalation.close, 30.0)
+    return escalation
+
+# Conversations kept in a SQLite file shared by every app process, when
+# TALKSAFE_SESSION_DB is set, so a load balancer needs no sticky sessions and
+# a restarted process loses nothing. With URL_RESUME the session id also
+# travels in the URL (?sid=) so whichever process serves the next page load
+# can find the conversation.
+@st.cache_resource
+def load_shared_sessions():
+    path = os.environ.get("TALKSAFE_SESSION_DB")
+    if not path:
+        return None
+    backend = SQLiteBackend(path)
+    atexit.register(backend.close)
+    model = load_responder_model()
+    recorder = load_session_recorder()
+    escalation = load_escalation_queue()
+
+    # Shared sessions record and escalate through `effects`, which replays
+    # the calls once their snapshot has been saved
+    def new(session_id, effects):
+        responder = CulturalResponder(model, None, recorder and effects, session_id, escalation and effects)
+        responder.intake = new_guard()
+        return responder
+
+    def restore(session_id, state, effects):
+        responder = CulturalResponder.restore(model, state, recorder and effects, session_id, escalation and effects)
+        responder.intake = responder.intake or new_guard()
+        return responder
+
+    return SharedSessions(backend, new, restore)
+
+def new_guard():
+    # Per-conversation rate limit; submissions are de-duplicated per tab below
+    return SubmissionGuard(TokenBucket())
+
+def new_responder():
+    # Each conversation gets a fresh random id, stored only as a salted hash
+    st.session_state.session_id = secrets.token_urlsafe(16)
+    if URL_RESUME and load_shared_sessions() is not None:
+        st.query_params["sid"] = st.session_state.session_id
+    responder = CulturalResponder(load_responder_model(), recorder=load_session_recorder(),
+                                  session_id=st.session_state.session_id, escalation=load_escalation_queue())
+    responder.intake = new_guard()
+    return responder
+
+def resume_responder(shared):
+    # The conversation named by ?sid= from the shared store, with its messages
+    # and crisis alert rebuilt from the responder's context; a new one if it is
+    # unknown or expired
+    session_id = st.query_params.get("sid")
+    row = shared.backend.load_many([session_id]).get(session_id) if session_id else None
+    if row is None:
+        return new_responder()
+    st.session_state.session_id = session_id
+    responder = CulturalResponder.restore(load_responder_model(), decode_snapshot(row[1]),
+                                          session_id=session_id)
+    responder.intake = responder.intake or new_guard()
+    for turn in responder.conversation_context:
+        st.session_state.messages.append({"role": "user", "content": turn["input"],
+                                          "html": render_message("user", turn["input"])})
+        st.session_state.messages.append({"role": "assistant", "content": turn["response"],
+                                          "is_crisis": turn["is_crisis"], "mood": turn["mood"],
+                                          "html": render_message("assistant", turn["response"], turn["is_crisis"])})
+        if turn["is_crisis"]:
+            st.session_state.crisis_detected = True
+    return responder
+
+def render_message(role, content, is_crisis=False):
+    # Message HTML is built once, with the text escaped, and reused on every redraw
+    if role == "user":
+        message_class = "user-message"
+    else:
+        message_class = "bot-message crisis-message" if is_crisis else "bot-message"
+    return f'<div class="{message_class}">{html.escape(content)}</div>'
+
+def queue_submission(text):
+    # Widget callbacks run once per user action, before the rerun it causes.
+    # Each submission gets the next sequence number of this tab, and is
+    # processed only while its (seq, content hash) is not the last processed.
+    text = text.strip()
+    if text:
+        st.session_state.submit_seq += 1
+        st.session_state.pending_submission = Submission(text, st.session_state.submit_seq)
+
+def submit_typed():
+    # Clearing the field means a rerun can never hand the same text back
+    queue_submission(st.session_state.user_input)
+    st.session_state.user_input = ""
+
+def respond(responder, user_message):
+    # None when the conversation's rate limit refuses the message
+    if responder.intake is not None and responder.intake.admit(Submission(user_message)) == LIMITED:
+        return None
+    return responder.generate_response(user_message)
+
+def add_exchange(user_message):
+    shared = load_shared_sessions()
+    if shared is None:
+        result = respond(st.session_state.responder, user_message)
+    else:
+        # Runs against the latest saved snapshot, which another process may
+        # have advanced, and saves it back; conflicting writes are retried
+        reply, = shared.run([(st.session_state.session_id, user_message)],
+                            lambda session_id, responder, message: (respond(responder, message), responder),
+                            load_session_recorder(), load_escalation_queue())
+        if isinstance(reply, SessionConflict):
+            st.warning("This conversation is busy in another window - please send that again.")
+            return
+        result, st.session_state.responder = reply
+    if result is None:
+        st.warning("You're sending messages faster than I can keep up. Take a breath and try again in a moment.")
+        return
+    bot_response, is_crisis, mood, detected_lang = result
+    st.session_state.messages.append({"role": "user", "content": user_message,
+                                      "html": render_message("user", user_message)})
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": bot_response,
+        "is_crisis": is_crisis,
+        "mood": mood,
+        "html": render_message("assistant", bot_response, is_crisis),
+    })
+    if is_crisis:
+        st.session_state.crisis_detected = True
+
+MOOD_EMOJI = {"good": "😊", "okay": "😐", "bad": "😔"}
 
 # Initialize session state
 if 'messages' not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = ring(MAX_MESSAGES)
 if 'responder' not in st.session_state:
-    st.session_state.responder = CulturalResponder()
-if 'user_mood_history' not in st.session_state:
-    st.session_state.user_mood_history = []
+    shared_sessions = load_shared_sessions()
+    if shared_sessions is None or not URL_RESUME:
+        st.session_state.responder = new_responder()
+    else:
+        st.session_state.responder = resume_responder(shared_sessions)
 if 'crisis_detected' not in st.session_state:
     st.session_state.crisis_detected = False
-
-# Limit message history
-MAX_MESSAGES = 20
-if len(st.session_state.messages) > MAX_MESSAGES:
-    st.session_state.messages = st.session_state.messages[-MAX_MESSAGES:]
+if 'render_timings' not in st.session_state:
+    st.session_state.render_timings = ring(50)
+if 'submit_seq' not in st.session_state:
+    st.session_state.submit_seq = 0
+    st.session_state.pending_submission = None
+    st.session_state.processed_submission = None
 
 # Load CSS
 st.markdown(load_css(), unsafe_allow_html=True)
@@ -370,19 +364,6 @@ with st.sidebar:
     📱 Text "HELLO" to 741741
     """)
     
-    st.markdown("### 📊 Your Mood Pattern")
-    if st.session_state.user_mood_history:
-        recent_moods = st.session_state.user_mood_history[-5:]
-        mood_display = ""
-        for mood in recent_moods:
-            if mood == "good":
-                mood_display += "😊 "
-            elif mood == "okay":
-                mood_display += "😐 "
-            else:
-                mood_display += "😔 "
-        st.markdown(f"Recent: {mood_display}")
-    
     st.markdown("### 📚 Nigerian Mental Health Resources")
     st.markdown("""
     - [MENTal AwareNG](https://mentalawareng.com)
@@ -392,100 +373,96 @@ with st.sidebar:
     """)
     
     if st.button("🔄 Start New Conversation", key="clear_chat"):
-        st.session_state.messages = []
-        st.session_state.responder = CulturalResponder()
-        st.session_state.user_mood_history = []
+        st.session_state.messages = ring(MAX_MESSAGES)
+        st.session_state.responder = new_responder()
         st.session_state.crisis_detected = False
         st.rerun()
 
-# Main chat interface
-st.markdown('<div class="chat-container">', unsafe_allow_html=True)
+# Chat pane: messages, input, alerts and quick help rerun on their own as a
+# fragment, so an interaction never re-sends the header, CSS or sidebar.
+# Inputs are handled before the messages are drawn into the container above
+# them, so a new message shows up in the same run without st.rerun().
+@st.fragment
+def chat_pane(selected_lang):
+    pane_started = time.perf_counter()
+    chat_box = st.container()
 
-# Display messages
-for message in st.session_state.messages[-12:]:  # Show last 12 messages
-    if message["role"] == "user":
-        st.markdown(f'<div class="user-message">{message["content"]}</div>', unsafe_allow_html=True)
+    # User input
+    if selected_lang == "Nigerian Pidgin":
+        placeholder_text = "Talk wetin dey your mind here..."
     else:
-        message_class = "bot-message crisis-message" if message.get("is_crisis") else "bot-message"
-        st.markdown(f'<div class="{message_class}">{message["content"]}</div>', unsafe_allow_html=True)
+        placeholder_text = "Share what's on your mind..."
 
-st.markdown('</div>', unsafe_allow_html=True)
+    st.text_input("Message", key="user_input", placeholder=placeholder_text, max_chars=500,
+                  label_visibility="collapsed", on_change=submit_typed)
 
-# User input
-if selected_lang == "Nigerian Pidgin":
-    placeholder_text = "Talk wetin dey your mind here..."
-else:
-    placeholder_text = "Share what's on your mind..."
+    # Process the pending submission, typed or from a quick action (their
+    # callbacks have already run), exactly once
+    pending = st.session_state.pending_submission
+    if pending is not None and pending.key() != st.session_state.processed_submission:
+        st.session_state.processed_submission = pending.key()
+        add_exchange(pending.text)
 
-user_input = st.text_input("", key="user_input", placeholder=placeholder_text, max_chars=500)
+    # Crisis alert
+    if st.session_state.crisis_detected:
+        st.error("🚨 CRISIS DETECTED: If you're in immediate danger, please call 112 or go to your nearest hospital emergency room.")
+        if st.button("I'm Safe Now", key="crisis_clear"):
+            st.session_state.crisis_detected = False
+            st.rerun(scope="fragment")
+    elif st.session_state.responder.crisis_scorer.escalating:
+        st.warning("💛 It sounds like things have been getting harder. You don't have to carry this alone - please consider calling one of the helplines in the sidebar.")
 
-# Process user input
-if user_input and user_input.strip():
-    # Add user message
-    st.session_state.messages.append({"role": "user", "content": user_input.strip()})
-    
-    # Generate response
-    bot_response, is_crisis, mood, detected_lang = st.session_state.responder.generate_response(user_input)
-    
-    # Track mood
-    st.session_state.user_mood_history.append(mood)
-    
-    # Add bot response
-    st.session_state.messages.append({
-        "role": "assistant", 
-        "content": bot_response,
-        "is_crisis": is_crisis,
-        "mood": mood
-    })
-    
-    # Set crisis flag
-    if is_crisis:
-        st.session_state.crisis_detected = True
-    
-    st.rerun()
+    # Quick help buttons
+    st.markdown("### Quick Help Options")
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    quick_actions = QUICK_ACTIONS["pidgin" if selected_lang == "Nigerian Pidgin" else "english"]
+
+    for i, (col, (button_text, message)) in enumerate(zip([col1, col2, col3, col4], quick_actions)):
+        with col:
+            st.button(button_text, key=f"quick_{i}", on_click=queue_submission, args=(message,))
+
+    # Display messages: each one's escaped HTML was built once when it was
+    # added, so drawing the pane is a join into a single element
+    with chat_box:
+        recent_html = "".join(message["html"] for message in list(st.session_state.messages)[-12:])  # Show last 12 messages
+        st.markdown(f'<div class="chat-container">{recent_html}</div>', unsafe_allow_html=True)
+
+        # Mood pattern updates with every message, so it lives in the pane
+        mood_history = st.session_state.responder.user_mood_history
+        if mood_history:
+            mood_display = " ".join(MOOD_EMOJI[mood] for mood in mood_history.recent(5))
+            ratios = mood_history.ratios()
+            st.caption(f"📊 Your mood pattern: {mood_display} · last {len(mood_history)}: "
+                       f"😊 {ratios['good']:.0%} · 😐 {ratios['okay']:.0%} · 😔 {ratios['bad']:.0%}")
+            if mood_history.bad_streak >= 3:
+                st.caption(f"You've felt low for {mood_history.bad_streak} messages in a row. Consider reaching out to someone you trust.")
+
+    st.session_state.render_timings.append(("chat pane", time.perf_counter() - pane_started))
+
+    # Debug info (remove in production)
+    if st.checkbox("Show Debug Info", value=False):
+        st.write(f"Messages: {len(st.session_state.messages)}")
+        st.write(f"Mood History: {mood_history.recent(5) if mood_history else 'None'}")
+        st.write(f"Crisis Detected: {st.session_state.crisis_detected}")
+        st.write("Render times (ms): " + ", ".join(
+            f"{name} {seconds * 1000:.1f}" for name, seconds in list(st.session_state.render_timings)[-6:]))
+        analysis_cache = load_responder_model().analysis_cache
+        if analysis_cache is not None:
+            cache_metrics = analysis_cache.metrics()
+            st.write(f"Analysis cache: {cache_metrics['entries']} entries, {cache_metrics['hit_rate']:.0%} hits, "
+                     f"{cache_metrics['evictions']} evicted")
+        # Pipeline metrics are process-wide, shared by every session
+        if METRICS_ADMIN:
+            METRICS.enabled = st.toggle("Record pipeline metrics", value=METRICS.enabled, key="metrics_enabled")
+        if METRICS.enabled:
+            snapshot = METRICS.snapshot()
+            st.write(f"Messages counted: {snapshot['messages']} (stage timings sampled 1 in {snapshot['sample_every']})")
+            st.json({"stages": snapshot["stages"], "counters": snapshot["counters"]}, expanded=False)
 
-# Crisis alert
-if st.session_state.crisis_detected:
-    st.error("🚨 CRISIS DETECTED: If you're in immediate danger, please call 112 or go to your nearest hospital emergency room.")
-    if st.button("I'm Safe Now", key="crisis_clear"):
-        st.session_state.crisis_detected = False
-        st.rerun()
 
-# Quick help buttons
-st.markdown("### Quick Help Options")
-
-col1, col2, col3, col4 = st.columns(4)
-
-if selected_lang == "Nigerian Pidgin":
-    quick_actions = [
-        ("😰 I Dey Worry", "I dey feel anxiety and I no know wetin to do"),
-        ("📚 School Wahala", "School dey stress me and I dey overwhelmed"),
-        ("💔 Relationship Matter", "I get relationship wahala wey dey worry me"),
-        ("💰 Money Problem", "I get financial stress wey dey affect my mental health")
-    ]
-else:
-    quick_actions = [
-        ("😰 Feeling Anxious", "I'm feeling anxious and overwhelmed"),
-        ("📚 Academic Stress", "I'm stressed about school and my studies"),
-        ("💔 Relationship Issues", "I'm having relationship problems that are affecting me"),
-        ("💰 Financial Pressure", "I'm stressed about money and financial issues")
-    ]
-
-for i, (col, (button_text, message)) in enumerate(zip([col1, col2, col3, col4], quick_actions)):
-    with col:
-        if st.button(button_text, key=f"quick_{i}"):
-            st.session_state.messages.append({"role": "user", "content": message})
-            bot_response, is_crisis, mood, detected_lang = st.session_state.responder.generate_response(message)
-            st.session_state.user_mood_history.append(mood)
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": bot_response,
-                "is_crisis": is_crisis,
-                "mood": mood
-            })
-            if is_crisis:
-                st.session_state.crisis_detected = True
-            st.rerun()
+chat_pane(selected_lang)
 
 # Footer
 st.markdown("---")
@@ -497,8 +474,4 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Debug info (remove in production)
-if st.checkbox("Show Debug Info", value=False):
-    st.write(f"Messages: {len(st.session_state.messages)}")
-    st.write(f"Mood History: {st.session_state.user_mood_history[-5:] if st.session_state.user_mood_history else 'None'}")
-    st.write(f"Crisis Detected: {st.session_state.crisis_detected}")
+st.session_state.render_timings.append(("full script", time.perf_counter() - script_started))
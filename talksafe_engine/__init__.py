@@ -0,0 +1,43 @@
+# Streamlit-free core of TalkSafe: text matching and response logic
+from talksafe_engine.analysis import TextAnalysis, TextAnalyzer
+from talksafe_engine.backends import MemoryBackend, SharedSessions, SQLiteBackend
+from talksafe_engine.cache import AnalysisCache
+from talksafe_engine.escalation import EscalationQueue, FileSink, HttpSink
+from talksafe_engine.intake import Submission, SubmissionGuard, TokenBucket
+from talksafe_engine.langid import LanguageIdentifier
+from talksafe_engine.matcher import PatternMatcher
+from talksafe_engine.metrics import METRICS, Metrics
+from talksafe_engine.model import ResponderModel, build_model, load_model
+from talksafe_engine.packs import PackStore, ResponsePack
+from talksafe_engine.persistence import SessionRecorder
+from talksafe_engine.responder import CrisisDetector, CulturalResponder
+from talksafe_engine.semantic import SemanticFallback, SemanticIndex
+
+__all__ = [
+    "AnalysisCache",
+    "CrisisDetector",
+    "CulturalResponder",
+    "EscalationQueue",
+    "FileSink",
+    "HttpSink",
+    "LanguageIdentifier",
+    "METRICS",
+    "MemoryBackend",
+    "Metrics",
+    "PackStore",
+    "PatternMatcher",
+    "ResponderModel",
+    "ResponsePack",
+    "SQLiteBackend",
+    "SemanticFallback",
+    "SemanticIndex",
+    "SessionRecorder",
+    "SharedSessions",
+    "Submission",
+    "SubmissionGuard",
+    "TextAnalysis",
+    "TextAnalyzer",
+    "TokenBucket",
+    "build_model",
+    "load_model",
+]
@@ -0,0 +1,274 @@
+import re
+from types import MappingProxyType
+
+from talksafe_engine.matcher import PatternMatcher
+from talksafe_engine.metrics import METRICS
+from talksafe_engine.packs import with_default_categories
+
+CRISIS_WEIGHT = 2
+SEVERITY_WEIGHT = 3
+CRISIS_THRESHOLD = 2
+# Chosen only for messages over CRISIS_THRESHOLD, never by pattern scores:
+# its patterns are crisis keywords matched as substrings ("die" in "diet")
+CRISIS_CATEGORY = "crisis"
+# Below this posterior the identifier's guess is ignored for the default language
+LANGUAGE_CONFIDENCE = 0.9
+
+_CRISIS = ("signal", "crisis")
+_SEVERITY = ("signal", "severity")
+_POSITIVE = ("signal", "positive")
+_NEGATIVE = ("signal", "negative")
+
+# Pipeline stages timed inside analyze() when given a stopwatch
+_LANGUAGE_STAGE = METRICS.histogram("language")
+_PATTERN_STAGE = METRICS.histogram("pattern_scan")
+_MOOD_CATEGORY_STAGE = METRICS.histogram("mood_and_category")
+_SEMANTIC_STAGE = METRICS.histogram("semantic_fallback")
+_CACHE_STAGE = METRICS.histogram("analysis_cache")
+
+
+# Everything generate_response needs to know about one message
+class TextAnalysis:
+    __slots__ = ("text", "keyword_hits", "severity_hits", "crisis_score", "is_crisis", "language",
+                 "language_confidence", "mood", "category_scores", "category", "semantic_similarity")
+
+    def __init__(self, text, keyword_hits, severity_hits, crisis_score, is_crisis, language, language_confidence,
+                 mood, category_scores, category, semantic_similarity=None):
+        self.text = text
+        self.keyword_hits = keyword_hits
+        self.severity_hits = severity_hits
+        self.crisis_score = crisis_score
+        self.is_crisis = is_crisis
+        self.language = language
+        self.language_confidence = language_confidence
+        self.mood = mood
+        self.category_scores = category_scores
+        self.category = category
+        # Set only when the semantic fallback was consulted
+        self.semantic_similarity = semantic_similarity
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(crisis_score={self.crisis_score}, language={self.language!r}, "
+                f"mood={self.mood!r}, category={self.category!r})")
+
+
+# Read-only analysis, as handed to every session that sends the same message
+# through an AnalysisCache. Only cached results pay for the immutability; a
+# plain TextAnalysis is cheaper to build.
+class FrozenTextAnalysis(TextAnalysis):
+    __slots__ = ()
+
+    @classmethod
+    def freeze(cls, analysis):
+        # Freezes in place, so only for an analysis nothing else holds yet:
+        # the scores become a read-only view and the class blocks assignment
+        analysis.category_scores = MappingProxyType(analysis.category_scores)
+        analysis.__class__ = cls
+        return analysis
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+# One-pass analysis stage: the message is lowercased once, and crisis terms,
+# mood words and one language's category patterns share a single
+# PatternMatcher. Each response pack gets its own matcher, compiled the first
+# time that language is analyzed and again whenever the pack is reloaded, so
+# loading a language never touches the others. The language comes from the
+# character n-gram identifier, or without numpy from indicator substrings,
+# before the scan, so each message is scanned with one pack only. Crisis
+# terms only count as whole words, and the crisis category follows them
+# alone: it is left out of the pattern scores, whose substrings would find
+# "die" in "diet". When no category but the default one scores (often just
+# "hi" found inside "nothing"), an optional SemanticFallback picks the
+# pack's closest category by TF-IDF similarity instead. With an
+# AnalysisCache, messages analyzed with detected language are looked up
+# there first.
+class TextAnalyzer:
+    def __init__(self, packs, crisis_keywords, severity_indicators, language_indicators,
+                 positive_words, negative_words, default_category="greetings", language_identifier=None,
+                 semantic_fallback=None, cache=None):
+        self.packs = packs
+        self.default_language = packs.default_language
+        self.default_category = default_category
+        self.language_identifier = language_identifier
+        self.semantic_fallback = semantic_fallback
+        self.cache = cache
+
+        # Leading entries of every pack's matcher, so their slots line up
+        self._core = {
+            _CRISIS: crisis_keywords,
+            _SEVERITY: severity_indicators,
+            _POSITIVE: positive_words,
+            _NEGATIVE: negative_words,
+        }
+        # Without the n-gram identifier, the first language with an indicator
+        # substring in the message; one alternation search per language
+        self._indicators = [
+            (language, re.compile("|".join(re.escape(word) for word in indicators if word)))
+            for language, indicators in language_indicators.items() if any(indicators)
+        ] if language_identifier is None else []
+        self._crisis = 0
+        self._severity = 1
+        self._positive = 2
+        self._negative = 3
+        # language -> (pack, default pack, matcher, [(category, slot), ...])
+        # and language -> (pack, default pack, SemanticIndex), replaced
+        # wholesale so concurrent readers always see a whole entry
+        self._compiled = {}
+        self._semantic = {}
+
+    def _matcher_for(self, language):
+        # Falls back to the default pack when `language` has none. Categories
+        # the pack lacks come from the default pack, so the entry is rebuilt
+        # when either pack is reloaded.
+        pack = self.packs.get(language)
+        if pack is None or pack.language == self.default_language:
+            pack = default = self.packs.default_pack()
+        else:
+            default = self.packs.default_pack()
+        compiled = self._compiled.get(pack.language)
+        if compiled is None or compiled[0] is not pack or compiled[1] is not default:
+            table = dict(self._core)
+            tables = with_default_categories(pack, default)
+            categories = [category for category in tables if category != CRISIS_CATEGORY]
+            for category in categories:
+                table[("category", category)] = tables[category]["patterns"]
+            offset = len(self._core)
+            category_slots = [(category, offset + index) for index, category in enumerate(categories)]
+            matcher = PatternMatcher(table, word_categories=(_CRISIS, _SEVERITY))
+            compiled = self._compiled[pack.language] = (pack, default, matcher, category_slots)
+        return compiled
+
+    def _semantic_for(self, pack, default):
+        # The SemanticIndex over the same categories as the pack's matcher,
+        # built the first time a message needs it
+        entry = self._semantic.get(pack.language)
+        if entry is None or entry[0] is not pack or entry[1] is not default:
+            index = self.semantic_fallback.index(pack, default)
+            entry = self._semantic[pack.language] = (pack, default, index)
+        return entry[2]
+
+    def identify_language(self, text):
+        # (language, confidence) with low-confidence guesses sent to the default
+        # language; indicator words give (language, None)
+        if self.language_identifier is None:
+            for language, indicators in self._indicators:
+                if indicators.search(text) is not None:
+                    return language, None
+            return self.default_language, None
+        language, confidence = self.language_identifier.identify(text)
+        if confidence < LANGUAGE_CONFIDENCE:
+            language = self.default_language
+        return language, confidence
+
+    def analyze(self, text, language=None, language_confidence=None, stopwatch=None):
+        # language, when given, skips detection and scores that language's
+        # categories; analyze_batch passes its batched detection this way.
+        # Stages are timed only when the caller passes a stopwatch, which
+        # generate_response does for the messages METRICS samples.
+        watch = stopwatch
+        normalized = text.lower()
+        use_cache = self.cache is not None and language is None
+        if use_cache:
+            generation = self.packs.generation
+            analysis = self.cache.get(normalized, generation)
+            if analysis is not None:
+                # A hit skips _matcher_for(), so the time-gated freshness
+                # check of the pack it was scored with happens here; a pack
+                # reloaded just now turns the hit into a miss
+                self.packs.get(analysis.language)
+                if self.packs.generation == generation:
+                    if watch:
+                        watch.lap(_CACHE_STAGE)
+                    return analysis
+                generation = self.packs.generation
+        if language is None:
+            detected = True
+            language, language_confidence = self.identify_language(normalized)
+        else:
+            detected = language_confidence is not None
+            if not detected:
+                language_confidence = 1.0
+        if watch:
+            watch.lap(_LANGUAGE_STAGE)
+        pack, default, matcher, category_slots = self._matcher_for(language)
+        hits, totals = matcher.tally(normalized)
+        if watch:
+            watch.lap(_PATTERN_STAGE)
+
+        if detected and language != pack.language:
+            # No pack for the detected language: answer in the default one
+            language = pack.language
+
+        # Severity words ("plan", "tonight") only add weight next to a crisis
+        # keyword; on their own they are everyday words. CrisisScorer lets
+        # them count when earlier turns already carry risk.
+        keyword_hits = hits[self._crisis]
+        severity_hits = hits[self._severity]
+        crisis_score = 0
+        if keyword_hits:
+            crisis_score = CRISIS_WEIGHT * keyword_hits + SEVERITY_WEIGHT * severity_hits
+
+        positive_count = hits[self._positive]
+        negative_count = hits[self._negative]
+        if positive_count > negative_count:
+            mood = "good"
+        elif negative_count > positive_count:
+            mood = "bad"
+        else:
+            mood = "okay"
+
+        is_crisis = crisis_score >= CRISIS_THRESHOLD
+        category_scores = {category: totals[index] for category, index in category_slots}
+        category = self.default_category
+        if is_crisis:
+            category = CRISIS_CATEGORY
+        elif category_scores and max(category_scores.values()) > 0:
+            category = max(category_scores, key=category_scores.get)
+        if watch:
+            watch.lap(_MOOD_CATEGORY_STAGE)
+
+        similarity = None
+        if self.semantic_fallback is not None and category == self.default_category:
+            guess, similarity = self.semantic_fallback.choose(self._semantic_for(pack, default), normalized)
+            if guess is not None:
+                category = guess
+            if watch:
+                watch.lap(_SEMANTIC_STAGE)
+
+        analysis = TextAnalysis(normalized, keyword_hits, severity_hits, crisis_score, is_crisis, language,
+                                language_confidence, mood, category_scores, category, similarity)
+        if use_cache:
+            return self.cache.put(FrozenTextAnalysis.freeze(analysis), generation)
+        return analysis
+
+    def warm(self, texts):
+        # Fills the cache with messages known to be common, e.g. quick actions.
+        # Loading a pack on the way empties the cache, so such a pass runs again.
+        if self.cache is None:
+            return
+        texts = list(texts)
+        for _attempt in range(2):
+            generation = self.packs.generation
+            for text in texts:
+                self.analyze(text)
+            if self.packs.generation == generation:
+                break
+
+    def analyze_batch(self, texts):
+        # Same results as analyze() per message, with language identification
+        # done for the whole batch in one vectorized call
+        if self.language_identifier is None:
+            return [self.analyze(text) for text in texts]
+        languages, confidences = self.language_identifier.identify_batch(texts)
+        default_language = self.default_language
+        analyses = []
+        for text, language, confidence in zip(texts, languages, confidences.tolist()):
+            if confidence < LANGUAGE_CONFIDENCE:
+                language = default_language
+            analyses.append(self.analyze(text, language, confidence))
+        return analyses
@@ -0,0 +1,273 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+SNAPSHOT_FORMAT = 1
+COMPRESS_LEVEL = 1
+MAX_ATTEMPTS = 3
+# SQLite limits host parameters per statement; reads are chunked below it
+READ_CHUNK = 500
+
+
+def encode_snapshot(state):
+    # Compact JSON, deflated; a few hundred bytes for a typical conversation
+    payload = json.dumps([SNAPSHOT_FORMAT, state], separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(payload.encode("utf-8"), COMPRESS_LEVEL)
+
+
+def decode_snapshot(blob):
+    version, state = json.loads(zlib.decompress(blob))
+    if version != SNAPSHOT_FORMAT:
+        raise ValueError(f"unsupported session snapshot format {version}")
+    return state
+
+
+class SessionConflict(Exception):
+    pass
+
+
+# Session backends store versioned snapshots for any number of processes.
+#
+#   load_many(ids)     -> {id: (version, blob)} for the live sessions among ids
+#   save_many(entries) -> ids that conflicted; entries are (id, version, blob),
+#                         where version is the one loaded (None for a new
+#                         session) and a save only applies if it still matches
+#   delete(id), sweep(), metrics()
+#
+# Versions make concurrency optimistic: nothing is locked between a load
+# and the save, and a writer that lost the race reloads and redoes its work.
+
+# Versioned snapshots in a process-local dict, for a single process, for
+# tests, and for measuring what serialization costs against SessionStore.
+class MemoryBackend:
+    def __init__(self, idle_ttl=1800.0, clock=time.monotonic):
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._rows = {}  # id -> (version, updated, blob)
+        self._lock = threading.Lock()
+        self.conflicts = 0
+
+    def load_many(self, session_ids):
+        deadline = self.clock() - self.idle_ttl
+        rows = self._rows
+        found = {}
+        for session_id in session_ids:
+            row = rows.get(session_id)
+            if row is not None and row[1] > deadline:
+                found[session_id] = (row[0], row[2])
+        return found
+
+    def save_many(self, entries):
+        now = self.clock()
+        conflicts = set()
+        with self._lock:
+            rows = self._rows
+            for session_id, version, blob in entries:
+                row = rows.get(session_id)
+                current = row[0] if row is not None and row[1] > now - self.idle_ttl else None
+                if current != version:
+                    conflicts.add(session_id)
+                    continue
+                rows[session_id] = ((version or 0) + 1, now, blob)
+        self.conflicts += len(conflicts)
+        return conflicts
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._rows.pop(session_id, None) is not None
+
+    def sweep(self):
+        deadline = self.clock() - self.idle_ttl
+        with self._lock:
+            for session_id in [key for key, row in self._rows.items() if row[1] <= deadline]:
+                del self._rows[session_id]
+
+    def metrics(self):
+        return {"backend": "memory", "sessions": len(self._rows), "conflicts": self.conflicts}
+
+
+# Snapshots in one SQLite table shared by every worker process on a host.
+# WAL mode lets readers proceed while one worker writes; a batch of saves is
+# one IMMEDIATE transaction, and a batch of loads one SELECT per READ_CHUNK
+# ids. Expiry uses wall-clock time, since monotonic clocks are per process.
+class SQLiteBackend:
+    def __init__(self, path, idle_ttl=1800.0, busy_timeout=5.0, clock=time.time):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, version INTEGER NOT NULL, updated REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self.conflicts = 0
+        self.reads = 0
+        self.writes = 0
+
+    def load_many(self, session_ids):
+        session_ids = list(session_ids)
+        deadline = self.clock() - self.idle_ttl
+        found = {}
+        with self._lock:
+            for offset in range(0, len(session_ids), READ_CHUNK):
+                chunk = session_ids[offset:offset + READ_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT id, version, data FROM sessions WHERE id IN ({placeholders}) AND updated > ?",
+                    (*chunk, deadline),
+                )
+                for session_id, version, data in rows:
+                    found[session_id] = (version, data)
+            self.reads += 1
+        return found
+
+    def save_many(self, entries):
+        now = self.clock()
+        deadline = now - self.idle_ttl
+        conflicts = set()
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for session_id, version, blob in entries:
+                    if version is None:
+                        # New session: claim the id unless a live one exists
+                        cursor = connection.execute(
+                            "INSERT INTO sessions (id, version, updated, data) VALUES (?, 1, ?, ?) "
+                            "ON CONFLICT(id) DO UPDATE SET version = version + 1, updated = excluded.updated, "
+                            "data = excluded.data WHERE sessions.updated <= ?",
+                            (session_id, now, blob, deadline),
+                        )
+                    else:
+                        cursor = connection.execute(
+                            "UPDATE sessions SET version = version + 1, updated = ?, data = ? "
+                            "WHERE id = ? AND version = ? AND updated > ?",
+                            (now, blob, session_id, version, deadline),
+                        )
+                    if cursor.rowcount != 1:
+                        conflicts.add(session_id)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self.writes += 1
+        self.conflicts += len(conflicts)
+        return conflicts
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount == 1
+
+    def sweep(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM sessions WHERE updated <= ?", (self.clock() - self.idle_ttl,))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def metrics(self):
+        with self._lock:
+            sessions = self._connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "sessions": sessions, "conflicts": self.conflicts,
+                "read_batches": self.reads, "write_batches": self.writes}
+
+
+# Records side effects (SessionRecorder.record, EscalationQueue.escalate)
+# made while a turn runs against a snapshot, so they can be replayed once
+# its save has succeeded and dropped if the turn has to be redone.
+class DeferredEffects:
+    __slots__ = ("recorder", "escalation", "calls")
+
+    def __init__(self, recorder=None, escalation=None):
+        self.recorder = recorder
+        self.escalation = escalation
+        self.calls = []
+
+    def record(self, *args):
+        self.calls.append((self.recorder.record, args))
+
+    def escalate(self, *args):
+        self.calls.append((self.escalation.escalate, args))
+
+    def replay(self):
+        for call, args in self.calls:
+            call(*args)
+        self.calls = []
+
+
+# Runs conversation turns against sessions held in a backend, so any
+# worker can serve any session.
+#
+# run() takes a batch of (session_id, message) turns: one load_many for all
+# their sessions, each turn against its session's restored responder (turns
+# for the same session in order), then one save_many. Sessions whose save
+# conflicted with another worker are reloaded and their turns redone, up to
+# max_attempts; recorder and escalation calls are deferred until the save
+# that keeps them succeeds, so a redone turn is recorded once.
+class SharedSessions:
+    def __init__(self, backend, new_session, restore_session, max_attempts=MAX_ATTEMPTS):
+        # new_session(session_id, effects) and restore_session(session_id,
+        # state, effects) build responders whose recorder and escalation
+        # queue are `effects`
+        self.backend = backend
+        self.new_session = new_session
+        self.restore_session = restore_session
+        self.max_attempts = max_attempts
+        self.created = 0
+        self.retries = 0
+
+    def run(self, turns, handle, recorder=None, escalation=None):
+        # handle(session_id, responder, message) -> result. Returns results in
+        # turn order; turns still conflicting after max_attempts get a
+        # SessionConflict instance instead.
+        results = [None] * len(turns)
+        pending = list(range(len(turns)))
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.retries += len(pending)
+            session_ids = list(dict.fromkeys(turns[index][0] for index in pending))
+            loaded = self.backend.load_many(session_ids)
+            sessions = {}
+            for session_id in session_ids:
+                effects = DeferredEffects(recorder, escalation)
+                row = loaded.get(session_id)
+                if row is None:
+                    responder = self.new_session(session_id, effects)
+                    version = None
+                else:
+                    responder = self.restore_session(session_id, decode_snapshot(row[1]), effects)
+                    version = row[0]
+                sessions[session_id] = (version, responder, effects)
+            for index in pending:
+                session_id, message = turns[index]
+                results[index] = handle(session_id, sessions[session_id][1], message)
+            conflicts = self.backend.save_many([
+                (session_id, version, encode_snapshot(responder.snapshot()))
+                for session_id, (version, responder, _effects) in sessions.items()
+            ])
+            for session_id, (version, _responder, effects) in sessions.items():
+                if session_id not in conflicts:
+                    effects.replay()
+                    if version is None:
+                        self.created += 1
+            pending = [index for index in pending if turns[index][0] in conflicts]
+            if not pending:
+                break
+        for index in pending:
+            results[index] = SessionConflict(f"session {turns[index][0]} kept changing; try again")
+        return results
+
+    def discard(self, session_id):
+        return self.backend.delete(session_id)
+
+    def sweep(self):
+        self.backend.sweep()
+
+    def metrics(self):
+        return {**self.backend.metrics(), "created": self.created, "retried_turns": self.retries}
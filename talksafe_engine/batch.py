@@ -0,0 +1,173 @@
+# Offline triage of anonymized JSONL exports with the app's crisis and
+# category logic.
+#
+#   python -m talksafe_engine.batch messages.jsonl triaged.jsonl --workers 8
+#
+# Each input line is a JSON object with the message under --text-field; the
+# output line is the same object plus a "triage" object. Lines are read and
+# written in chunks, and at most --max-pending chunks are in flight, so memory
+# stays flat regardless of input size. Output order matches input order.
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from talksafe_engine.model import load_model
+
+
+def triage_text(text, model=None):
+    return _triage((model or load_model()).analyzer.analyze(text))
+
+
+def _triage(analysis):
+    return {
+        "is_crisis": analysis.is_crisis,
+        "crisis_score": analysis.crisis_score,
+        "language": analysis.language,
+        "mood": analysis.mood,
+        "category": analysis.category,
+    }
+
+
+def triage_chunk(lines, text_field="text"):
+    # Runs in the worker: returns (output lines, messages, crisis count, invalid count)
+    model = load_model()
+    records = []
+    invalid = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+            if not isinstance(record[text_field], str):
+                raise TypeError(text_field)
+        except (ValueError, KeyError, TypeError):
+            invalid += 1
+            continue
+        records.append(record)
+
+    # Languages for the whole chunk are identified in one vectorized call
+    analyses = model.analyzer.analyze_batch([record[text_field] for record in records])
+    output = []
+    crisis = 0
+    for record, analysis in zip(records, analyses):
+        triage = _triage(analysis)
+        crisis += triage["is_crisis"]
+        record["triage"] = triage
+        output.append(json.dumps(record, ensure_ascii=False))
+    return output, len(output), crisis, invalid
+
+
+def read_chunks(stream, chunk_size):
+    chunk = []
+    for line in stream:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchStats:
+    __slots__ = ("messages", "crisis", "invalid", "started")
+
+    def __init__(self):
+        self.messages = 0
+        self.crisis = 0
+        self.invalid = 0
+        self.started = time.perf_counter()
+
+    def add(self, messages, crisis, invalid):
+        self.messages += messages
+        self.crisis += crisis
+        self.invalid += invalid
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "messages": self.messages,
+            "crisis_flagged": self.crisis,
+            "invalid_lines": self.invalid,
+            "seconds": round(elapsed, 3),
+            "messages_per_sec": round(self.messages / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def run_batch(source, sink, workers=None, chunk_size=2000, max_pending=None, text_field="text", progress=None):
+    stats = BatchStats()
+
+    def write(result):
+        lines, messages, crisis, invalid = result
+        if lines:
+            sink.write("\n".join(lines))
+            sink.write("\n")
+        stats.add(messages, crisis, invalid)
+        if progress:
+            progress(stats)
+
+    if workers == 0:
+        load_model()
+        for chunk in read_chunks(source, chunk_size):
+            write(triage_chunk(chunk, text_field))
+        return stats
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_model) as pool:
+        for chunk in read_chunks(source, chunk_size):
+            pending.append(pool.submit(triage_chunk, chunk, text_field))
+            # Back-pressure: wait for the oldest chunk before reading further
+            if len(pending) >= max_pending:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return stats
+
+
+def _open(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run TalkSafe crisis and category triage over a JSONL export.")
+    parser.add_argument("input", help="input JSONL path, or - for stdin")
+    parser.add_argument("output", help="output JSONL path, or - for stdout")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count, 0 runs in-process)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="lines per work unit")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="chunks in flight before reading pauses (default: 2 x workers)")
+    parser.add_argument("--text-field", default="text", help="JSON field holding the message")
+    parser.add_argument("--progress", action="store_true", help="report throughput on stderr as chunks finish")
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        summary = stats.as_dict()
+        print(f"\r{summary['messages']} messages, {summary['crisis_flagged']} crisis, "
+              f"{summary['messages_per_sec']} msg/s", end="", file=sys.stderr)
+
+    source = _open(args.input, "r")
+    sink = _open(args.output, "w")
+    try:
+        stats = run_batch(source, sink, workers=args.workers, chunk_size=args.chunk_size,
+                          max_pending=args.max_pending, text_field=args.text_field,
+                          progress=report if args.progress else None)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    if args.progress:
+        print(file=sys.stderr)
+    print(json.dumps(stats.as_dict()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from talksafe_engine.metrics import METRICS
+
+MAX_ENTRIES = 20000
+MAX_BYTES = 16 * 1024 * 1024
+# Memory per entry apart from its text, measured with tracemalloc for the
+# bundled packs: the analysis, its category scores, the ordered-dict node
+# and the (analysis, size) pair
+ENTRY_BYTES = 600
+
+
+def analysis_bytes(analysis):
+    return ENTRY_BYTES + sys.getsizeof(analysis.text)
+
+
+# Process-wide least-recently-used cache of message analyses.
+#
+# Identical messages are common (quick-action buttons, "hi", "how far"), and
+# their analysis depends only on the text and the loaded packs, so sessions
+# share one result per normalized message. Entries are FrozenTextAnalysis
+# objects keyed by the lowercased text itself: the dict hashes it, and the
+# key is the same string object as the analysis's text, so it costs no extra
+# memory. The cache is bounded by both count and approximate bytes; the least
+# recently used entries go first. Entries carry no
+# session state, and reply choice stays per session. A pack (re)load bumps
+# PackStore.generation, which empties the cache at the next lookup. One lock
+# guards the ordered dict, so Streamlit's per-session threads can share it.
+class AnalysisCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # normalized text -> (analysis, approximate bytes)
+        self._lock = threading.Lock()
+        self.generation = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        METRICS.gauge("analysis_cache_entries", "Message analyses held in the cache.", self.__len__)
+        METRICS.gauge("analysis_cache_bytes", "Approximate memory held by cached analyses.", lambda: self.bytes)
+        METRICS.gauge("analysis_cache_hits", "Analyses answered from the cache.", lambda: self.hits)
+        METRICS.gauge("analysis_cache_misses", "Analyses computed and offered to the cache.", lambda: self.misses)
+        METRICS.gauge("analysis_cache_evictions", "Analyses evicted to stay within the cache limits.",
+                      lambda: self.evictions)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"AnalysisCache(entries={len(self)}, max_entries={self.max_entries}, max_bytes={self.max_bytes})"
+
+    def get(self, normalized, generation):
+        # The cached analysis of a lowercased message, or None
+        with self._lock:
+            if generation != self.generation:
+                self._invalidate(generation)
+            entry = self._entries.get(normalized)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(normalized)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, analysis, generation):
+        # Stores a FrozenTextAnalysis under its text. Returns the analysis
+        # callers should use: this one, or the one another thread stored first.
+        size = analysis_bytes(analysis)
+        if size > self.max_bytes:
+            return analysis
+        with self._lock:
+            if generation != self.generation:
+                # Computed against packs that have since been replaced
+                return analysis
+            existing = self._entries.get(analysis.text)
+            if existing is not None:
+                return existing[0]
+            self._entries[analysis.text] = (analysis, size)
+            self.bytes += size
+            entries = self._entries
+            while len(entries) > self.max_entries or self.bytes > self.max_bytes:
+                _key, (_analysis, evicted) = entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return analysis
+
+    def _invalidate(self, generation):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self.bytes = 0
+        self.generation = generation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
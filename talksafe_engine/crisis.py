@@ -0,0 +1,85 @@
+from collections import deque
+
+from talksafe_engine.analysis import SEVERITY_WEIGHT
+
+DECAY = 0.7
+RISK_THRESHOLD = 4.0
+DISTRESS_WEIGHT = 1.0
+SEVERITY_CONTEXT_RISK = 1.0
+ESCALATION_TURNS = 3
+ESCALATION_FLOOR = 2.0
+
+
+class CrisisAssessment:
+    __slots__ = ("message_score", "risk", "is_crisis", "escalating")
+
+    def __init__(self, message_score, risk, is_crisis, escalating):
+        self.message_score = message_score
+        self.risk = risk
+        self.is_crisis = is_crisis
+        self.escalating = escalating
+
+    def __repr__(self):
+        return (f"CrisisAssessment(message_score={self.message_score}, risk={self.risk:.2f}, "
+                f"is_crisis={self.is_crisis}, escalating={self.escalating})")
+
+
+# Conversation-level crisis risk.
+#
+# Each turn's score (crisis keywords, severity words, a small weight for a
+# bad mood) is added to a risk total in which older turns decay by DECAY per
+# turn and drop out entirely after `window` turns. The total is kept
+# incrementally, so an update is O(1) however long the conversation runs.
+# A turn is a crisis when the message alone crosses the analyzer's threshold
+# or the accumulated risk reaches RISK_THRESHOLD; the conversation is
+# escalating when risk has risen for ESCALATION_TURNS turns in a row.
+class CrisisScorer:
+    __slots__ = ("decay", "_scores", "_tail_weight", "risk", "_rising", "escalating")
+
+    def __init__(self, window=8, decay=DECAY):
+        self.decay = decay
+        self._scores = deque(maxlen=window)
+        self._tail_weight = decay ** window
+        self.risk = 0.0
+        self._rising = 0
+        self.escalating = False
+
+    def update(self, analysis):
+        prior = self.risk
+        score = float(analysis.crisis_score)
+        if not analysis.keyword_hits and analysis.severity_hits and prior >= SEVERITY_CONTEXT_RISK:
+            score += SEVERITY_WEIGHT * analysis.severity_hits
+        if analysis.mood == "bad":
+            score += DISTRESS_WEIGHT
+
+        risk = prior * self.decay + score
+        if len(self._scores) == self._scores.maxlen:
+            # The oldest turn leaves the window with weight decay ** window
+            risk -= self._scores[0] * self._tail_weight
+        self._scores.append(score)
+        # Clamp float drift left behind by the window subtraction
+        self.risk = risk = risk if risk > 1e-9 else 0.0
+
+        self._rising = self._rising + 1 if score and risk > prior else 0
+        self.escalating = self._rising >= ESCALATION_TURNS and risk >= ESCALATION_FLOOR
+        is_crisis = analysis.is_crisis or risk >= RISK_THRESHOLD
+        return CrisisAssessment(score, risk, is_crisis, self.escalating)
+
+    def snapshot(self):
+        return [self._scores.maxlen, self.decay, list(self._scores), self.risk, self._rising, self.escalating]
+
+    @classmethod
+    def restore(cls, state):
+        window, decay, scores, risk, rising, escalating = state
+        scorer = cls(window, decay)
+        scorer._scores.extend(scores)
+        scorer.risk = risk
+        scorer._rising = rising
+        scorer.escalating = escalating
+        return scorer
+
+    def reset(self):
+        self._scores.clear()
+        self.risk = 0.0
+        self._rising = 0
+        self.escalating = False
@@ -0,0 +1,258 @@
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, deque
+
+from talksafe_engine.metrics import METRICS
+
+MAX_PENDING = 1000
+WORKERS = 2
+BATCH_SIZE = 50
+# How long a worker holding one alert waits for more to fill its batch
+BATCH_WAIT = 0.05
+MAX_ATTEMPTS = 5
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# One alert per session within this many seconds
+DEDUPE_WINDOW = 300.0
+DEAD_LETTER_LIMIT = 100
+
+_DELIVERY_STAGE = METRICS.histogram("escalation_delivery")
+
+
+class Alert:
+    __slots__ = ("session_id", "created", "queued_ns", "language", "risk", "message_score", "escalating", "text")
+
+    def __init__(self, session_id, language, risk, message_score, escalating, text, created=None):
+        self.session_id = session_id
+        self.created = time.time() if created is None else created
+        self.queued_ns = time.perf_counter_ns()
+        self.language = language
+        self.risk = risk
+        self.message_score = message_score
+        self.escalating = escalating
+        self.text = text
+
+    def __repr__(self):
+        return f"Alert(session_id={self.session_id!r}, risk={self.risk:.2f})"
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "created": self.created,
+            "language": self.language,
+            "risk": round(self.risk, 3),
+            "message_score": self.message_score,
+            "escalating": self.escalating,
+            "text": self.text,
+        }
+
+
+class DeliveryError(Exception):
+    pass
+
+
+# Sinks take a list of alerts in deliver() and raise on failure, which makes
+# the worker retry the whole batch.
+
+# Appends each alert as one JSON line, e.g. for a file a counsellor
+# dashboard tails
+class FileSink:
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"FileSink({self.path!r})"
+
+    def deliver(self, alerts):
+        lines = "".join(json.dumps(alert.to_dict(), ensure_ascii=False) + "\n" for alert in alerts)
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+            if self.fsync:
+                handle.flush()
+                os.fsync(handle.fileno())
+
+
+# POSTs each batch as {"alerts": [...]} to a webhook; any non-2xx answer or
+# network error is a failed delivery
+class HttpSink:
+    def __init__(self, url, timeout=5.0, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def __repr__(self):
+        return f"HttpSink({self.url!r})"
+
+    def deliver(self, alerts):
+        body = json.dumps({"alerts": [alert.to_dict() for alert in alerts]}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError as error:  # URLError and HTTPError are OSErrors
+            raise DeliveryError(f"{self.url}: {error}") from error
+
+
+# Asynchronous crisis escalation: alerts go from the chat path to a sink
+# without the chat path ever waiting on it.
+#
+# escalate() checks the per-session de-duplication window and does a
+# put_nowait() on a bounded queue, both O(1). A full queue rejects the alert
+# (counted in `dropped`) instead of blocking. Worker threads take an alert,
+# gather up to batch_size more for batch_wait seconds, and hand the batch
+# to the sink. Failed batches are retried with exponential backoff plus
+# jitter, up to max_attempts tries; after that they are counted as failed and
+# the most recent are kept in dead_letters. Delivery latency, from enqueue to
+# a successful delivery, goes to the "escalation_delivery" histogram of
+# METRICS, and the queue depth is a gauge there.
+class EscalationQueue:
+    def __init__(self, sink, max_pending=MAX_PENDING, workers=WORKERS, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF, max_backoff=MAX_BACKOFF, dedupe_window=DEDUPE_WINDOW,
+                 clock=time.monotonic):
+        self.sink = sink
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.dedupe_window = dedupe_window
+        self.clock = clock
+        self._queue = queue.Queue(max_pending)
+        # session_id -> time of its last accepted alert, oldest first
+        self._recent = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.dead_letters = deque(maxlen=DEAD_LETTER_LIMIT)
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_error = None
+        METRICS.gauge("escalation_queue_depth", "Crisis alerts waiting for delivery.", self._queue.qsize)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"talksafe-escalation-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def escalate(self, session_id, language, risk, message_score, escalating, text):
+        # Called on the chat path; True when the alert was queued
+        if self._stopping.is_set():
+            self.dropped += 1
+            return False
+        now = self.clock()
+        with self._recent_lock:
+            recent = self._recent
+            last = recent.get(session_id)
+            if last is not None and now - last < self.dedupe_window:
+                self.deduplicated += 1
+                return False
+            # Expired entries sit at the front; each is popped once
+            while recent:
+                oldest = next(iter(recent.values()))
+                if now - oldest < self.dedupe_window:
+                    break
+                recent.popitem(last=False)
+            recent[session_id] = now
+            recent.move_to_end(session_id)
+        try:
+            self._queue.put_nowait(Alert(session_id, language, risk, message_score, escalating, text))
+        except queue.Full:
+            self.dropped += 1
+            with self._recent_lock:
+                # Not queued, so the session may try again on its next crisis turn
+                if self._recent.get(session_id) == now:
+                    del self._recent[session_id]
+            return False
+        self.enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def _work(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.sink.deliver(batch)
+            except Exception as error:
+                self.last_error = f"{type(error).__name__}: {error}"
+                if attempt == self.max_attempts:
+                    break
+                self.retries += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                # Jitter spreads out retries from several workers; while
+                # closing, retries go ahead without waiting
+                self._stopping.wait(delay * random.uniform(0.5, 1.0))
+                continue
+            done = time.perf_counter_ns()
+            for alert in batch:
+                _DELIVERY_STAGE.observe_ns(done - alert.queued_ns)
+            self.delivered += len(batch)
+            self.batches += 1
+            return
+        self.failed += len(batch)
+        self.dead_letters.extend(batch)
+        print(f"escalation: gave up on {len(batch)} alerts after {self.max_attempts} attempts: {self.last_error}",
+              file=sys.stderr)
+
+    def close(self, timeout=None):
+        # Stops intake, then lets the workers deliver what is already queued
+        self._stopping.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def metrics(self):
+        return {
+            "sink": repr(self.sink),
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "max_pending": self.max_pending,
+            "enqueued": self.enqueued,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+            "delivery": _DELIVERY_STAGE.summary(),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,126 @@
+import hashlib
+import time
+
+# Sustained messages per second and burst size allowed per session
+RATE = 1.0
+BURST = 10
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+STALE = "stale"
+LIMITED = "limited"
+
+
+def message_digest(text):
+    # Short content hash of a submission; whitespace and case do not matter
+    return hashlib.blake2b(" ".join(text.lower().split()).encode("utf-8"), digest_size=8).hexdigest()
+
+
+# One message as submitted: its text, the client's sequence number for it
+# (None when the client does not number its messages) and its content hash.
+# (seq, digest) identifies the submission, so a retry or a rerun that
+# delivers it again can be told apart from the user saying the same thing
+# twice. Unnumbered submissions are only rate limited and are not hashed.
+class Submission:
+    __slots__ = ("text", "seq", "digest")
+
+    def __init__(self, text, seq=None):
+        self.text = text
+        self.seq = seq
+        self.digest = None if seq is None else message_digest(text)
+
+    def __repr__(self):
+        return f"Submission(seq={self.seq}, digest={self.digest!r})"
+
+    def key(self):
+        return self.seq, self.digest
+
+
+# Classic token bucket: holds up to `burst` tokens, refilled at `rate` per
+# second, one taken per message. The refill is computed lazily from the time
+# of the last call, so an idle bucket costs nothing. Wall-clock time by
+# default, so a bucket restored in another worker process refills correctly.
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "clock")
+
+    def __init__(self, rate=RATE, burst=BURST, clock=time.time):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def take(self, cost=1.0):
+        # True when cost tokens were available and have been taken
+        now = self.clock()
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens < cost:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - cost
+        return True
+
+    def retry_after(self, cost=1.0):
+        # Seconds until take(cost) can succeed
+        return max(0.0, (cost - self.tokens) / self.rate) if self.rate else float("inf")
+
+    def snapshot(self):
+        return [self.rate, self.burst, self.tokens, self.updated]
+
+    @classmethod
+    def restore(cls, state, clock=time.time):
+        rate, burst, tokens, updated = state
+        bucket = cls(rate, burst, clock)
+        bucket.tokens = tokens
+        bucket.updated = updated
+        return bucket
+
+
+# Per-session admission of submissions, before any analysis runs.
+#
+# Numbered submissions are processed once: a sequence number above the last
+# accepted one is new; the last one again with the same content is a
+# duplicate, answered from the stored reply; anything older, or the last
+# number with different content, is stale. Every new submission takes a token
+# from the session's bucket (when it has one), and a limited submission does
+# not advance the sequence, so the client can send it again later.
+class SubmissionGuard:
+    __slots__ = ("bucket", "last_seq", "last_digest", "last_reply")
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket
+        self.last_seq = None
+        self.last_digest = None
+        self.last_reply = None
+
+    def admit(self, submission):
+        seq = submission.seq
+        if seq is not None and self.last_seq is not None and seq <= self.last_seq:
+            if seq == self.last_seq and submission.digest == self.last_digest:
+                return DUPLICATE
+            return STALE
+        if self.bucket is not None and not self.bucket.take():
+            return LIMITED
+        if seq is not None:
+            self.last_seq = seq
+            self.last_digest = submission.digest
+        return ACCEPTED
+
+    def complete(self, submission, reply):
+        # Keeps the reply to an accepted numbered submission for its retries
+        if submission.seq is not None:
+            self.last_reply = reply
+
+    def snapshot(self):
+        bucket = None if self.bucket is None else self.bucket.snapshot()
+        return [bucket, self.last_seq, self.last_digest, self.last_reply]
+
+    @classmethod
+    def restore(cls, state):
+        bucket, last_seq, last_digest, last_reply = state
+        guard = cls(None if bucket is None else TokenBucket.restore(bucket))
+        guard.last_seq = last_seq
+        guard.last_digest = last_digest
+        guard.last_reply = last_reply
+        return guard
@@ -0,0 +1,164 @@
+import math
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:  # without numpy the analyzer keeps the indicator-word heuristic
+    np = None
+
+# One plain-text file per language, one sample message per line:
+# langid_corpus/<language>.txt. Adding Yoruba, Igbo or Hausa is a new file.
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langid_corpus")
+CORPUS_SUFFIX = ".txt"
+NGRAM_ORDERS = (1, 2, 3, 4)
+BUCKET_BITS = 15
+SMOOTHING = 0.1
+# Every character starts one n-gram of each order, so a message's n-grams
+# are far from independent evidence. Scores are scaled to count each
+# character once before they become a posterior; unscaled, naive Bayes puts
+# nearly every message, however short or ambiguous, above 0.99.
+EVIDENCE_SCALE = 1.0 / len(NGRAM_ORDERS)
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+_PRIME = 0x100000001B3
+_MIX = 0x9E3779B97F4A7C15
+_ORDER_SALT = 0xC2B2AE3D27D4EB4F
+
+
+_KEEP = {}
+_KEEP_CACHE_LENGTH = 2048
+
+if np is not None:
+    _PRIME_U64 = np.uint64(_PRIME)
+    _MIX_U64 = np.uint64(_MIX)
+    _SHIFT_U64 = np.uint64(64 - BUCKET_BITS)
+    _SALTS = np.array([[order * _ORDER_SALT % (1 << 64)] for order in range(1, max(NGRAM_ORDERS) + 1)],
+                      dtype=np.uint64)
+
+
+def normalize(text):
+    # Letters only, lowercased, padded so word starts and ends are n-grams too
+    return " " + _NON_LETTERS.sub(" ", text.lower()).strip() + " "
+
+
+# Character n-gram language identifier.
+#
+# Multinomial naive Bayes over hashed character 1- to 4-grams. Hashing runs
+# as rolling polynomial hashes over the message's code points in NumPy, so a
+# whole batch of messages is featurized with a handful of array operations
+# and scored with one gather and a bincount per language. Weights are log
+# probabilities per (bucket, language) trained from the corpus files at
+# load time, which takes a few milliseconds.
+class LanguageIdentifier:
+    def __init__(self, languages, log_probs):
+        if np is None:
+            raise ImportError("LanguageIdentifier requires numpy (pip install numpy)")
+        self.languages = tuple(languages)
+        self.log_probs = log_probs  # float32, shape (buckets, languages)
+        # Contiguous per-language columns: take() on each beats a 2-D gather
+        # for the few dozen n-grams of a single message
+        self._columns = tuple(np.ascontiguousarray(log_probs[:, column]) for column in range(len(self.languages)))
+
+    def __repr__(self):
+        return f"LanguageIdentifier(languages={list(self.languages)})"
+
+    @classmethod
+    def train(cls, samples, smoothing=SMOOTHING):
+        # samples: {language: [message, ...]}
+        if np is None:
+            raise ImportError("LanguageIdentifier requires numpy (pip install numpy)")
+        languages = sorted(samples)
+        buckets = 1 << BUCKET_BITS
+        log_probs = np.empty((buckets, len(languages)), dtype=np.float32)
+        for column, language in enumerate(languages):
+            ids, _ = _features([normalize(text) for text in samples[language]])
+            counts = np.bincount(ids, minlength=buckets).astype(np.float64) + smoothing
+            log_probs[:, column] = np.log(counts / counts.sum())
+        return cls(languages, log_probs)
+
+    @classmethod
+    def from_corpus(cls, directory=CORPUS_DIR):
+        samples = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(CORPUS_SUFFIX):
+                with open(os.path.join(directory, name), encoding="utf-8") as handle:
+                    samples[name[:-len(CORPUS_SUFFIX)]] = [line.strip() for line in handle if line.strip()]
+        return cls.train(samples)
+
+    def identify(self, text):
+        # (language, confidence) for one message; confidence is the posterior
+        # probability of the winning language under uniform priors, from
+        # scores scaled by EVIDENCE_SCALE
+        ids = _text_features(normalize(text))
+        scores = [float(column.take(ids).sum(dtype=np.float64)) for column in self._columns]
+        top = max(scores)
+        best = scores.index(top)
+        return self.languages[best], 1.0 / sum(math.exp((score - top) * EVIDENCE_SCALE) for score in scores)
+
+    def identify_batch(self, texts):
+        # (languages, confidences) for many messages in one call: a list of
+        # language names and a float array, in input order
+        count = len(texts)
+        if not count:
+            return [], np.empty(0)
+        ids, owners = _features([normalize(text) for text in texts])
+        weights = self.log_probs[ids]
+        scores = np.empty((count, len(self.languages)))
+        for column in range(len(self.languages)):
+            scores[:, column] = np.bincount(owners, weights=weights[:, column], minlength=count)
+        best = scores.argmax(axis=1)
+        scores -= scores[np.arange(count), best][:, None]
+        scores *= EVIDENCE_SCALE
+        confidences = 1.0 / np.exp(scores).sum(axis=1)
+        languages = self.languages
+        return [languages[index] for index in best.tolist()], confidences
+
+
+def _text_features(text):
+    # _features for a single text, without the separator bookkeeping: every
+    # order is hashed over the full zero-padded length, then the n-grams that
+    # would run past the end are dropped with a cached index per length
+    longest = max(NGRAM_ORDERS)
+    codes = np.frombuffer((text + "\0" * (longest - 1)).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    size = len(codes) - longest + 1
+    hashes = np.empty((longest, size), dtype=np.uint64)
+    hashes[0] = codes[:size]
+    for order in range(1, longest):
+        np.multiply(hashes[order - 1], _PRIME_U64, out=hashes[order])
+        hashes[order] += codes[order:order + size]
+    hashes += _SALTS
+    hashes *= _MIX_U64
+    hashes >>= _SHIFT_U64
+    keep = _KEEP.get(size)
+    if keep is None:
+        keep = np.concatenate([np.arange(max(size - order + 1, 0)) + (order - 1) * size for order in NGRAM_ORDERS])
+        if size <= _KEEP_CACHE_LENGTH:
+            _KEEP[size] = keep
+    return hashes.ravel().view(np.int64).take(keep)
+
+
+def _features(texts):
+    # Bucket ids of every n-gram in the normalized texts, and the index of the
+    # text each came from. Texts are joined with NUL separators and hashed in
+    # one pass; n-grams spanning a separator are dropped.
+    codes = np.frombuffer("\0".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    separators = np.concatenate(([0], np.cumsum(codes == 0)))
+    ids = []
+    owners = []
+    hashes = np.zeros(len(codes), dtype=np.uint64)
+    for order in range(1, max(NGRAM_ORDERS) + 1):
+        size = len(codes) - order + 1
+        if size <= 0:
+            break
+        # h[i] for order n extends h[i] for order n - 1 with code point i + n - 1
+        hashes = hashes[:size] * _PRIME_U64 + codes[order - 1:]
+        if order not in NGRAM_ORDERS:
+            continue
+        valid = separators[order:order + size] == separators[:size]
+        salted = hashes[valid] + _SALTS[order - 1, 0]
+        ids.append(((salted * _MIX_U64) >> _SHIFT_U64).astype(np.intp))
+        owners.append(separators[:size][valid])
+    if not ids:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate(ids), np.concatenate(owners)
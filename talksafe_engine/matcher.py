@@ -0,0 +1,141 @@
+import re
+
+
+# Single-pass multi-pattern matcher for category scoring.
+#
+# All patterns are folded into one trie-shaped regex inside a lookahead, so
+# re scans the message once in C and reports the longest pattern starting at
+# every position, overlapping ones included. Every other pattern starting at
+# the same position is a prefix of that one, so those are precomputed per
+# pattern. Occurrences of the patterns found are then counted with
+# str.count, which keeps the weighted scores (len(pattern) x occurrences)
+# identical to the plain substring loop.
+#
+# Categories listed in word_categories count their patterns only as whole
+# words: an occurrence glued to surrounding letters or digits is skipped, so
+# "die" ignores "diet" and "studied" and "plan" ignores "explanation". Only
+# patterns the scan already found are boundary-checked, so whole-word
+# categories share the single scan with the others.
+class PatternMatcher:
+    def __init__(self, pattern_table, word_categories=()):
+        # pattern_table: {category: [pattern, ...]}; category order is kept
+        # so ties resolve exactly like max() over the original dict
+        self.categories = list(pattern_table)
+        word_categories = set(word_categories)
+        targets = {}
+        for index, category in enumerate(self.categories):
+            whole_words = category in word_categories
+            for pattern in pattern_table[category]:
+                if pattern:
+                    # Duplicates inside a category list score twice, as before
+                    targets.setdefault(pattern, ([], []))[whole_words].append(index)
+
+        # Per pattern: (length, substring category indices, whole-word
+        # category indices), and the shorter patterns that are its prefixes
+        self._records = {}
+        self._prefixes = {}
+        for pattern, (anywhere, words) in targets.items():
+            self._records[pattern] = (len(pattern), tuple(anywhere), tuple(words))
+            prefixes = tuple(pattern[:end] for end in range(1, len(pattern)) if pattern[:end] in targets)
+            if prefixes:
+                self._prefixes[pattern] = prefixes
+        self._has_prefixes = frozenset(self._prefixes)
+
+        self._regex = re.compile("(?=(%s))" % _trie_regex(targets)) if targets else None
+
+    def __len__(self):
+        return len(self._records)
+
+    def tally(self, text):
+        # Per category: number of listed patterns present, and the weighted
+        # score. Expects already-lowercased text, like the patterns themselves
+        hits = [0] * len(self.categories)
+        totals = [0] * len(self.categories)
+        if self._regex is None:
+            return hits, totals
+        found = set(self._regex.findall(text))
+        if not found:
+            return hits, totals
+        for pattern in found & self._has_prefixes:
+            found.update(self._prefixes[pattern])
+
+        # The scan only decides which patterns are present; str.count then
+        # supplies their exact non-overlapping occurrence counts
+        records = self._records
+        for pattern in found:
+            length, anywhere, words = records[pattern]
+            if anywhere:
+                weight = length * text.count(pattern)
+                for index in anywhere:
+                    hits[index] += 1
+                    totals[index] += weight
+            if words:
+                occurrences = _word_count(text, pattern)
+                if occurrences:
+                    weight = length * occurrences
+                    for index in words:
+                        hits[index] += 1
+                        totals[index] += weight
+        return hits, totals
+
+    def scores(self, text):
+        return dict(zip(self.categories, self.tally(text)[1]))
+
+    def best_category(self, text, default):
+        category_scores = self.scores(text)
+        if category_scores and max(category_scores.values()) > 0:
+            return max(category_scores, key=category_scores.get)
+        return default
+
+
+def _word_count(text, term):
+    # Occurrences of term in text not glued to a word character on either
+    # side; isalnum() or "_" is exactly re's \w for str
+    count = 0
+    size = len(text)
+    length = len(term)
+    start = text.find(term)
+    while start >= 0:
+        end = start + length
+        before = text[start - 1] if start else " "
+        after = text[end] if end < size else " "
+        if not (before.isalnum() or before == "_" or after.isalnum() or after == "_"):
+            count += 1
+        start = text.find(term, start + 1)
+    return count
+
+
+def _trie_regex(patterns):
+    # Build a nested dict trie, then emit it with continuation tried before
+    # termination so the regex prefers the longest pattern at each position
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return _emit(trie)
+
+
+def _emit(node):
+    terminal = "" in node
+    branches = []
+    for char in sorted(key for key in node if key):
+        child = node[char]
+        prefix = re.escape(char)
+        # Collapse single-child chains into one literal run
+        while len(child) == 1 and "" not in child:
+            (next_char, child), = child.items()
+            prefix += re.escape(next_char)
+        if len(child) == 1:
+            branches.append(prefix)
+        else:
+            branches.append(prefix + _emit(child))
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+    if terminal:
+        if len(branches) == 1:
+            body = "(?:%s)" % body
+        return body + "?"
+    return body
@@ -0,0 +1,90 @@
+import functools
+import os
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine import langid
+from talksafe_engine import semantic
+from talksafe_engine.analysis import TextAnalyzer
+from talksafe_engine.cache import MAX_BYTES, MAX_ENTRIES, AnalysisCache
+from talksafe_engine.packs import PACKS_DIR, PackStore, freeze
+
+
+# Static part of the responder, built once per process and shared by every
+# session: keyword lists, the analyzer and the response packs. Packs load
+# lazily per language and hot-reload from disk; the PackStore swaps whole
+# immutable packs, so the model itself never changes. The optional
+# AnalysisCache is shared the same way: one per process, across sessions.
+class ResponderModel:
+    __slots__ = ("packs", "crisis_keywords", "severity_indicators", "language_indicators",
+                 "positive_words", "negative_words", "default_language", "language_identifier", "semantic_fallback",
+                 "analysis_cache", "analyzer")
+
+    def __init__(self, packs, crisis_keywords, severity_indicators, language_indicators,
+                 positive_words, negative_words, language_identifier=None, semantic_fallback=None,
+                 analysis_cache=None):
+        fields = {
+            "packs": packs,
+            "crisis_keywords": freeze(crisis_keywords),
+            "severity_indicators": freeze(severity_indicators),
+            "language_indicators": freeze(language_indicators),
+            "positive_words": freeze(positive_words),
+            "negative_words": freeze(negative_words),
+            "default_language": packs.default_language,
+            "language_identifier": language_identifier,
+            "semantic_fallback": semantic_fallback,
+            "analysis_cache": analysis_cache,
+        }
+        fields["analyzer"] = TextAnalyzer(
+            packs,
+            fields["crisis_keywords"],
+            fields["severity_indicators"],
+            fields["language_indicators"],
+            fields["positive_words"],
+            fields["negative_words"],
+            language_identifier=language_identifier,
+            semantic_fallback=semantic_fallback,
+            cache=analysis_cache,
+        )
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"ResponderModel(loaded={self.packs.loaded()}, available={self.packs.available()})"
+
+    def resolve(self, language, category):
+        # (list id, responses) for a language/category pair, fallbacks included
+        return self.packs.resolve(language, category)
+
+
+def build_model(packs_dir=None, check_interval=None, cache_entries=MAX_ENTRIES, cache_bytes=MAX_BYTES):
+    # packs_dir defaults to $TALKSAFE_PACKS_DIR, then the bundled packs;
+    # cache_entries=0 analyzes every message afresh
+    packs_dir = packs_dir or os.environ.get("TALKSAFE_PACKS_DIR") or PACKS_DIR
+    options = {} if check_interval is None else {"check_interval": check_interval}
+    # The n-gram identifier needs numpy; without it indicator words decide
+    identifier = langid.LanguageIdentifier.from_corpus() if langid.np is not None else None
+    # So does the semantic fallback; without it unmatched messages get the default category
+    fallback = semantic.SemanticFallback() if semantic.np is not None else None
+    return ResponderModel(
+        PackStore(packs_dir, cultural_responses.DEFAULT_LANGUAGE, **options),
+        cultural_responses.CRISIS_KEYWORDS,
+        cultural_responses.SEVERITY_INDICATORS,
+        cultural_responses.LANGUAGE_INDICATORS,
+        cultural_responses.POSITIVE_WORDS,
+        cultural_responses.NEGATIVE_WORDS,
+        language_identifier=identifier,
+        semantic_fallback=fallback,
+        analysis_cache=AnalysisCache(cache_entries, cache_bytes) if cache_entries else None,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_model():
+    # Process-wide model for code running outside Streamlit (CLI, workers)
+    return build_model()
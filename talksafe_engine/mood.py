@@ -0,0 +1,175 @@
+import sys
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # cohort summaries are optional; per-session tracking is not
+    np = None
+
+MOOD_LABELS = ("good", "okay", "bad")
+MOOD_CODES = {label: code for code, label in enumerate(MOOD_LABELS)}
+GOOD, OKAY, BAD = range(3)
+
+
+# Per-session mood history as integer codes with timestamps.
+#
+# Codes and times live in fixed-capacity typed arrays used as a ring, and the
+# rolling window counts, bad streaks and per-hour counts are updated as each
+# mood is recorded, so reading the trends never rescans the history.
+# Iterating yields mood labels oldest first, like the list it replaces.
+class MoodTracker:
+    __slots__ = ("capacity", "_codes", "_times", "_next", "_size", "window_counts", "total_counts",
+                 "hourly_counts", "bad_streak", "longest_bad_streak")
+
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self._codes = array("b", [0]) * capacity
+        self._times = array("d", [0.0]) * capacity
+        self._next = 0
+        self._size = 0
+        self.window_counts = [0, 0, 0]
+        self.total_counts = [0, 0, 0]
+        self.hourly_counts = array("l", [0]) * (24 * 3)
+        self.bad_streak = 0
+        self.longest_bad_streak = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for index in self._positions():
+            yield MOOD_LABELS[self._codes[index]]
+
+    def _positions(self):
+        start = (self._next - self._size) % self.capacity
+        for offset in range(self._size):
+            yield (start + offset) % self.capacity
+
+    def append(self, mood, timestamp=None):
+        code = MOOD_CODES[mood]
+        if timestamp is None:
+            timestamp = time.time()
+        slot = self._next
+        if self._size == self.capacity:
+            self.window_counts[self._codes[slot]] -= 1
+        else:
+            self._size += 1
+        self._codes[slot] = code
+        self._times[slot] = timestamp
+        self._next = (slot + 1) % self.capacity
+
+        self.window_counts[code] += 1
+        self.total_counts[code] += 1
+        self.hourly_counts[int(timestamp // 3600 % 24) * 3 + code] += 1
+        if code == BAD:
+            self.bad_streak += 1
+            if self.bad_streak > self.longest_bad_streak:
+                self.longest_bad_streak = self.bad_streak
+        else:
+            self.bad_streak = 0
+
+    def recent(self, count):
+        return list(self)[-count:] if count else []
+
+    def ratios(self):
+        # Share of each mood over the rolling window (the last `capacity` turns)
+        if not self._size:
+            return {label: 0.0 for label in MOOD_LABELS}
+        return {label: self.window_counts[code] / self._size for code, label in enumerate(MOOD_LABELS)}
+
+    def hourly(self):
+        # {UTC hour: {mood: count}} for hours with at least one recorded mood
+        counts = self.hourly_counts
+        return {
+            hour: {label: counts[hour * 3 + code] for code, label in enumerate(MOOD_LABELS)}
+            for hour in range(24)
+            if counts[hour * 3] or counts[hour * 3 + 1] or counts[hour * 3 + 2]
+        }
+
+    def approx_bytes(self):
+        return (sys.getsizeof(self) + sys.getsizeof(self._codes) + sys.getsizeof(self._times)
+                + sys.getsizeof(self.hourly_counts))
+
+    def to_arrays(self):
+        # Chronological (codes, timestamps) copies for export or cohort summaries
+        positions = list(self._positions())
+        codes = array("b", (self._codes[index] for index in positions))
+        times = array("d", (self._times[index] for index in positions))
+        return codes, times
+
+    def snapshot(self):
+        # Compact JSON-ready state: chronological codes, times in whole
+        # milliseconds and the non-zero hourly counts as [index, count] pairs
+        codes, times = self.to_arrays()
+        return [self.capacity, list(codes), [round(timestamp * 1000) for timestamp in times], self.total_counts,
+                [[index, count] for index, count in enumerate(self.hourly_counts) if count],
+                self.bad_streak, self.longest_bad_streak]
+
+    @classmethod
+    def restore(cls, state):
+        capacity, codes, times, total_counts, hourly, bad_streak, longest_bad_streak = state
+        tracker = cls(capacity)
+        for slot, (code, millis) in enumerate(zip(codes, times)):
+            tracker._codes[slot] = code
+            tracker._times[slot] = millis / 1000
+            tracker.window_counts[code] += 1
+        tracker._size = len(codes)
+        tracker._next = len(codes) % capacity
+        tracker.total_counts = list(total_counts)
+        for index, count in hourly:
+            tracker.hourly_counts[index] = count
+        tracker.bad_streak = bad_streak
+        tracker.longest_bad_streak = longest_bad_streak
+        return tracker
+
+    def summary(self):
+        return {
+            "recorded": sum(self.total_counts),
+            "window": self._size,
+            "ratios": self.ratios(),
+            "bad_streak": self.bad_streak,
+            "longest_bad_streak": self.longest_bad_streak,
+        }
+
+
+def summarize_cohort(codes, timestamps, session_ids=None):
+    # Vectorized summary over many sessions' mood records for dashboards.
+    # codes, timestamps and optional session_ids are equal-length sequences
+    # (NumPy arrays avoid a copy); records of a session must be contiguous
+    # and in time order for the streak figures. Hours are UTC.
+    if np is None:
+        raise ImportError("summarize_cohort requires numpy (pip install numpy)")
+    codes = np.asarray(codes, dtype=np.int8)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    total = int(codes.size)
+
+    counts = np.bincount(codes, minlength=3)[:3]
+    hours = (timestamps // 3600 % 24).astype(np.int64)
+    hourly = np.bincount(hours * 3 + codes, minlength=72).reshape(24, 3)
+
+    longest_bad_streak = 0
+    mean_bad_streak = 0.0
+    if total:
+        bad = codes == BAD
+        boundary = np.empty(total, dtype=bool)
+        boundary[0] = True
+        np.not_equal(bad[1:], bad[:-1], out=boundary[1:])
+        if session_ids is not None:
+            session_ids = np.asarray(session_ids)
+            boundary[1:] |= session_ids[1:] != session_ids[:-1]
+        run_starts = np.flatnonzero(boundary)
+        run_lengths = np.diff(np.append(run_starts, total))
+        bad_runs = run_lengths[bad[run_starts]]
+        if bad_runs.size:
+            longest_bad_streak = int(bad_runs.max())
+            mean_bad_streak = float(bad_runs.mean())
+
+    return {
+        "records": total,
+        "counts": {label: int(counts[code]) for code, label in enumerate(MOOD_LABELS)},
+        "ratios": {label: (float(counts[code]) / total if total else 0.0) for code, label in enumerate(MOOD_LABELS)},
+        "hourly": {label: hourly[:, code].tolist() for code, label in enumerate(MOOD_LABELS)},
+        "longest_bad_streak": longest_bad_streak,
+        "mean_bad_streak": mean_bad_streak,
+    }
@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+# One JSON file per language: packs/<language>.json holding
+#   {"language": "...", "categories": {category: {"patterns": [...], "responses": [...]}}}
+# A category may also list "examples": sample user messages that feed the
+# semantic fallback (see semantic.py) but are never matched as patterns.
+PACKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packs")
+PACK_SUFFIX = ".json"
+CHECK_INTERVAL = 2.0
+
+
+def freeze(value):
+    # Read-only view of nested tables: dicts become mappingproxies and lists
+    # become tuples
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# One language's response tables, as read from disk. Immutable: a reload
+# builds a new pack and swaps it in, so readers never see a half-updated one.
+class ResponsePack:
+    __slots__ = ("language", "categories", "path", "mtime")
+
+    def __init__(self, language, categories, path=None, mtime=None):
+        fields = {"language": language, "categories": freeze(categories), "path": path, "mtime": mtime}
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"ResponsePack({self.language!r}, categories={list(self.categories)})"
+
+
+def read_pack(path):
+    with open(path, encoding="utf-8") as handle:
+        mtime = os.fstat(handle.fileno()).st_mtime_ns
+        data = json.load(handle)
+    language = data.get("language") or os.path.basename(path)[:-len(PACK_SUFFIX)]
+    categories = data.get("categories")
+    if not isinstance(categories, dict) or not categories:
+        raise ValueError(f"{path}: 'categories' must be a non-empty object")
+    for category, table in categories.items():
+        if not isinstance(table, dict) or not isinstance(table.get("patterns"), list):
+            raise ValueError(f"{path}: {category}.patterns must be a list")
+        if not isinstance(table.get("responses"), list) or not table["responses"]:
+            raise ValueError(f"{path}: {category}.responses must be a non-empty list")
+        if not isinstance(table.get("examples", []), list):
+            raise ValueError(f"{path}: {category}.examples must be a list")
+    return ResponsePack(language, categories, path, mtime)
+
+
+def with_default_categories(pack, default_pack):
+    # The pack's categories, then the default pack's categories it lacks: the
+    # same fallback PackStore.resolve applies to replies, so a message about
+    # a category missing from its language can still be recognized
+    if default_pack is None or default_pack is pack:
+        return pack.categories
+    categories = dict(pack.categories)
+    for category, table in default_pack.categories.items():
+        categories.setdefault(category, table)
+    return categories
+
+
+# Lazily loaded, hot-reloadable response packs.
+#
+# A language's file is read the first time that language is asked for, so
+# startup cost and per-worker memory grow with the languages actually in
+# use rather than with every pack shipped. Each loaded pack's file is
+# stat()ed at most once per check_interval; a changed mtime triggers a
+# reload, and a file that fails to parse leaves the previous pack serving
+# (the error is kept in `errors`). Lookups are lock-free dict reads; only
+# loads take the lock.
+class PackStore:
+    def __init__(self, directory=PACKS_DIR, default_language="english", default_category="greetings",
+                 check_interval=CHECK_INTERVAL, clock=time.monotonic):
+        self.directory = directory
+        self.default_language = default_language
+        self.default_category = default_category
+        self.check_interval = check_interval
+        self.clock = clock
+        self.generation = 0
+        self.loads = 0
+        self.reloads = 0
+        self.errors = {}
+        self._packs = {}
+        self._checked = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+        # The default language backs every fallback, so it must exist up front
+        if self.get(default_language) is None:
+            raise FileNotFoundError(f"no response pack for default language {default_language!r} in {directory}")
+
+    def __repr__(self):
+        return f"PackStore({self.directory!r}, loaded={self.loaded()})"
+
+    def path(self, language):
+        return os.path.join(self.directory, language + PACK_SUFFIX)
+
+    def available(self):
+        # Languages with a pack on disk, loaded or not
+        return sorted(name[:-len(PACK_SUFFIX)] for name in os.listdir(self.directory) if name.endswith(PACK_SUFFIX))
+
+    def loaded(self):
+        return sorted(self._packs)
+
+    def get(self, language):
+        # The current pack for `language`, or None when it has no pack file
+        pack = self._packs.get(language)
+        if pack is not None:
+            now = self.clock()
+            if now - self._checked[language] < self.check_interval:
+                return pack
+            return self._refresh(language, now)
+        if language is None or os.sep in language or language.startswith("."):
+            return None
+        return self._refresh(language, self.clock())
+
+    def default_pack(self):
+        return self.get(self.default_language)
+
+    def _refresh(self, language, now):
+        with self._lock:
+            current = self._packs.get(language)
+            if current is not None and now - self._checked[language] < self.check_interval:
+                return current  # another thread just checked
+            path = self.path(language)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                # A pack deleted from disk keeps serving until the process restarts
+                if current is not None:
+                    self._checked[language] = now
+                return current
+            if current is not None and current.mtime == mtime:
+                self._checked[language] = now
+                return current
+            try:
+                pack = read_pack(path)
+            except (OSError, ValueError, TypeError, AttributeError) as error:
+                self.errors[language] = str(error)
+                if current is not None:
+                    self._checked[language] = now
+                return current
+            self.errors.pop(language, None)
+            # _checked first: get() reads it without the lock once the pack is visible
+            self._checked[language] = now
+            self._packs[language] = pack
+            self._resolved = {}
+            self.generation += 1
+            if current is None:
+                self.loads += 1
+            else:
+                self.reloads += 1
+            return pack
+
+    def resolve(self, language, category):
+        # (list id, responses) for a language/category pair. A category missing
+        # from a language falls back to the same category in the default
+        # language, then to the default language's greetings. The list id
+        # names the pack and category the text came from, so a session's
+        # anti-repetition memory follows the text actually shown and survives
+        # reloads. Resolutions are memoized until the next (re)load.
+        pack = self.get(language)
+        resolved = self._resolved
+        entry = resolved.get((language, category))
+        if entry is None:
+            entry = resolved[(language, category)] = self._resolve(pack, category)
+        return entry
+
+    def _resolve(self, pack, category):
+        default = self.default_pack()
+        for source, name in ((pack, category), (default, category), (default, self.default_category)):
+            if source is not None and name in source.categories:
+                return (source.language, name), source.categories[name]["responses"]
+        raise KeyError(f"default pack has no {self.default_category!r} category")
+
+    def metrics(self):
+        return {
+            "loaded": self.loaded(),
+            "generation": self.generation,
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "errors": dict(self.errors),
+        }
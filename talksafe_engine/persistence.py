@@ -0,0 +1,204 @@
+import hashlib
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+FSYNC_INTERVAL = 5.0
+MAX_PENDING = 20000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    created REAL NOT NULL,
+    language TEXT,
+    category TEXT,
+    mood TEXT,
+    is_crisis INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session, id);
+"""
+INSERT = ("INSERT INTO messages (session, created, language, category, mood, is_crisis, chars, text) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def open_database(path, fsync_interval=FSYNC_INTERVAL):
+    # WAL lets analytics readers run alongside the writer. With a positive
+    # fsync_interval, commits are not synced (synchronous=NORMAL, automatic
+    # checkpoints off) and the writer checkpoints every fsync_interval
+    # seconds, which is when data reaches the disk; 0 syncs every commit.
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    if fsync_interval > 0:
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA wal_autocheckpoint=0")
+    else:
+        connection.execute("PRAGMA synchronous=FULL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def session_salt(connection):
+    # Random per database, so hashed session ids stay stable across restarts
+    # but cannot be recomputed from a raw id without the database itself
+    row = connection.execute("SELECT value FROM meta WHERE key = 'session_salt'").fetchone()
+    if row is not None:
+        return bytes(row[0])
+    salt = secrets.token_bytes(16)
+    connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('session_salt', ?)", (salt,))
+    return bytes(connection.execute("SELECT value FROM meta WHERE key = 'session_salt'").fetchone()[0])
+
+
+def hash_session_id(session_id, salt):
+    return hashlib.blake2b(session_id.encode("utf-8"), digest_size=16, key=salt).hexdigest()
+
+
+# Write-behind store of anonymized conversation records.
+#
+# record() only appends to an in-memory queue and never touches the disk,
+# so the chat path pays no I/O latency. A background thread drains the
+# queue in batches of up to batch_size records, one transaction each,
+# waking when a batch fills or every flush_interval seconds. Session ids are
+# replaced by salted hashes on that thread before anything is written, and
+# message text is kept only with store_text=True; by default a record holds
+# the analysis labels and message length.
+#
+# The queue is bounded by max_pending: when the disk falls that far behind,
+# new records are dropped and counted rather than growing memory or blocking
+# the caller. close() stops accepting records and flushes everything queued.
+class SessionRecorder:
+    def __init__(self, path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, fsync_interval=FSYNC_INTERVAL,
+                 max_pending=MAX_PENDING, store_text=False, clock=time.time):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_pending = max_pending
+        self.store_text = store_text
+        self.clock = clock
+        self._connection = open_database(path, fsync_interval)
+        self._salt = session_salt(self._connection)
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._closing = False
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.checkpoints = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="talksafe-session-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, session_id, language, category, mood, is_crisis, text):
+        # Called on the chat path: one append, no locks, no I/O
+        pending = self._pending
+        if self._closing or len(pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        pending.append((session_id, self.clock(), language, category, mood, is_crisis, text))
+        if len(pending) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def _run(self):
+        last_sync = time.monotonic()
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closing
+            while self._pending:
+                self._write_batch()
+            now = time.monotonic()
+            if closing or (self.fsync_interval > 0 and now - last_sync >= self.fsync_interval):
+                self._checkpoint()
+                last_sync = now
+            if closing:
+                return
+
+    def _write_batch(self):
+        pending = self._pending
+        rows = []
+        salt = self._salt
+        store_text = self.store_text
+        hashed = {}
+        for _ in range(min(self.batch_size, len(pending))):
+            session_id, created, language, category, mood, is_crisis, text = pending.popleft()
+            session = hashed.get(session_id)
+            if session is None:
+                session = hashed[session_id] = hash_session_id(session_id, salt)
+            rows.append((session, created, language, category, mood, int(bool(is_crisis)), len(text),
+                         text if store_text else None))
+        try:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.executemany(INSERT, rows)
+        except sqlite3.Error as error:
+            # The batch is lost, but the recorder keeps running for later ones
+            self.errors += 1
+            self.dropped += len(rows)
+            self.last_error = str(error)
+            print(f"session recorder: dropped {len(rows)} records: {error}", file=sys.stderr)
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def _checkpoint(self):
+        if self.fsync_interval > 0:
+            try:
+                self._connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                self.checkpoints += 1
+            except sqlite3.Error as error:
+                self.errors += 1
+                self.last_error = str(error)
+
+    def flush(self, timeout=None):
+        # Waits until everything queued so far has been committed
+        deadline = None if timeout is None else time.monotonic() + timeout
+        target = self.written + self.dropped + len(self._pending)
+        while self.written + self.dropped < target and self._thread.is_alive():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout=None):
+        if self._closing:
+            return
+        self._closing = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            # Anything appended while the thread was finishing missed the last batch
+            self.dropped += len(self._pending)
+            self._pending.clear()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def metrics(self):
+        return {
+            "path": os.path.abspath(self.path),
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "checkpoints": self.checkpoints,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
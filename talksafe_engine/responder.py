@@ -0,0 +1,132 @@
+import sys
+
+from talksafe_engine.analysis import CRISIS_CATEGORY
+from talksafe_engine.crisis import CrisisScorer
+from talksafe_engine.intake import SubmissionGuard
+from talksafe_engine.metrics import METRICS
+from talksafe_engine.mood import MoodTracker
+from talksafe_engine.selector import ResponseSelector
+from talksafe_engine.sessions import CONTEXT_LIMIT, MOOD_HISTORY_LIMIT, approx_bytes, ring
+
+# Pipeline stages timed in generate_response, after the analyzer's own
+_CRISIS_RISK_STAGE = METRICS.histogram("crisis_risk")
+_SELECTION_STAGE = METRICS.histogram("selection")
+_TOTAL_STAGE = METRICS.histogram("generate_response")
+
+
+# Crisis detection system
+class CrisisDetector:
+    __slots__ = ("model",)
+
+    def __init__(self, model):
+        self.model = model
+
+    def detect_crisis(self, text):
+        return self.model.analyzer.analyze(text).is_crisis
+
+
+# Intelligent response system with cultural sensitivity.
+#
+# Only the conversation state lives here, in fixed-size ring buffers;
+# everything static comes from the shared ResponderModel. With a recorder
+# (a SessionRecorder), every exchange is also queued for durable storage
+# under session_id; with an escalation queue (an EscalationQueue), crisis
+# turns are queued for a human counsellor. The front end that receives
+# messages may attach a SubmissionGuard as `intake`, which then travels with
+# the session's snapshot.
+class CulturalResponder:
+    __slots__ = ("model", "conversation_context", "user_mood_history", "crisis_scorer", "selector", "recorder",
+                 "session_id", "escalation", "intake")
+
+    def __init__(self, model, seed=None, recorder=None, session_id=None, escalation=None):
+        # seed makes this session's reply choices reproducible
+        self.model = model
+        self.intake = None
+        self.recorder = recorder
+        self.session_id = session_id
+        self.escalation = escalation
+        self.selector = ResponseSelector(seed)
+        self.conversation_context = ring(CONTEXT_LIMIT)
+        self.user_mood_history = MoodTracker(MOOD_HISTORY_LIMIT)
+        # Risk window matches the conversation context kept above
+        self.crisis_scorer = CrisisScorer(CONTEXT_LIMIT)
+
+    def approx_bytes(self):
+        return (sys.getsizeof(self) + approx_bytes(self.conversation_context)
+                + self.user_mood_history.approx_bytes() + sys.getsizeof(self.crisis_scorer)
+                + sys.getsizeof(self.selector))
+
+    def snapshot(self):
+        # The conversation state as JSON-ready lists; the model, recorder and
+        # escalation queue are process resources and are supplied again on restore
+        state = {
+            "context": [[turn["input"], turn["response"], turn["mood"], turn["is_crisis"]]
+                        for turn in self.conversation_context],
+            "mood": self.user_mood_history.snapshot(),
+            "crisis": self.crisis_scorer.snapshot(),
+            "selector": self.selector.snapshot(),
+        }
+        if self.intake is not None:
+            state["intake"] = self.intake.snapshot()
+        return state
+
+    @classmethod
+    def restore(cls, model, state, recorder=None, session_id=None, escalation=None):
+        responder = cls(model, None, recorder, session_id, escalation)
+        # Snapshots from before is_crisis was kept per turn have three entries
+        for user_input, response, mood, *is_crisis in state["context"]:
+            responder.conversation_context.append({"input": user_input, "response": response, "mood": mood,
+                                                   "is_crisis": bool(is_crisis and is_crisis[0])})
+        responder.user_mood_history = MoodTracker.restore(state["mood"])
+        responder.crisis_scorer = CrisisScorer.restore(state["crisis"])
+        responder.selector = ResponseSelector.restore(state["selector"])
+        if "intake" in state:
+            responder.intake = SubmissionGuard.restore(state["intake"])
+        return responder
+
+    def detect_language(self, user_input):
+        return self.model.analyzer.analyze(user_input).language
+
+    def analyze_mood(self, user_input):
+        return self.model.analyzer.analyze(user_input).mood
+
+    def get_response_category(self, user_input, language):
+        # Category scores come from the same single scan: len(pattern) x occurrences
+        return self.model.analyzer.analyze(user_input, language).category
+
+    def generate_response(self, user_input):
+        # One pass over the message feeds every decision below
+        watch = METRICS.stopwatch()
+        analysis = self.model.analyzer.analyze(user_input, stopwatch=watch)
+        assessment = self.crisis_scorer.update(analysis)
+        is_crisis = assessment.is_crisis
+        language = analysis.language
+        mood = analysis.mood
+        self.user_mood_history.append(mood)
+        if watch:
+            watch.lap(_CRISIS_RISK_STAGE)
+
+        # Get appropriate category; conversation risk can make a turn a crisis
+        # even when the message alone is not
+        if is_crisis:
+            category = CRISIS_CATEGORY
+        else:
+            category = analysis.category
+
+        # Generate response; fallbacks (e.g. Pidgin to English) are pre-resolved in the model
+        response = self.selector.choose(self.model.resolve(language, category))
+
+        # Update conversation context; the ring keeps the last CONTEXT_LIMIT turns
+        self.conversation_context.append({"input": user_input, "response": response, "mood": mood,
+                                          "is_crisis": is_crisis})
+        if watch:
+            watch.lap(_SELECTION_STAGE)
+            watch.total(_TOTAL_STAGE)
+        METRICS.count_message(language, category, mood, is_crisis)
+        if self.recorder is not None:
+            self.recorder.record(self.session_id, language, category, mood, is_crisis, user_input)
+        if is_crisis and self.escalation is not None:
+            self.escalation.escalate(self.session_id, language, assessment.risk, assessment.message_score,
+                                     assessment.escalating, user_input)
+
+        return response, is_crisis, mood, language
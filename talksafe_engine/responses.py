@@ -0,0 +1,48 @@
+import json
+import os
+
+from talksafe_engine.packs import PACK_SUFFIX, PACKS_DIR
+
+# Static keyword lists shared by the crisis, language and mood checks
+CRISIS_KEYWORDS = [
+    "suicide", "kill myself", "die", "end it all", "hurt myself",
+    "not worth living", "give up", "better off dead", "can't go on"
+]
+SEVERITY_INDICATORS = [
+    "plan", "method", "tonight", "today", "pills", "rope", "bridge"
+]
+LANGUAGE_INDICATORS = {
+    "pidgin": ["wetin", "dey", "how far", "wahala", "no be", "fit", "make we"]
+}
+DEFAULT_LANGUAGE = "english"
+POSITIVE_WORDS = ["good", "great", "happy", "fine", "better", "okay"]
+NEGATIVE_WORDS = ["bad", "terrible", "awful", "depressed", "anxious", "overwhelmed", "stressed"]
+
+# The app's quick-help buttons as (label, message sent), per language. Every
+# press sends the same text, so their analyses are cached at startup.
+QUICK_ACTIONS = {
+    "english": [
+        ("😰 Feeling Anxious", "I'm feeling anxious and overwhelmed"),
+        ("📚 Academic Stress", "I'm stressed about school and my studies"),
+        ("💔 Relationship Issues", "I'm having relationship problems that are affecting me"),
+        ("💰 Financial Pressure", "I'm stressed about money and financial issues"),
+    ],
+    "pidgin": [
+        ("😰 I Dey Worry", "I dey feel anxiety and I no know wetin to do"),
+        ("📚 School Wahala", "School dey stress me and I dey overwhelmed"),
+        ("💔 Relationship Matter", "I get relationship wahala wey dey worry me"),
+        ("💰 Money Problem", "I get financial stress wey dey affect my mental health"),
+    ],
+}
+
+# Multilingual response templates with Nigerian cultural context live in
+# per-language packs (talksafe_engine/packs/<language>.json) and are loaded
+# lazily by PackStore. This reads every pack eagerly, for tools and exports.
+def load_cultural_responses(directory=PACKS_DIR):
+    responses = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(PACK_SUFFIX):
+            with open(os.path.join(directory, name), encoding="utf-8") as handle:
+                data = json.load(handle)
+            responses[data.get("language") or name[:-len(PACK_SUFFIX)]] = data["categories"]
+    return responses
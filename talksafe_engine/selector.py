@@ -0,0 +1,73 @@
+import base64
+import random
+import zlib
+from array import array
+
+RECENT_LIMIT = 1
+
+
+# Per-session response choice that avoids repeating recent replies.
+#
+# For each response list the session keeps a bitmask of the indices used in
+# its last few picks (at most one fewer than the list length, so a choice
+# always remains) and draws uniformly from the rest. Without a seed the
+# process-wide random generator is used, so unseeded sessions carry no RNG
+# state; with a seed the session gets its own generator and its replies can
+# be replayed exactly.
+class ResponseSelector:
+    __slots__ = ("rng", "recent_limit", "_recent")
+
+    def __init__(self, seed=None, recent_limit=RECENT_LIMIT):
+        self.rng = random if seed is None else random.Random(seed)
+        self.recent_limit = recent_limit
+        # list id -> (bitmask of recent indices, recent indices oldest first)
+        self._recent = {}
+
+    def choose(self, entry):
+        list_id, responses = entry
+        count = len(responses)
+        if count == 1:
+            return responses[0]
+        mask, order = self._recent.get(list_id, (0, ()))
+        pick = self.rng.randrange(count - len(order))
+        index = 0
+        while True:
+            if not mask >> index & 1:
+                if not pick:
+                    break
+                pick -= 1
+            index += 1
+
+        mask |= 1 << index
+        order += (index,)
+        if len(order) > min(self.recent_limit, count - 1):
+            mask &= ~(1 << order[0])
+            order = order[1:]
+        self._recent[list_id] = (mask, order)
+        return responses[index]
+
+    def snapshot(self):
+        # A seeded generator's state (625 words) is only carried by seeded
+        # sessions; unseeded ones share the process-wide generator
+        rng = None
+        if self.rng is not random:
+            version, words, gauss = self.rng.getstate()
+            rng = [version, base64.b64encode(array("I", words).tobytes()).decode("ascii"), gauss]
+        recent = [[list(list_id), mask, list(order)] for list_id, (mask, order) in self._recent.items()]
+        return [self.recent_limit, recent, rng]
+
+    @classmethod
+    def restore(cls, state):
+        recent_limit, recent, rng = state
+        selector = cls(recent_limit=recent_limit)
+        if rng is not None:
+            version, words, gauss = rng
+            selector.rng = random.Random()
+            selector.rng.setstate((version, tuple(array("I", base64.b64decode(words))), gauss))
+        selector._recent = {tuple(list_id): (mask, tuple(order)) for list_id, mask, order in recent}
+        return selector
+
+
+def session_seed(base_seed, session_id):
+    # Stable across processes, unlike hash(), so replays line up
+    return base_seed ^ zlib.crc32(session_id.encode("utf-8"))
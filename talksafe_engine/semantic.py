@@ -0,0 +1,192 @@
+import math
+import re
+
+from talksafe_engine.packs import with_default_categories
+
+try:
+    import numpy as np
+except ImportError:  # without numpy unmatched messages keep the default category
+    np = None
+
+# Cosine similarity a message needs to its nearest category before the
+# fallback overrides the default category
+SEMANTIC_THRESHOLD = 0.15
+# Word and bigram features a message must share with the pack before the
+# fallback may fire at all: a single shared word ("no", "anything") plus a
+# few character n-grams easily clears the threshold above
+MIN_WORD_FEATURES = 2
+# Messages of at most this many words ("nothing much") need the stricter
+# threshold below
+SHORT_MESSAGE_WORDS = 3
+SHORT_MESSAGE_THRESHOLD = 0.3
+# Never chosen by similarity: crisis replies follow the crisis scorer only
+EXCLUDED_CATEGORIES = ("crisis",)
+CHAR_NGRAM = 4
+# Share of the highest idf given to a message feature the pack never uses.
+# The packs are small, so most unseen words are ordinary vocabulary missing
+# by chance rather than evidence against every category; at full weight a
+# sentence with a few such words ("lately") never reached the threshold.
+UNSEEN_WEIGHT = 0.5
+# No bigram is made of two of these: "for my" is rare enough in a small pack
+# to carry a high idf, and pulled "I studied hard for my diet" to
+# financial_stress through "I can't pay for my hostel"
+FUNCTION_WORDS = frozenset("""
+a an and are as at be but by do for from have i i'm in is it me my of on or so
+that the this to was we with you your
+""".split())
+
+_WORDS = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+
+def features(text):
+    # {feature: count} for lowercased text: words, word bigrams and the
+    # character n-grams of each word (so "sleeping" still meets "sleep")
+    counts = {}
+    words = _WORDS.findall(text)
+    previous = None
+    for word in words:
+        key = "w " + word
+        counts[key] = counts.get(key, 0) + 1
+        if previous is not None and not (previous in FUNCTION_WORDS and word in FUNCTION_WORDS):
+            key = f"b {previous} {word}"
+            counts[key] = counts.get(key, 0) + 1
+        previous = word
+        padded = f"<{word}>"
+        for start in range(len(padded) - CHAR_NGRAM + 1):
+            key = "c " + padded[start:start + CHAR_NGRAM]
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+# TF-IDF vectors of one response pack's example phrasings, patterns and
+# responses, with nearest-category lookup by cosine similarity.
+#
+# Built once per pack: every document becomes an L2-normalized row, and the
+# matrix is stored transposed (features x documents, float32) so a message
+# only gathers the rows of the few dozen features it contains and takes one
+# small matrix-vector product. Features are looked up in the vocabulary of
+# the pack instead of being hashed: unseen features cannot contribute to a
+# dot product, so they only enter the message's norm (at UNSEEN_WEIGHT of
+# the highest idf), and nothing collides. Documents are grouped by category, so the best
+# document per category is one maximum.reduceat.
+class SemanticIndex:
+    __slots__ = ("categories", "vocabulary", "idf", "unseen_idf", "columns", "starts", "documents")
+
+    def __init__(self, documents):
+        # documents: {category: [text, ...]}, texts already lowercased
+        if np is None:
+            raise ImportError("SemanticIndex requires numpy (pip install numpy)")
+        self.categories = tuple(category for category, texts in documents.items() if texts)
+        vectors = []
+        starts = []
+        for category in self.categories:
+            starts.append(len(vectors))
+            vectors.extend(features(text) for text in documents[category])
+        self.documents = len(vectors)
+        self.starts = np.array(starts, dtype=np.intp)
+
+        self.vocabulary = {}
+        frequencies = []
+        for vector in vectors:
+            for feature in vector:
+                column = self.vocabulary.setdefault(feature, len(self.vocabulary))
+                if column == len(frequencies):
+                    frequencies.append(0)
+                frequencies[column] += 1
+        # Smoothed idf without the usual +1, so a feature found in every
+        # document (e.g. "w i") carries no weight
+        self.idf = [math.log((1 + self.documents) / (1 + frequency)) for frequency in frequencies]
+        self.unseen_idf = UNSEEN_WEIGHT * math.log(1 + self.documents)
+
+        matrix = np.zeros((len(self.vocabulary), max(self.documents, 1)), dtype=np.float32)
+        for row, vector in enumerate(vectors):
+            for feature, count in vector.items():
+                column = self.vocabulary[feature]
+                matrix[column, row] = (1.0 + math.log(count)) * self.idf[column]
+        norms = np.linalg.norm(matrix, axis=0)
+        norms[norms == 0] = 1.0
+        self.columns = np.ascontiguousarray(matrix / norms)
+
+    def __repr__(self):
+        return f"SemanticIndex(categories={list(self.categories)}, documents={self.documents})"
+
+    def nearest(self, text):
+        # (category, cosine similarity, shared word and bigram features,
+        # words) of the closest document; category None and similarity 0.0
+        # when the message shares nothing with the pack. Shared features
+        # every document has don't count.
+        words = 0
+        if not self.categories:
+            return None, 0.0, 0, words
+        vocabulary = self.vocabulary
+        idf = self.idf
+        unseen_idf = self.unseen_idf
+        columns = []
+        weights = []
+        shared_words = 0
+        norm = 0.0
+        for feature, count in features(text).items():
+            if feature[0] == "w":
+                words += count
+            column = vocabulary.get(feature)
+            tf = 1.0 + math.log(count)
+            if column is None:
+                norm += (tf * unseen_idf) ** 2
+                continue
+            weight = tf * idf[column]
+            norm += weight * weight
+            columns.append(column)
+            weights.append(weight)
+            if weight and feature[0] != "c":
+                shared_words += 1
+        if not columns or norm == 0.0:
+            return None, 0.0, 0, words
+        similarities = np.array(weights, dtype=np.float32) @ self.columns[columns]
+        best = np.maximum.reduceat(similarities, self.starts)
+        index = int(best.argmax())
+        return self.categories[index], float(best[index]) / math.sqrt(norm), shared_words, words
+
+
+# Builds the SemanticIndex for each response pack: one document per example
+# message and per response, plus one holding all of a category's patterns.
+# choose() decides whether the nearest category is close enough; short small
+# talk shares a word or two with some category and must keep the default.
+class SemanticFallback:
+    def __init__(self, threshold=SEMANTIC_THRESHOLD, excluded_categories=EXCLUDED_CATEGORIES,
+                 min_word_features=MIN_WORD_FEATURES, short_message_words=SHORT_MESSAGE_WORDS,
+                 short_message_threshold=SHORT_MESSAGE_THRESHOLD):
+        if np is None:
+            raise ImportError("SemanticFallback requires numpy (pip install numpy)")
+        self.threshold = threshold
+        self.excluded_categories = frozenset(excluded_categories)
+        self.min_word_features = min_word_features
+        self.short_message_words = short_message_words
+        self.short_message_threshold = short_message_threshold
+
+    def __repr__(self):
+        return f"SemanticFallback(threshold={self.threshold})"
+
+    def index(self, pack, default_pack=None):
+        # default_pack adds the categories `pack` lacks
+        documents = {}
+        for category, table in with_default_categories(pack, default_pack).items():
+            if category in self.excluded_categories:
+                continue
+            texts = [text.lower() for text in table.get("examples", ())]
+            texts.extend(response.lower() for response in table["responses"])
+            if table["patterns"]:
+                texts.append(" ".join(table["patterns"]).lower())
+            documents[category] = texts
+        return SemanticIndex(documents)
+
+    def choose(self, index, text):
+        # (category or None, similarity) for a message no pattern matched
+        category, similarity, shared_words, words = index.nearest(text)
+        if category is None or shared_words < self.min_word_features:
+            return None, similarity
+        threshold = self.threshold
+        if words <= self.short_message_words:
+            threshold = max(threshold, self.short_message_threshold)
+        if similarity < threshold:
+            return None, similarity
+        return category, similarity
@@ -0,0 +1,594 @@
+# Async chat API for SMS/WhatsApp gateways, serving the same responder as the
+# Streamlit app without its rerun-per-message model.
+#
+#   python -m talksafe_engine.server --host 0.0.0.0 --port 8080
+#
+#   POST   /chat              {"session_id": "...", "message": "...", "seq": 1} -> reply
+#   POST   /sessions          -> {"session_id": "..."}
+#   DELETE /sessions/<id>
+#   GET    /health
+#   GET    /metrics           Prometheus text; ?format=json for a JSON snapshot
+#   POST   /metrics           {"enabled": true|false} switches instrumentation
+#   GET    /ws?session_id=... WebSocket; each text frame is one message
+#
+# Session state lives server-side in a bounded SessionStore, keyed by
+# session_id. Gateways may supply their own stable ids (e.g. a hashed phone
+# number); unknown or expired ids start a new conversation. A gateway that
+# retries may number each session's messages with "seq": a repeat of the last
+# number with the same text gets the stored reply instead of a second turn,
+# and an older or reused number gets 409. Each session may send a burst of
+# messages, then about one per second (--rate-limit); beyond that it gets
+# 429 without the message being analyzed. With
+# --session-db, sessions are snapshots in a SQLite file shared by every
+# worker process instead, so any worker can serve any session and a crashed
+# worker loses nothing; messages arriving together are then answered in one
+# batch, with one read and one write transaction. Built on asyncio streams
+# only, like the rest of the engine.
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import secrets
+import struct
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+from talksafe_engine.backends import SessionConflict, SharedSessions, SQLiteBackend
+from talksafe_engine.escalation import EscalationQueue, FileSink, HttpSink
+from talksafe_engine.intake import BURST, DUPLICATE, LIMITED, RATE, STALE, Submission, SubmissionGuard, TokenBucket
+from talksafe_engine.metrics import METRICS
+from talksafe_engine.model import load_model
+from talksafe_engine.persistence import BATCH_SIZE, FSYNC_INTERVAL, SessionRecorder
+from talksafe_engine.responder import CulturalResponder
+from talksafe_engine.selector import session_seed
+from talksafe_engine.sessions import SessionStore
+
+MAX_MESSAGE_CHARS = 500
+MAX_BODY_BYTES = 16 * 1024
+MAX_SESSION_ID_CHARS = 128
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# String payloads are sent as text, which only /metrics does
+TEXT_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    409: "Conflict",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# Transport-independent session handling shared by HTTP and WebSocket
+class ChatService:
+    def __init__(self, model=None, max_sessions=10000, idle_ttl=1800.0, seed=None, recorder=None, escalation=None,
+                 backend=None, rate=RATE, burst=BURST):
+        # With a seed, each session's replies depend only on (seed, session_id).
+        # recorder: a SessionRecorder that every exchange is queued to
+        # escalation: an EscalationQueue that crisis turns are queued to
+        # backend: a MemoryBackend or SQLiteBackend holding session snapshots;
+        # without one, sessions are live objects in this process
+        # rate, burst: each session's token bucket; rate=None turns limiting off
+        self.model = model or load_model()
+        self.seed = seed
+        self.recorder = recorder
+        self.escalation = escalation
+        self.rate = rate
+        self.burst = burst
+        self.duplicates = 0
+        self.stale = 0
+        self.limited = 0
+        if backend is None:
+            self.shared = None
+            self.sessions = SessionStore(self._new_session, max_sessions, idle_ttl)
+        else:
+            self.shared = self.sessions = SharedSessions(backend, self._new_shared, self._restore_shared)
+
+    def _new_session(self, session_id):
+        seed = None if self.seed is None else session_seed(self.seed, session_id)
+        responder = CulturalResponder(self.model, seed, self.recorder, session_id, self.escalation)
+        responder.intake = self._new_guard()
+        return responder
+
+    def _new_shared(self, session_id, effects):
+        seed = None if self.seed is None else session_seed(self.seed, session_id)
+        responder = CulturalResponder(self.model, seed, self._deferred(self.recorder, effects), session_id,
+                                      self._deferred(self.escalation, effects))
+        responder.intake = self._new_guard()
+        return responder
+
+    def _restore_shared(self, session_id, state, effects):
+        responder = CulturalResponder.restore(self.model, state, self._deferred(self.recorder, effects), session_id,
+                                              self._deferred(self.escalation, effects))
+        if responder.intake is None:
+            responder.intake = self._new_guard()
+        return responder
+
+    def _new_guard(self):
+        return SubmissionGuard(None if self.rate is None else TokenBucket(self.rate, self.burst))
+
+    @staticmethod
+    def _deferred(target, effects):
+        # The responder calls `effects` in place of a configured recorder or queue
+        return None if target is None else effects
+
+    def create_session(self, session_id=None):
+        session_id = session_id or secrets.token_urlsafe(16)
+        if self.shared is None:
+            self.sessions.create(session_id)
+        # A shared session is created by its first message
+        return session_id
+
+    def end_session(self, session_id):
+        return self.sessions.discard(session_id)
+
+    def validate(self, session_id, message, seq=None):
+        # (session_id, Submission) ready for reply_many, with a new id if none was given
+        if not isinstance(message, str) or not message.strip():
+            raise HttpError(400, "message must be a non-empty string")
+        if len(message) > MAX_MESSAGE_CHARS:
+            raise HttpError(413, f"message longer than {MAX_MESSAGE_CHARS} characters")
+        if session_id is not None and (not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_CHARS):
+            raise HttpError(400, "invalid session_id")
+        if seq is not None and (type(seq) is not int or seq < 0):
+            raise HttpError(400, "seq must be a non-negative integer")
+        return session_id or secrets.token_urlsafe(16), Submission(message.strip(), seq)
+
+    def reply(self, session_id, message, seq=None):
+        reply, = self.reply_many([self.validate(session_id, message, seq)])
+        if isinstance(reply, HttpError):
+            raise reply
+        return reply
+
+    def reply_many(self, turns):
+        # Replies to validated (session_id, Submission) turns in order; a turn
+        # that is stale, rate limited or whose shared session kept conflicting
+        # gets an HttpError instead
+        if self.shared is None:
+            replies = []
+            for session_id, submission in turns:
+                responder = self.sessions.get(session_id) or self.sessions.create(session_id)
+                replies.append(self._exchange(session_id, responder, submission))
+            return replies
+        replies = self.shared.run(turns, self._exchange, self.recorder, self.escalation)
+        return [HttpError(409, str(reply)) if isinstance(reply, SessionConflict) else reply for reply in replies]
+
+    def _exchange(self, session_id, responder, submission):
+        # Admission is decided before the message is analyzed at all
+        intake = responder.intake
+        if intake is not None:
+            verdict = intake.admit(submission)
+            if verdict == DUPLICATE:
+                self.duplicates += 1
+                return intake.last_reply
+            if verdict == STALE:
+                self.stale += 1
+                return HttpError(409, f"seq {submission.seq} is not after {intake.last_seq}")
+            if verdict == LIMITED:
+                self.limited += 1
+                return HttpError(429, f"too many messages; try again in {intake.bucket.retry_after():.1f}s")
+        response, is_crisis, mood, language = responder.generate_response(submission.text)
+        reply = {
+            "session_id": session_id,
+            "response": response,
+            "is_crisis": is_crisis,
+            "escalating": responder.crisis_scorer.escalating,
+            "mood": mood,
+            "language": language,
+        }
+        if intake is not None:
+            intake.complete(submission, reply)
+        return reply
+
+    def metrics(self):
+        return {"duplicates": self.duplicates, "stale": self.stale, "rate_limited": self.limited,
+                "rate": self.rate, "burst": self.burst}
+
+
+# Collects the chat messages that arrive during one event-loop iteration and
+# answers them with a single ChatService.reply_many, so a shared backend
+# pays one read and one write transaction per batch rather than per message.
+# The batch runs in the loop's default executor: its SQLite transactions can
+# wait up to the backend's busy timeout for another worker's write, and the
+# loop keeps serving other connections meanwhile. One batch runs at a time;
+# messages arriving during it form the next one.
+class ReplyBatcher:
+    def __init__(self, service):
+        self.service = service
+        self._pending = []
+        self._flusher = None
+        self.batches = 0
+        self.largest = 0
+
+    async def reply(self, session_id, message, seq=None):
+        turn = self.service.validate(session_id, message, seq)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((turn, future))
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush())
+        reply = await future
+        if isinstance(reply, HttpError):
+            raise reply
+        return reply
+
+    async def _flush(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                pending, self._pending = self._pending, []
+                turns = [turn for turn, _future in pending]
+                try:
+                    replies = await loop.run_in_executor(None, self.service.reply_many, turns)
+                except Exception as error:
+                    for _turn, future in pending:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+                self.batches += 1
+                self.largest = max(self.largest, len(pending))
+                for (_turn, future), reply in zip(pending, replies):
+                    if not future.done():
+                        future.set_result(reply)
+        finally:
+            self._flusher = None
+
+
+class ChatServer:
+    def __init__(self, service=None, host="127.0.0.1", port=8080, backlog=4096, sweep_interval=60.0,
+                 metrics_dump=None, metrics_interval=15.0):
+        # metrics_dump: path that METRICS.snapshot() is written to every metrics_interval seconds
+        self.service = service or ChatService()
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.sweep_interval = sweep_interval
+        self.metrics_dump = metrics_dump
+        self.metrics_interval = metrics_interval
+        # Batching only pays off when sessions live in a shared backend
+        self.batcher = ReplyBatcher(self.service) if self.service.shared is not None else None
+        self._server = None
+        self._sweeper = None
+        self._dumper = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=self.backlog)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._sweeper = asyncio.get_running_loop().create_task(self._sweep_sessions())
+        if self.metrics_dump:
+            self._dumper = asyncio.get_running_loop().create_task(self._dump_metrics())
+        return self
+
+    async def _sweep_sessions(self):
+        # Reclaims abandoned sessions even when no requests arrive to trigger it;
+        # a shared backend's sweep is a write transaction, so it runs off the loop
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            if self.service.shared is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self.service.sessions.sweep)
+            else:
+                self.service.sessions.sweep()
+
+    async def _dump_metrics(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                METRICS.dump(self.metrics_dump)
+            except OSError as error:
+                print(f"metrics dump to {self.metrics_dump} failed: {error}", file=sys.stderr)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._dumper is not None:
+            self._dumper.cancel()
+            METRICS.dump(self.metrics_dump)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as error:
+                    writer.write(_http_response(error.status, {"error": error.message}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                url = urlsplit(target)
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, url, headers)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    if self.batcher is not None and url.path == "/chat" and method == "POST":
+                        request = _parse_json(body)
+                        status, payload = 200, await self.batcher.reply(request.get("session_id"),
+                                                                        request.get("message"), request.get("seq"))
+                    else:
+                        status, payload = self._dispatch(method, url.path, body, url.query)
+                except HttpError as error:
+                    status, payload = error.status, {"error": error.message}
+                writer.write(_http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, method, path, body, query=""):
+        service = self.service
+        if path == "/chat":
+            if method != "POST":
+                raise HttpError(405, "use POST")
+            request = _parse_json(body)
+            return 200, service.reply(request.get("session_id"), request.get("message"), request.get("seq"))
+        if path == "/sessions":
+            if method != "POST":
+                raise HttpError(405, "use POST")
+            return 201, {"session_id": service.create_session()}
+        if path.startswith("/sessions/"):
+            if method != "DELETE":
+                raise HttpError(405, "use DELETE")
+            if not service.end_session(path[len("/sessions/"):]):
+                raise HttpError(404, "unknown session")
+            return 204, None
+        if path == "/health":
+            health = {"status": "ok", "sessions": service.sessions.metrics(), "intake": service.metrics(),
+                      "packs": service.model.packs.metrics()}
+            if service.model.analysis_cache is not None:
+                health["analysis_cache"] = service.model.analysis_cache.metrics()
+            if service.recorder is not None:
+                health["recorder"] = service.recorder.metrics()
+            if service.escalation is not None:
+                health["escalation"] = service.escalation.metrics()
+            if self.batcher is not None:
+                health["batches"] = {"count": self.batcher.batches, "largest": self.batcher.largest}
+            return 200, health
+        if path == "/metrics":
+            if method == "POST":
+                enabled = _parse_json(body).get("enabled")
+                if not isinstance(enabled, bool):
+                    raise HttpError(400, "enabled must be true or false")
+                METRICS.enabled = enabled
+                return 200, METRICS.snapshot()
+            if method != "GET":
+                raise HttpError(405, "use GET or POST")
+            if parse_qs(query).get("format") == ["json"]:
+                return 200, METRICS.snapshot()
+            return 200, METRICS.render_prometheus()
+        raise HttpError(404, "not found")
+
+    async def _websocket(self, reader, writer, url, headers):
+        key = headers.get("sec-websocket-key")
+        if url.path != "/ws" or not key:
+            writer.write(_http_response(404 if url.path != "/ws" else 400, {"error": "bad websocket request"}, False))
+            await writer.drain()
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode("ascii") + WEBSOCKET_GUID).digest()).decode("ascii")
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept.encode("ascii") + b"\r\n\r\n"
+        )
+        await writer.drain()
+
+        session_id = parse_qs(url.query).get("session_id", [None])[0]
+        while True:
+            opcode, payload = await _read_frame(reader)
+            if opcode == 0x8:
+                writer.write(_frame(0x8, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == 0x9:
+                writer.write(_frame(0xA, payload))
+                await writer.drain()
+                continue
+            if opcode != 0x1:
+                continue
+            text = payload.decode("utf-8", errors="replace")
+            try:
+                message, seq = text, None
+                if text.startswith("{"):
+                    request = _parse_json(payload)
+                    message, seq = request.get("message"), request.get("seq")
+                    session_id = request.get("session_id", session_id)
+                if self.batcher is not None:
+                    reply = await self.batcher.reply(session_id, message, seq)
+                else:
+                    reply = self.service.reply(session_id, message, seq)
+                session_id = reply["session_id"]
+            except HttpError as error:
+                reply = {"error": error.message, "status": error.status}
+            writer.write(_frame(0x1, json.dumps(reply).encode("utf-8")))
+            await writer.drain()
+
+
+async def _read_request(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as error:
+        if not error.partial.strip():
+            return None
+        raise
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    if "transfer-encoding" in headers:
+        raise HttpError(411, "chunked bodies are not supported")
+    length = headers.get("content-length")
+    if length:
+        if not length.isdigit():
+            raise HttpError(400, "invalid content-length")
+        if int(length) > MAX_BODY_BYTES:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(int(length))
+    return method.upper(), target, headers, body
+
+
+def _parse_json(body):
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(400, "body must be JSON")
+    if not isinstance(request, dict):
+        raise HttpError(400, "body must be a JSON object")
+    return request
+
+
+def _http_response(status, payload, keep_alive=True):
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), TEXT_CONTENT_TYPE
+    else:
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        content_type = "application/json"
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _read_frame(reader):
+    # Returns (opcode, payload) for one complete message, joining fragments
+    opcode = None
+    payload = bytearray()
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY_BYTES:
+            raise ConnectionError("websocket frame too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        data = await reader.readexactly(length)
+        if mask and data:
+            data = _unmask(data, mask)
+        frame_opcode = first & 0x0F
+        if frame_opcode >= 0x8:
+            # Control frames may arrive between fragments
+            return frame_opcode, data
+        if frame_opcode:
+            opcode = frame_opcode
+        payload += data
+        if first & 0x80:
+            return opcode, bytes(payload)
+
+
+def _unmask(data, mask):
+    key = (mask * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(len(data), "big")
+
+
+def _frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the TalkSafe responder over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-sessions", type=int, default=10000, help="live sessions before LRU eviction")
+    parser.add_argument("--session-ttl", type=float, default=1800.0, help="idle seconds before a session expires")
+    parser.add_argument("--seed", type=int, default=None, help="make replies reproducible per session id")
+    parser.add_argument("--rate-limit", type=float, default=RATE,
+                        help="sustained messages per second per session (0 turns limiting off)")
+    parser.add_argument("--rate-burst", type=int, default=BURST, help="messages a session may send at once")
+    parser.add_argument("--session-db", metavar="PATH",
+                        help="keep sessions in this SQLite file, shared by every worker process pointed at it")
+    parser.add_argument("--db", metavar="PATH", help="record anonymized exchanges to this SQLite database")
+    parser.add_argument("--db-batch-size", type=int, default=BATCH_SIZE, help="records per write transaction")
+    parser.add_argument("--db-fsync-interval", type=float, default=FSYNC_INTERVAL,
+                        help="seconds between syncs to disk (0 syncs every batch)")
+    parser.add_argument("--db-store-text", action="store_true", help="keep message text, not just its labels")
+    parser.add_argument("--escalation-url", metavar="URL", help="POST crisis alerts in batches to this webhook")
+    parser.add_argument("--escalation-file", metavar="PATH", help="append crisis alerts to this JSON-lines file")
+    parser.add_argument("--metrics", action="store_true", help="record stage timings and message counters")
+    parser.add_argument("--metrics-dump", metavar="PATH", help="write a JSON metrics snapshot here periodically")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="seconds between metrics dumps")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        METRICS.enabled = True
+
+    async def serve():
+        service = ChatService(max_sessions=args.max_sessions, idle_ttl=args.session_ttl, seed=args.seed,
+                              recorder=recorder, escalation=escalation, backend=backend,
+                              rate=args.rate_limit or None, burst=args.rate_burst)
+        server = await ChatServer(service, host=args.host, port=args.port, metrics_dump=args.metrics_dump,
+                                  metrics_interval=args.metrics_interval).start()
+        print(f"TalkSafe API listening on http://{args.host}:{server.port}", file=sys.stderr)
+        await server.serve_forever()
+
+    backend = None
+    if args.session_db:
+        backend = SQLiteBackend(args.session_db, idle_ttl=args.session_ttl)
+    recorder = None
+    if args.db:
+        recorder = SessionRecorder(args.db, batch_size=args.db_batch_size, fsync_interval=args.db_fsync_interval,
+                                   store_text=args.db_store_text)
+    escalation = None
+    if args.escalation_url or args.escalation_file:
+        sink = HttpSink(args.escalation_url) if args.escalation_url else FileSink(args.escalation_file)
+        escalation = EscalationQueue(sink)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Both flush whatever is still queued before exiting
+        if escalation is not None:
+            escalation.close(timeout=30.0)
+        if recorder is not None:
+            recorder.close()
+        if backend is not None:
+            backend.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
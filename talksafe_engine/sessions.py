@@ -0,0 +1,98 @@
+import sys
+import time
+from collections import OrderedDict, deque
+
+MAX_MESSAGES = 20
+CONTEXT_LIMIT = 8
+MOOD_HISTORY_LIMIT = 50
+
+
+def ring(limit):
+    # Fixed-capacity history: appending past the limit drops the oldest entry
+    return deque(maxlen=limit)
+
+
+def approx_bytes(value):
+    # Shallow size of a container plus its entries, one level of dicts deep
+    total = sys.getsizeof(value)
+    for item in value:
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            total += sum(sys.getsizeof(field) for field in item.values())
+    return total
+
+
+# Live sessions keyed by id, bounded in count and idle time. factory builds
+# a new session from its id.
+#
+# Entries are kept in least-recently-used order, which is also idle order, so
+# both TTL expiry and LRU eviction pop from the front in O(1). Every access
+# sweeps expired sessions first, so no background timer is needed under load.
+class SessionStore:
+    def __init__(self, factory, max_sessions=10000, idle_ttl=1800.0, clock=time.monotonic):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get(self, session_id):
+        now = self.clock()
+        self.sweep(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        entry[0] = now
+        self._sessions.move_to_end(session_id)
+        return entry[1]
+
+    def create(self, session_id):
+        now = self.clock()
+        self.sweep(now)
+        session = self.factory(session_id)
+        self._sessions[session_id] = [now, session]
+        self._sessions.move_to_end(session_id)
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def discard(self, session_id):
+        return self._sessions.pop(session_id, None) is not None
+
+    def sweep(self, now=None):
+        if now is None:
+            now = self.clock()
+        deadline = now - self.idle_ttl
+        sessions = self._sessions
+        while sessions:
+            session_id, entry = next(iter(sessions.items()))
+            if entry[0] > deadline:
+                break
+            del sessions[session_id]
+            self.expired += 1
+
+    def metrics(self):
+        # bytes_held walks every live session, so call it from monitoring, not per request
+        held = 0
+        for _last_seen, session in self._sessions.values():
+            held += session.approx_bytes() if hasattr(session, "approx_bytes") else sys.getsizeof(session)
+        return {
+            "live_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "bytes_held": held,
+        }
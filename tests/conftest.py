@@ -0,0 +1,15 @@
+# Shared fixtures. The model is built once per test session, without the
+# analysis cache, so every test sees its messages analyzed afresh.
+import pytest
+
+from talksafe_engine.model import build_model
+
+
+@pytest.fixture(scope="session")
+def model():
+    return build_model(cache_entries=0)
+
+
+@pytest.fixture(scope="session")
+def analyzer(model):
+    return model.analyzer
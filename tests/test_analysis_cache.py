@@ -0,0 +1,34 @@
+# The analysis cache follows pack reloads: a cached message is analyzed
+# again once its pack file changes, even if only cache hits follow.
+import json
+import os
+import shutil
+
+import pytest
+
+from talksafe_engine.model import build_model
+from talksafe_engine.packs import PACKS_DIR
+
+
+@pytest.fixture
+def model(tmp_path):
+    for name in os.listdir(PACKS_DIR):
+        shutil.copy(os.path.join(PACKS_DIR, name), tmp_path / name)
+    return build_model(str(tmp_path), check_interval=0)
+
+
+def test_hit_sees_reloaded_pack(model):
+    analyzer = model.analyzer
+    assert analyzer.analyze("my hamster is sick").category != "relationships"
+    assert analyzer.analyze("my hamster is sick") is analyzer.analyze("my hamster is sick")
+
+    path = model.packs.path("english")
+    with open(path, encoding="utf-8") as handle:
+        pack = json.load(handle)
+    pack["categories"]["relationships"]["patterns"].append("hamster")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(pack, handle)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    assert analyzer.analyze("my hamster is sick").category == "relationships"
@@ -0,0 +1,169 @@
+# Parity of the one-pass analyzer with the original four-scan functions
+# from talksafe.py (detect_crisis, detect_language, analyze_mood and
+# get_response_category), over the same seeded corpus as
+# benchmarks/bench_analysis.py. The reference below is the behaviour the
+# analyzer must keep: crisis terms count as whole words, severity words only
+# next to a crisis keyword, the crisis category only for crisis messages,
+# and language comes from indicator substrings (the model is built without
+# the n-gram identifier). A deliberate change in behaviour belongs in this
+# file, next to the change itself.
+import random
+import re
+
+import pytest
+
+from talksafe_engine import responses as cultural_responses
+from talksafe_engine.model import ResponderModel
+from talksafe_engine.packs import PackStore
+
+RESPONSES = cultural_responses.load_cultural_responses()
+CORPUS_SIZE = 20000
+
+_WORD_PATTERNS = {
+    term: re.compile(r"(?<!\w)%s(?!\w)" % re.escape(term))
+    for term in cultural_responses.CRISIS_KEYWORDS + cultural_responses.SEVERITY_INDICATORS
+}
+
+
+def _has_word(term, text):
+    return term in text and _WORD_PATTERNS[term].search(text) is not None
+
+
+def reference_detect_crisis(text):
+    text_lower = text.lower()
+    crisis_score = 0
+    for keyword in cultural_responses.CRISIS_KEYWORDS:
+        if _has_word(keyword, text_lower):
+            crisis_score += 2
+    if crisis_score:
+        for indicator in cultural_responses.SEVERITY_INDICATORS:
+            if _has_word(indicator, text_lower):
+                crisis_score += 3
+    return crisis_score >= 2
+
+
+def reference_detect_language(user_input):
+    pidgin_indicators = ["wetin", "dey", "how far", "wahala", "no be", "fit", "make we"]
+    if any(indicator in user_input.lower() for indicator in pidgin_indicators):
+        return "pidgin"
+    return "english"
+
+
+def reference_analyze_mood(user_input):
+    positive_words = ["good", "great", "happy", "fine", "better", "okay"]
+    negative_words = ["bad", "terrible", "awful", "depressed", "anxious", "overwhelmed", "stressed"]
+    user_lower = user_input.lower()
+    positive_count = sum(1 for word in positive_words if word in user_lower)
+    negative_count = sum(1 for word in negative_words if word in user_lower)
+    if positive_count > negative_count:
+        return "good"
+    elif negative_count > positive_count:
+        return "bad"
+    return "okay"
+
+
+def reference_categories(language):
+    # A language's own categories, then the English ones it lacks: replies
+    # for those already fell back to English, and now matching does too
+    categories = dict(RESPONSES[language])
+    for category, data in RESPONSES["english"].items():
+        categories.setdefault(category, data)
+    return categories
+
+
+def reference_get_response_category(user_input, language):
+    user_input = user_input.lower()
+    category_scores = {}
+    for category, data in reference_categories(language).items():
+        if category == "crisis":
+            continue
+        score = 0
+        for pattern in data["patterns"]:
+            if pattern in user_input:
+                score += len(pattern) * user_input.count(pattern)
+        category_scores[category] = score
+    if max(category_scores.values()) > 0:
+        return max(category_scores, key=category_scores.get)
+    return "greetings"
+
+
+def reference_analyze(text):
+    is_crisis = reference_detect_crisis(text)
+    language = reference_detect_language(text)
+    mood = reference_analyze_mood(text)
+    category = "crisis" if is_crisis else reference_get_response_category(text, language)
+    return is_crisis, language, mood, category
+
+
+def build_corpus(size, seed=7):
+    # Every response text, then random mixes of every listed term with filler
+    # words that contain terms without being them ("diet", "studied",
+    # "fitness", "explanation")
+    rng = random.Random(seed)
+    vocabulary = set(cultural_responses.CRISIS_KEYWORDS + cultural_responses.SEVERITY_INDICATORS)
+    vocabulary.update(cultural_responses.POSITIVE_WORDS + cultural_responses.NEGATIVE_WORDS)
+    for indicators in cultural_responses.LANGUAGE_INDICATORS.values():
+        vocabulary.update(indicators)
+    for categories in RESPONSES.values():
+        for data in categories.values():
+            vocabulary.update(data["patterns"])
+    vocabulary = sorted(vocabulary)
+    filler = ["I", "am", "really", "my", "The", "and", "so", "MONDAY", "fitness", "diet", "studied",
+              "explanation", "this", "okay?", "...", "😔", "Hi!", "abi", "sha", "o"]
+
+    corpus = []
+    for categories in RESPONSES.values():
+        for data in categories.values():
+            corpus.extend(data["responses"])
+    for _ in range(size - len(corpus)):
+        words = [rng.choice(filler) for _ in range(rng.randint(0, 25))]
+        for _ in range(rng.randint(0, 4)):
+            word = rng.choice(vocabulary)
+            words.insert(rng.randrange(len(words) + 1), word.upper() if rng.random() < 0.1 else word)
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def signature(analysis):
+    return analysis.is_crisis, analysis.language, analysis.mood, analysis.category
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return ResponderModel(
+        PackStore(),
+        cultural_responses.CRISIS_KEYWORDS,
+        cultural_responses.SEVERITY_INDICATORS,
+        cultural_responses.LANGUAGE_INDICATORS,
+        cultural_responses.POSITIVE_WORDS,
+        cultural_responses.NEGATIVE_WORDS,
+    ).analyzer
+
+
+def test_corpus_matches_reference(analyzer):
+    mismatches = []
+    for text in build_corpus(CORPUS_SIZE):
+        got, expected = signature(analyzer.analyze(text)), reference_analyze(text)
+        if got != expected:
+            mismatches.append((text, got, expected))
+    assert mismatches[:5] == [], f"{len(mismatches)} of {CORPUS_SIZE} messages differ"
+
+
+# (message, (is_crisis, language, mood, category)): words that contain a
+# crisis or severity term without being one, and the substring indicators
+@pytest.mark.parametrize("text, expected", [
+    ("I want to die", (True, "english", "okay", "crisis")),
+    ("I want to die today", (True, "english", "okay", "crisis")),
+    ("I studied hard for my diet", (False, "english", "okay", "greetings")),
+    ("I'm on a diet", (False, "english", "okay", "greetings")),
+    ("I studied all night", (False, "english", "okay", "greetings")),
+    ("See you on Monday", (False, "english", "okay", "greetings")),
+    ("I have a plan for Monday", (False, "english", "okay", "greetings")),
+    ("The explanation was bad", (False, "english", "bad", "greetings")),
+    ("I go to the fitness centre", (False, "pidgin", "okay", "greetings")),
+    ("wetin dey happen", (False, "pidgin", "okay", "greetings")),
+    ("I'm stressed about exams", (False, "english", "bad", "academic_stress")),
+])
+def test_known_messages(analyzer, text, expected):
+    assert signature(analyzer.analyze(text)) == expected
+    assert reference_analyze(text) == expected
@@ -0,0 +1,129 @@
+# Shared sessions: versioned saves conflict when another worker got there
+# first, a conflicting turn is redone against the newer snapshot, and its
+# recorder and escalation calls are replayed only once a save keeps them.
+from talksafe_engine.backends import MemoryBackend, SessionConflict, SharedSessions, SQLiteBackend, encode_snapshot
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Calls:
+    def __init__(self):
+        self.calls = []
+
+    def record(self, *args):
+        self.calls.append(("record", args))
+
+    def escalate(self, *args):
+        self.calls.append(("escalate", args))
+
+
+# Stands in for CulturalResponder: its snapshot is the list of its turns
+class Conversation:
+    def __init__(self, effects, turns=()):
+        self.effects = effects
+        self.turns = list(turns)
+
+    def snapshot(self):
+        return self.turns
+
+
+def shared(backend, **options):
+    return SharedSessions(backend, lambda session_id, effects: Conversation(effects),
+                          lambda session_id, state, effects: Conversation(effects, state), **options)
+
+
+def take_turn(session_id, conversation, message):
+    conversation.turns.append(message)
+    conversation.effects.record(session_id, message)
+    if message == "help":
+        conversation.effects.escalate(session_id, message)
+    return list(conversation.turns)
+
+
+def test_turns_run_in_order_and_effects_replay_after_save():
+    backend = MemoryBackend()
+    sessions = shared(backend)
+    recorder, escalation = Calls(), Calls()
+    results = sessions.run([("a", "hi"), ("b", "yo"), ("a", "help")], take_turn, recorder, escalation)
+    assert results == [["hi"], ["yo"], ["hi", "help"]]
+    assert recorder.calls == [("record", ("a", "hi")), ("record", ("a", "help")), ("record", ("b", "yo"))]
+    assert escalation.calls == [("escalate", ("a", "help"))]
+    assert sorted(backend.load_many(["a", "b"])) == ["a", "b"]
+    assert sessions.created == 2
+
+
+def test_conflict_redoes_turn_against_newer_snapshot():
+    backend = MemoryBackend()
+    sessions = shared(backend)
+    sessions.run([("a", "first")], take_turn, Calls())
+    recorder = Calls()
+    raced = []
+
+    def racing_turn(session_id, conversation, message):
+        # Another worker saves the session between this worker's load and save
+        if not raced:
+            version, _blob = backend.load_many([session_id])[session_id]
+            backend.save_many([(session_id, version, encode_snapshot(["first", "elsewhere"]))])
+            raced.append(True)
+        return take_turn(session_id, conversation, message)
+
+    result, = sessions.run([("a", "second")], racing_turn, recorder)
+    assert result == ["first", "elsewhere", "second"]
+    assert recorder.calls == [("record", ("a", "second"))]
+    assert sessions.retries == 1
+    assert backend.conflicts == 1
+
+
+def test_conflict_after_max_attempts_drops_effects():
+    backend = MemoryBackend()
+    sessions = shared(backend, max_attempts=2)
+    recorder = Calls()
+
+    def always_raced(session_id, conversation, message):
+        row = backend.load_many([session_id]).get(session_id)
+        backend.save_many([(session_id, None if row is None else row[0], encode_snapshot(["elsewhere"]))])
+        return take_turn(session_id, conversation, message)
+
+    result, = sessions.run([("a", "hi")], always_raced, recorder)
+    assert isinstance(result, SessionConflict)
+    assert recorder.calls == []
+    assert sessions.retries == 1
+
+
+def test_sqlite_saves_check_versions(tmp_path):
+    clock = Clock()
+    backend = SQLiteBackend(str(tmp_path / "sessions.db"), idle_ttl=60.0, clock=clock)
+    try:
+        assert backend.save_many([("a", None, b"one")]) == set()
+        # A second new-session save for a live id lost the race
+        assert backend.save_many([("a", None, b"other")]) == {"a"}
+        assert backend.load_many(["a"]) == {"a": (1, b"one")}
+
+        assert backend.save_many([("a", 1, b"two")]) == set()
+        assert backend.save_many([("a", 1, b"stale")]) == {"a"}
+        assert backend.load_many(["a", "missing"]) == {"a": (2, b"two")}
+        assert backend.conflicts == 2
+    finally:
+        backend.close()
+
+
+def test_sqlite_expired_session_is_new_again(tmp_path):
+    clock = Clock()
+    backend = SQLiteBackend(str(tmp_path / "sessions.db"), idle_ttl=60.0, clock=clock)
+    try:
+        backend.save_many([("a", None, b"old")])
+        clock.now += 61.0
+        assert backend.load_many(["a"]) == {}
+        # The expired row's version no longer applies; a new session claims the id
+        assert backend.save_many([("a", 1, b"late")]) == {"a"}
+        assert backend.save_many([("a", None, b"new")]) == set()
+        version, blob = backend.load_many(["a"])["a"]
+        assert blob == b"new" and version > 1
+    finally:
+        backend.close()
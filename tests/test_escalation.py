@@ -0,0 +1,81 @@
+# Crisis escalation: one alert per session per de-duplication window, failed
+# batches retried, and batches that never get through kept as dead letters.
+import threading
+
+from talksafe_engine.escalation import DeliveryError, EscalationQueue
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+# Fails its first `failures` deliveries, then keeps every alert it is given
+class FlakySink:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.attempts = 0
+        self.alerts = []
+        self._lock = threading.Lock()
+
+    def deliver(self, alerts):
+        with self._lock:
+            self.attempts += 1
+            if self.attempts <= self.failures:
+                raise DeliveryError("unavailable")
+            self.alerts.extend(alerts)
+
+
+def escalate(queue, session_id):
+    return queue.escalate(session_id, "english", 0.9, 4, False, "I want to die")
+
+
+def test_one_alert_per_session_per_window():
+    clock = Clock()
+    sink = FlakySink()
+    queue = EscalationQueue(sink, workers=1, batch_wait=0.0, dedupe_window=300.0, clock=clock)
+    assert escalate(queue, "a")
+    assert not escalate(queue, "a")
+    assert escalate(queue, "b")
+    clock.now += 301.0
+    assert escalate(queue, "a")
+    queue.close(5.0)
+    assert sorted(alert.session_id for alert in sink.alerts) == ["a", "a", "b"]
+    assert queue.deduplicated == 1
+    assert queue.delivered == 3
+
+
+def test_failed_batch_is_retried():
+    sink = FlakySink(failures=2)
+    queue = EscalationQueue(sink, workers=1, batch_wait=0.0, backoff=0.0, max_attempts=3)
+    escalate(queue, "a")
+    queue.close(5.0)
+    assert [alert.session_id for alert in sink.alerts] == ["a"]
+    assert queue.retries == 2
+    assert queue.failed == 0
+    assert list(queue.dead_letters) == []
+
+
+def test_batch_that_keeps_failing_becomes_dead_letters():
+    sink = FlakySink(failures=10)
+    queue = EscalationQueue(sink, workers=1, batch_wait=0.0, backoff=0.0, max_attempts=2)
+    escalate(queue, "a")
+    queue.close(5.0)
+    assert sink.attempts == 2
+    assert queue.failed == 1
+    assert [alert.session_id for alert in queue.dead_letters] == ["a"]
+    assert queue.last_error == "DeliveryError: unavailable"
+
+
+def test_full_queue_drops_without_starting_the_window():
+    queue = EscalationQueue(FlakySink(), max_pending=1, workers=0, clock=Clock())
+    assert escalate(queue, "a")
+    assert not escalate(queue, "b")
+    # "b" was never queued, so its next crisis turn tries again rather than
+    # being de-duplicated
+    assert not escalate(queue, "b")
+    assert queue.dropped == 2
+    assert queue.deduplicated == 0
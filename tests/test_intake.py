@@ -0,0 +1,90 @@
+# Submission admission: a numbered message is processed once, a retry of
+# the last one is a duplicate, anything older is stale, and a rate-limited
+# message leaves its sequence number free for the client to send again.
+import pytest
+
+from talksafe_engine.intake import ACCEPTED, DUPLICATE, LIMITED, STALE, Submission, SubmissionGuard, TokenBucket
+from talksafe_engine.server import ChatService, HttpError
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_retry_of_last_submission_is_duplicate():
+    guard = SubmissionGuard()
+    first = Submission("I feel sad", 1)
+    assert guard.admit(first) == ACCEPTED
+    guard.complete(first, "reply")
+    # Whitespace and case do not make it a different message
+    assert guard.admit(Submission("i feel  SAD", 1)) == DUPLICATE
+    assert guard.last_reply == "reply"
+    assert guard.admit(Submission("I feel sad", 2)) == ACCEPTED
+
+
+def test_older_or_reused_seq_is_stale():
+    guard = SubmissionGuard()
+    assert guard.admit(Submission("hello", 5)) == ACCEPTED
+    assert guard.admit(Submission("hello", 4)) == STALE
+    assert guard.admit(Submission("something else", 5)) == STALE
+    assert guard.last_seq == 5
+
+
+def test_limited_submission_does_not_consume_seq():
+    clock = Clock()
+    guard = SubmissionGuard(TokenBucket(rate=1.0, burst=1, clock=clock))
+    assert guard.admit(Submission("one", 1)) == ACCEPTED
+    assert guard.admit(Submission("two", 2)) == LIMITED
+    assert guard.last_seq == 1
+    clock.now += 1.0
+    assert guard.admit(Submission("two", 2)) == ACCEPTED
+    assert guard.last_seq == 2
+
+
+def test_duplicates_and_stale_take_no_tokens():
+    clock = Clock()
+    guard = SubmissionGuard(TokenBucket(rate=1.0, burst=1, clock=clock))
+    assert guard.admit(Submission("one", 1)) == ACCEPTED
+    assert guard.admit(Submission("one", 1)) == DUPLICATE
+    assert guard.admit(Submission("zero", 0)) == STALE
+    clock.now += 1.0
+    assert guard.admit(Submission("two", 2)) == ACCEPTED
+
+
+def test_restored_guard_keeps_seq_and_bucket():
+    clock = Clock()
+    guard = SubmissionGuard(TokenBucket(rate=1.0, burst=2, clock=clock))
+    submission = Submission("hello", 3)
+    guard.admit(submission)
+    guard.complete(submission, {"response": "hi"})
+    restored = SubmissionGuard.restore(guard.snapshot())
+    restored.bucket.clock = clock
+    assert restored.admit(Submission("hello", 3)) == DUPLICATE
+    assert restored.last_reply == {"response": "hi"}
+    assert restored.admit(Submission("again", 4)) == ACCEPTED
+    assert restored.admit(Submission("more", 5)) == LIMITED
+
+
+def test_chat_service_answers_409_and_429(model):
+    service = ChatService(model, seed=1, rate=1.0, burst=1)
+    first = service.reply("s", "hello", seq=1)
+    assert service.reply("s", "hello", seq=1) is first
+    with pytest.raises(HttpError) as stale:
+        service.reply("s", "older", seq=0)
+    assert stale.value.status == 409
+
+    clock = Clock()
+    service.sessions.get("s").intake.bucket = TokenBucket(rate=1.0, burst=1, clock=clock)
+    service.reply("s", "two", seq=2)
+    with pytest.raises(HttpError) as limited:
+        service.reply("s", "three", seq=3)
+    assert limited.value.status == 429
+    clock.now += 1.0
+    assert service.reply("s", "three", seq=3)["session_id"] == "s"
+    assert service.metrics()["duplicates"] == 1
+    assert service.metrics()["stale"] == 1
+    assert service.metrics()["rate_limited"] == 1
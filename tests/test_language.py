@@ -0,0 +1,19 @@
+# Language routing with the n-gram identifier: everyday English that the
+# uncalibrated classifier sent to the Pidgin pack, and plain Pidgin.
+import pytest
+
+pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("text, language", [
+    ("I go to the fitness centre", "english"),
+    ("I go to school", "english"),
+    ("My roommate is very noisy", "english"),
+    ("I love my cat", "english"),
+    ("no", "english"),
+    ("wetin dey happen", "pidgin"),
+    ("I no fit sleep since yesterday", "pidgin"),
+    ("my body no dey well", "pidgin"),
+])
+def test_language(analyzer, text, language):
+    assert analyzer.analyze(text).language == language
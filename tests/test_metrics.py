@@ -0,0 +1,29 @@
+# Message counters are exact: every counted message adds one, whether or not
+# it was sampled for stage timings.
+from talksafe_engine.metrics import Metrics
+
+
+def test_counters_are_exact_while_timings_are_sampled():
+    metrics = Metrics(enabled=True, sample_every=4)
+    timed = metrics.histogram("total")
+    for index in range(8):
+        watch = metrics.stopwatch()
+        if watch:
+            watch.total(timed)
+        if index == 5:
+            metrics.count_message("pidgin", "crisis", "bad", True)
+        else:
+            metrics.count_message("english", "greetings", "okay", False)
+    counters = metrics.counters()
+    assert counters["language"] == {"english": 7, "pidgin": 1}
+    assert counters["crisis"] == {"false": 7, "true": 1}
+    snapshot = metrics.snapshot()
+    assert snapshot["messages"] == 8
+    assert snapshot["stages"]["total"]["count"] == 2
+
+
+def test_disabled_counts_nothing():
+    metrics = Metrics(enabled=False, sample_every=4)
+    assert all(metrics.stopwatch() is None for _ in range(8))
+    metrics.count_message("english", "crisis", "bad", True)
+    assert metrics.snapshot()["messages"] == 0
@@ -0,0 +1,52 @@
+# Session recorder: close() writes out everything recorded before it, with
+# session ids replaced by salted hashes and text kept only when asked to.
+import sqlite3
+
+from talksafe_engine.persistence import SessionRecorder, hash_session_id, session_salt
+
+
+def rows(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT session, created, category, is_crisis, chars, text FROM messages "
+                                  "ORDER BY id").fetchall()
+    finally:
+        connection.close()
+
+
+def test_close_flushes_pending_records(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    # A long flush interval and batch size, so only close() can write them
+    recorder = SessionRecorder(path, batch_size=1000, flush_interval=60.0, clock=lambda: 1234.5)
+    for index in range(3):
+        assert recorder.record("session-1", "english", "greetings", "okay", index == 2, "hello")
+    recorder.close(5.0)
+    assert recorder.written == 3
+    assert recorder.metrics()["pending"] == 0
+
+    connection = sqlite3.connect(path)
+    salt = session_salt(connection)
+    connection.close()
+    session = hash_session_id("session-1", salt)
+    assert rows(path) == [(session, 1234.5, "greetings", 0, 5, None),
+                          (session, 1234.5, "greetings", 0, 5, None),
+                          (session, 1234.5, "greetings", 1, 5, None)]
+
+
+def test_records_after_close_are_dropped(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    recorder = SessionRecorder(path, flush_interval=60.0, store_text=True)
+    recorder.record("session-1", "english", "greetings", "okay", False, "hello")
+    recorder.close(5.0)
+    assert not recorder.record("session-1", "english", "greetings", "okay", False, "late")
+    assert recorder.dropped == 1
+    assert [row[5] for row in rows(path)] == ["hello"]
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    recorder = SessionRecorder(str(tmp_path / "sessions.db"), batch_size=1000, flush_interval=60.0, max_pending=2)
+    results = [recorder.record("s", "english", "greetings", "okay", False, "hi") for _ in range(3)]
+    recorder.close(5.0)
+    assert results == [True, True, False]
+    assert recorder.written == 2
+    assert recorder.dropped == 1
@@ -0,0 +1,23 @@
+# Session snapshots: a restored conversation keeps which replies were crisis
+# replies, and snapshots written before that was stored still restore.
+import json
+
+from talksafe_engine.responder import CulturalResponder
+
+
+def test_restore_keeps_crisis_turns(model):
+    responder = CulturalResponder(model, seed=1)
+    responder.generate_response("hello")
+    responder.generate_response("I want to die")
+    state = json.loads(json.dumps(responder.snapshot()))
+    restored = CulturalResponder.restore(model, state)
+    assert [turn["is_crisis"] for turn in restored.conversation_context] == [False, True]
+    assert restored.snapshot() == state
+
+
+def test_restore_three_entry_context(model):
+    state = CulturalResponder(model, seed=1).snapshot()
+    state["context"] = [["hello", "Hi there", "okay"]]
+    restored = CulturalResponder.restore(model, state)
+    assert list(restored.conversation_context) == [
+        {"input": "hello", "response": "Hi there", "mood": "okay", "is_crisis": False}]
@@ -0,0 +1,34 @@
+# Semantic fallback: short small talk shares a word or a few character
+# n-grams with some category and must keep the default one, while messages
+# that only miss the patterns still find their category. None of these
+# phrasings is a pack example.
+import pytest
+
+pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("text, category", [
+    ("nothing", "greetings"),
+    ("anything", "greetings"),
+    ("nothing much", "greetings"),
+    ("nothing really, you?", "greetings"),
+    ("no", "greetings"),
+    ("what's up", "greetings"),
+    ("my hands are shaking and my chest is tight", "anxiety"),
+    ("I can't afford food this week", "financial_stress"),
+    ("I studied but I still failed", "academic_stress"),
+    ("I can't sleep and nothing feels worth it lately", "depression"),
+    ("nothing feels worth it", "depression"),
+])
+def test_category(analyzer, text, category):
+    assert analyzer.analyze(text, "english").category == category
+
+
+# Pidgin has no depression or financial_stress entries of its own; the
+# English ones stand in, as they already did for the replies
+@pytest.mark.parametrize("text, category", [
+    ("abeg I dey depressed", "depression"),
+    ("I dey broke, no money for school fees", "financial_stress"),
+])
+def test_default_pack_categories(analyzer, text, category):
+    assert analyzer.analyze(text, "pidgin").category == category